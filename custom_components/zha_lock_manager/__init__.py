@@ -4,20 +4,36 @@ import logging
 from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant
 from homeassistant.components.frontend import async_remove_panel
 from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.start import async_at_started
 
 from .const import (
     DOMAIN,
+    PLATFORMS,
     CONF_LOCKS,
-    CONF_ALARMO_ENABLED,
-    CONF_ALARMO_ENTITY_ID,
-    EVENT_ZHA,
+    CONF_SAVE_DELAY,
+    DEFAULT_SAVE_DELAY,
+    CONF_ZIGBEE_RATE,
+    DEFAULT_ZIGBEE_RATE,
+    CONF_ZIGBEE_BURST,
+    DEFAULT_ZIGBEE_BURST,
+    DEFAULT_MAX_SLOTS,
+    DEFAULT_SLOT_OFFSET,
     PANEL_URL_PATH,
 )
+from .access_log import ZLMAccessLog, async_remove_access_log
+from .command_queue import ZLMCommandQueues
+from .discovery import ZLMDiscovery
+from .events import ZLMEventListener, lock_index
+from .metrics import ZLMMetrics
+from .schedule import ZLMScheduler
+from .services import async_register_services
 from .storage import ZLMLocalStore
-from .websocket import register_ws_handlers
+from .users import ZLMUserManager
+from .websocket import async_close_imports, register_ws_handlers
+from .zigbee import configure_rate_limit
 from .panel import async_register_panel
 
 _LOGGER = logging.getLogger(__name__)
@@ -27,33 +43,88 @@ CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    async_register_services(hass)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Load or reload the integration.
 
-    Steps: load local store, seed and prune locks based on entry.data,
-    register WS API and panel, then hook ZHA events for Alarmo.
+    Only cheap steps run here: the keypad hook from the lock index in
+    entry.data, the WS API and the sensors. The store, with the full slot
+    model, loads in the background and the panel is registered once Home
+    Assistant has started, so neither holds up boot.
     """
     hass.data.setdefault(DOMAIN, {})
 
-    store = ZLMLocalStore(hass)
-    await store.async_load()
-    hass.data[DOMAIN]["store"] = store
+    store = ZLMLocalStore(
+        hass, save_delay=entry.options.get(CONF_SAVE_DELAY, DEFAULT_SAVE_DELAY)
+    )
+    # Metrics outlive reloads, so option changes do not reset the numbers
+    metrics: ZLMMetrics = hass.data[DOMAIN].setdefault("metrics", ZLMMetrics(hass))
+    store.metrics = metrics
     hass.data[DOMAIN]["entry"] = entry
-
-    # Locks selected in options
+    configure_rate_limit(
+        hass,
+        float(entry.options.get(CONF_ZIGBEE_RATE, DEFAULT_ZIGBEE_RATE)),
+        int(entry.options.get(CONF_ZIGBEE_BURST, DEFAULT_ZIGBEE_BURST)),
+    )
+
+    # Listen for ZHA unlock events to optionally disarm Alarmo, events that
+    # arrive before the store is loaded wait for it
     cfg_locks: list[dict[str, Any]] = entry.data.get(CONF_LOCKS, [])
+    index = lock_index(cfg_locks)
+    access_log = hass.data[DOMAIN]["access_log"] = ZLMAccessLog(hass)
+    access_log.async_start()
+    listener = ZLMEventListener(hass, entry, store, metrics, access_log)
+    hass.data[DOMAIN]["events"] = listener
+
+    # Store unsubscribe so we can cleanly unload
+    hass.data[DOMAIN]["unsub_zha_event"] = listener.async_start(index)
+
+    # Register WS API once. Handlers read the live store from hass.data on each call.
+    if not hass.data[DOMAIN].get("ws_registered"):
+        register_ws_handlers(hass)
+        hass.data[DOMAIN]["ws_registered"] = True
+
+    entry.async_create_background_task(
+        hass, _async_load_store(hass, store, cfg_locks), "zha_lock_manager load store"
+    )
+
+    # Register or refresh the panel once Home Assistant is up
+    hass.data[DOMAIN]["unsub_panel"] = async_at_started(hass, async_register_panel)
+
+    # Diagnostic sensors, disabled by default
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    return True
+
+
+async def _async_load_store(
+    hass: HomeAssistant, store: ZLMLocalStore, cfg_locks: list[dict[str, Any]]
+) -> None:
+    """Load the store, seed and prune locks, then start what needs the slot model.
+
+    The store and the services built on it only show up in hass.data once
+    this is done, until then WS handlers answer that the store is not loaded.
+    """
+    try:
+        await store.async_load()
+    except Exception as err:  # noqa: BLE001 - deferred events would wait forever otherwise
+        _LOGGER.exception("ZLM: Loading the lock manager store failed")
+        store.async_load_failed(err)
+        return
+
     selected_ieees: set[str] = set()
+    changed = False
 
     # Add or keep selected locks
     for item in cfg_locks:
         entity_id = item.get("entity_id")
         device_ieee = item.get("device_ieee")
         name = item.get("name")
-        max_slots = int(item.get("max_slots", 30))
-        slot_offset = int(item.get("slot_offset", 0))
+        max_slots = int(item.get("max_slots", DEFAULT_MAX_SLOTS))
+        slot_offset = int(item.get("slot_offset", DEFAULT_SLOT_OFFSET))
         if not (entity_id and device_ieee and name):
             continue
         selected_ieees.add(device_ieee)
@@ -62,100 +133,83 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         if device_ieee not in store.locks or store.locks.get(device_ieee) is None:
             from .storage import Lock as LockModel  # local import to avoid cycle
 
-            store.locks[device_ieee] = LockModel(
-                name=name,
-                entity_id=entity_id,
-                device_ieee=device_ieee,
-                max_slots=max_slots,
-                slot_offset=slot_offset,
-                slots={},
+            store.add_lock(
+                LockModel(
+                    name=name,
+                    entity_id=entity_id,
+                    device_ieee=device_ieee,
+                    max_slots=max_slots,
+                    slot_offset=slot_offset,
+                )
             )
+            changed = True
 
     # Remove locks that were deselected in options, erase their data
     to_delete = [ieee for ieee in list(store.locks.keys()) if ieee not in selected_ieees]
     if to_delete:
         for ieee in to_delete:
-            del store.locks[ieee]
+            store.remove_lock(ieee)
+        changed = True
         _LOGGER.debug("ZLM: Pruned removed locks from local store: %s", to_delete)
 
-    # Persist any adds or removals
-    await store.async_save()
+    # Persist adds or removals right away, an unchanged store is not rewritten
+    if changed:
+        await store.async_save()
 
-    # Register WS API once. Handlers read the live store from hass.data on each call.
-    if not hass.data[DOMAIN].get("ws_registered"):
-        register_ws_handlers(hass)
-        hass.data[DOMAIN]["ws_registered"] = True
+    # Finish a key rotation that was interrupted by a restart
+    store.async_resume_key_rotation()
 
-    # Register or refresh panel
-    await async_register_panel(hass)
+    domain_data = hass.data[DOMAIN]
+    domain_data["store"] = store
 
-    # Listen for ZHA unlock events to optionally disarm Alarmo
-    @callback
-    def _zha_event_handler(event):
-        data = event.data or {}
-        try:
-            device_ieee = data.get("device_ieee")
-            command = data.get("command")
-            args = data.get("args", {})
-            source = str(args.get("source")).lower()
-            operation = str(args.get("operation")).lower()
-            code_slot = args.get("code_slot")
-        except Exception:
-            return
-
-        if command != "operation_event_notification" or operation != "unlock":
-            return
-        # Limit to keypad only
-        if source != "keypad":
-            return
-        if device_ieee not in store.locks:
-            return
-
-        lock = store.locks[device_ieee]
-        slot = int(code_slot) if code_slot is not None else None
-        if slot is None:
-            return
-        slot_with_offset = slot + int(lock.slot_offset)
-
-        # Alarmo integration check
-        alarmo_enabled = entry.options.get(CONF_ALARMO_ENABLED, False)
-        alarmo_entity = entry.options.get(CONF_ALARMO_ENTITY_ID)
-        if not alarmo_enabled or not alarmo_entity:
-            return
-
-        # Retrieve and decrypt code, if unavailable, do nothing
-        code = store.get_plain_code(lock, slot_with_offset)
-        if not code:
-            _LOGGER.debug(
-                "ZLM: No stored code for %s slot %s",
-                device_ieee,
-                slot_with_offset,
-            )
-            return
-
-        _LOGGER.debug(
-            "ZLM: Disarming Alarmo via keypad code from slot %s for %s",
-            slot_with_offset,
-            device_ieee,
-        )
-        hass.create_task(
-            hass.services.async_call(
-                "alarm_control_panel",
-                "alarm_disarm",
-                {"entity_id": alarmo_entity, "code": code},
-                blocking=False,
-            )
-        )
+    # Per-lock Zigbee command queues, WS handlers enqueue writes here
+    queues = domain_data["queues"] = ZLMCommandQueues(hass, store, store.metrics)
 
-    # Store unsubscribe so we can cleanly unload
-    unsub = hass.bus.async_listen(EVENT_ZHA, _zha_event_handler)
-    hass.data[DOMAIN]["unsub_zha_event"] = unsub
+    # Slot schedules, recomputed from the store on every start
+    scheduler = domain_data["scheduler"] = ZLMScheduler(hass, store, queues)
+    scheduler.async_start()
 
-    return True
+    # Users spanning several locks, unfinished syncs are retried in the background
+    users = domain_data["users"] = ZLMUserManager(hass, store, queues)
+    users.async_start()
+
+    # Slot capacity read from the locks, in the background and one lock at a time
+    discovery = domain_data["discovery"] = ZLMDiscovery(hass, store)
+    discovery.async_start()
+
+    if (listener := domain_data.get("events")) is not None:
+        listener.async_update_managed()
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Unload a config entry, remove panel, unsubscribe events."""
+    """Unload a config entry, flush pending writes, remove panel, unsubscribe events."""
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+
+    if (scheduler := hass.data.get(DOMAIN, {}).pop("scheduler", None)) is not None:
+        scheduler.async_stop()
+
+    if (users := hass.data.get(DOMAIN, {}).pop("users", None)) is not None:
+        users.async_stop()
+
+    if (discovery := hass.data.get(DOMAIN, {}).pop("discovery", None)) is not None:
+        discovery.async_stop()
+
+    if (queues := hass.data.get(DOMAIN, {}).pop("queues", None)) is not None:
+        queues.async_shutdown()
+
+    # Import sessions hold the old store and queues, and a passphrase key
+    async_close_imports(hass)
+
+    # Not there yet when the entry is unloaded while the store still loads
+    store: ZLMLocalStore | None = hass.data.get(DOMAIN, {}).pop("store", None)
+    if store is not None:
+        store.async_stop_key_rotation()
+        await store.async_flush()
+
+    if (unsub := hass.data.get(DOMAIN, {}).pop("unsub_panel", None)):
+        unsub()
+
     try:
         async_remove_panel(hass, PANEL_URL_PATH)
     except Exception:
@@ -167,6 +221,9 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         except Exception:
             pass
 
+    if (access_log := hass.data.get(DOMAIN, {}).pop("access_log", None)) is not None:
+        await access_log.async_stop()
+
     return True
 
 
@@ -183,6 +240,7 @@ async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
         store = ZLMLocalStore(hass)
         await store.async_load()
     await store.async_wipe()
+    await async_remove_access_log(hass)
 
     # Best effort: clear domain data
     hass.data.pop(DOMAIN, None)
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import timedelta
+from itertools import islice
+import json
+import logging
+from operator import attrgetter
+import os
+from typing import Any, NamedTuple, Optional
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ACCESS_LOG_SIZE,
+    ACCESS_LOG_FILE,
+    ACCESS_LOG_MAX_BYTES,
+    ACCESS_LOG_BACKUPS,
+    ACCESS_LOG_FLUSH_INTERVAL,
+    ACCESS_LOG_FLUSH_BATCH,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_time = attrgetter("time")
+
+
+class AccessEntry(NamedTuple):
+    """One lock operation event. `slot` is as the lock reports it, None if not given."""
+
+    time: float  # epoch seconds the event was fired
+    device_ieee: str
+    slot: Optional[int]
+    operation: str
+    source: str
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "time": dt_util.utc_from_timestamp(self.time).isoformat(),
+            "device_ieee": self.device_ieee,
+            "slot": self.slot,
+            "operation": self.operation,
+            "source": self.source,
+        }
+
+
+def _rotate(path: str) -> None:
+    for index in range(ACCESS_LOG_BACKUPS - 1, 0, -1):
+        if os.path.exists(f"{path}.{index}"):
+            os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def _append_lines(path: str, lines: list[str]) -> None:
+    """Append JSON lines, rotating the file first once it is over the size limit."""
+    if os.path.exists(path) and os.path.getsize(path) >= ACCESS_LOG_MAX_BYTES:
+        _rotate(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+    with os.fdopen(fd, "a", encoding="utf-8") as handle:
+        handle.writelines(lines)
+
+
+def _remove_files(path: str) -> None:
+    for name in (path, *(f"{path}.{index}" for index in range(1, ACCESS_LOG_BACKUPS + 1))):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            continue
+
+
+async def async_remove_access_log(hass: HomeAssistant) -> None:
+    """Delete the log file and its rotations, when the entry is removed."""
+    await hass.async_add_executor_job(_remove_files, hass.config.path(ACCESS_LOG_FILE))
+
+
+def _insert(queue: deque[AccessEntry], entry: AccessEntry) -> None:
+    """Append, or insert in time order when the entry is older than the newest one.
+
+    Events deferred while the store loaded are recorded late with their
+    original time, queries bisect on time so the order must hold.
+    """
+    if queue and entry.time < queue[-1].time:
+        queue.insert(bisect_right(queue, entry.time, key=_time), entry)
+    else:
+        queue.append(entry)
+
+
+def _read_tail(path: str) -> list[AccessEntry]:
+    """The last ACCESS_LOG_SIZE entries from the current file and the newest rotation."""
+    tail: deque[AccessEntry] = deque(maxlen=ACCESS_LOG_SIZE)
+    for name in (f"{path}.1", path):
+        try:
+            with open(name, encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        raw = json.loads(line)
+                        tail.append(
+                            AccessEntry(
+                                float(raw["t"]), raw["d"], raw.get("s"), raw["o"], raw["src"]
+                            )
+                        )
+                    except (ValueError, KeyError, TypeError):
+                        continue  # torn last line after a crash
+        except FileNotFoundError:
+            continue
+    return list(tail)
+
+
+class ZLMAccessLog:
+    """Append-only log of lock operation events.
+
+    The newest ACCESS_LOG_SIZE entries are kept in a ring buffer, with a deque
+    per lock holding the same entries, so a query for one lock only walks that
+    lock's events and a time range is found by bisection. When the ring is full
+    the oldest entry is also popped from its lock's deque, so memory stays at
+    ACCESS_LOG_SIZE entries however long Home Assistant runs.
+
+    New entries are written in batches to a JSON lines file under the config
+    directory, separate from the store and rotated by size. The tail of the
+    file is read back at start so a restart keeps recent history queryable.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self.path = hass.config.path(ACCESS_LOG_FILE)
+        self._entries: deque[AccessEntry] = deque(maxlen=ACCESS_LOG_SIZE)
+        self._by_lock: dict[str, deque[AccessEntry]] = {}
+        self._pending: list[str] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._unsub_flush: Optional[CALLBACK_TYPE] = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0  # pending lines given up after failed writes
+
+    @callback
+    def async_start(self) -> None:
+        self._unsub_flush = async_track_time_interval(
+            self.hass, self._async_flush_interval, timedelta(seconds=ACCESS_LOG_FLUSH_INTERVAL)
+        )
+        self.hass.async_create_background_task(
+            self._async_load_tail(), "zha_lock_manager access log"
+        )
+
+    async def async_stop(self) -> None:
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        await self.async_flush()
+
+    async def _async_load_tail(self) -> None:
+        tail = await self.hass.async_add_executor_job(_read_tail, self.path)
+        if not tail:
+            return
+        # Events recorded while the file was read are newer than its tail
+        recent = list(self._entries)
+        self._entries.clear()
+        self._by_lock.clear()
+        for entry in (*tail, *recent):
+            self._append(entry)
+
+    def _append(self, entry: AccessEntry) -> None:
+        entries = self._entries
+        if len(entries) == entries.maxlen:
+            if entry.time < entries[0].time:
+                return  # older than anything the ring still holds
+            oldest = entries[0]
+            by_lock = self._by_lock[oldest.device_ieee]
+            by_lock.popleft()
+            if not by_lock:
+                del self._by_lock[oldest.device_ieee]
+        _insert(entries, entry)
+        _insert(self._by_lock.setdefault(entry.device_ieee, deque()), entry)
+
+    @callback
+    def async_record(
+        self, fired: float, device_ieee: str, slot: Optional[int], operation: str, source: str
+    ) -> None:
+        entry = AccessEntry(fired, device_ieee, slot, operation, source)
+        self._append(entry)
+        self.recorded += 1
+        self._pending.append(
+            json.dumps(
+                {"t": fired, "d": device_ieee, "s": slot, "o": operation, "src": source},
+                separators=(",", ":"),
+            )
+            + "\n"
+        )
+        if len(self._pending) >= ACCESS_LOG_FLUSH_BATCH and self._flush_task is None:
+            self._flush_task = self.hass.async_create_background_task(
+                self.async_flush(), "zha_lock_manager access log flush"
+            )
+            self._flush_task.add_done_callback(self._flush_done)
+
+    @callback
+    def _flush_done(self, _task: asyncio.Task) -> None:
+        self._flush_task = None
+
+    async def _async_flush_interval(self, _now: Any) -> None:
+        await self.async_flush()
+
+    async def async_flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            lines, self._pending = self._pending, []
+            try:
+                await self.hass.async_add_executor_job(_append_lines, self.path, lines)
+            except OSError as err:
+                _LOGGER.warning("ZLM: Writing the access log failed: %s", err)
+                # Retry with the next flush, but never hold more than the ring size
+                pending = lines + self._pending
+                self.dropped += max(0, len(pending) - ACCESS_LOG_SIZE)
+                self._pending = pending[-ACCESS_LOG_SIZE:]
+                return
+            self.written += len(lines)
+
+    def query(
+        self,
+        device_ieee: Optional[str] = None,
+        slot: Optional[int] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: int = 100,
+    ) -> list[AccessEntry]:
+        """Newest first. `start` is inclusive and `end` exclusive, both epoch seconds."""
+        if device_ieee is not None:
+            source = self._by_lock.get(device_ieee) or deque()
+        else:
+            source = self._entries
+        size = len(source)
+        lo = bisect_left(source, start, key=_time) if start is not None else 0
+        hi = bisect_left(source, end, key=_time) if end is not None else size
+        out: list[AccessEntry] = []
+        for entry in islice(reversed(source), size - hi, size - lo):
+            if slot is not None and entry.slot != slot:
+                continue
+            out.append(entry)
+            if len(out) >= limit:
+                break
+        return out
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "recorded": self.recorded,
+            "written": self.written,
+            "pending": len(self._pending),
+            "dropped": self.dropped,
+        }
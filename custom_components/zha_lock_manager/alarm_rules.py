@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from types import MappingProxyType
+from typing import Any, Mapping, NamedTuple
+
+from .storage import Lock
+
+# Stored rule per lock, every key optional:
+#   {"disarm": bool, "entity_id": alarm panel, "" for the global one,
+#    "arm_states": only disarm from these panel states, empty for any,
+#    "never_disarm": [slot, ...] as numbered in the panel}
+
+
+class AlarmRoute(NamedTuple):
+    """Where a keypad unlock from one slot goes."""
+
+    entity_id: str
+    arm_states: frozenset[str]  # empty: disarm whatever the panel state
+
+
+def normalize_rule(data: Mapping[str, Any]) -> dict[str, Any]:
+    """Turn a validated WS payload into the stored form."""
+    return {
+        "disarm": bool(data.get("disarm", True)),
+        "entity_id": data.get("entity_id") or "",
+        "arm_states": sorted(set(data.get("arm_states", []))),
+        "never_disarm": sorted(set(int(slot) for slot in data.get("never_disarm", []))),
+    }
+
+
+def compile_routes(
+    locks: Mapping[str, Lock],
+    rules: Mapping[str, Mapping[str, Any]],
+    enabled: bool,
+    default_entity_id: str,
+) -> Mapping[tuple[str, int], AlarmRoute]:
+    """Flatten the options and per-lock rules into one read-only table.
+
+    Keys are (device_ieee, slot) with the slot as the lock reports it, which is
+    the panel numbering. Slots that must not disarm have no entry, so the event
+    path needs a single lookup.
+    """
+    table: dict[tuple[str, int], AlarmRoute] = {}
+    if enabled:
+        for ieee, lock in locks.items():
+            rule = rules.get(ieee, {})
+            entity_id = rule.get("entity_id") or default_entity_id
+            if not rule.get("disarm", True) or not entity_id:
+                continue
+            route = AlarmRoute(entity_id, frozenset(rule.get("arm_states", ())))
+            never = frozenset(rule.get("never_disarm", ()))
+            for slot in range(1, int(lock.max_slots) + 1):
+                if slot not in never:
+                    table[(ieee, slot)] = route
+    return MappingProxyType(table)
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+from typing import Any, AsyncIterator, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from .command_queue import JOB_FAILED, ZLMCommandQueues
+from .const import (
+    ACTION_SET,
+    ACTION_ENABLE,
+    ACTION_DISABLE,
+    ACTION_CLEAR,
+    BACKUP_FORMAT,
+    BACKUP_VERSION,
+    BACKUP_CHUNK_SLOTS,
+)
+from .storage import Lock, ZLMLocalStore
+
+# Archive layout, one line per record:
+#   1. plain JSON header with the format, version and KDF parameters
+#   2. Fernet tokens, each a JSON chunk with part of one lock's slots
+#   3. a Fernet token with {"end": true, "chunks": n}, so truncation is detected
+# Every token is made with a key derived from the passphrase.
+
+SCRYPT_N = 2**15
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+class BackupError(HomeAssistantError):
+    """Archive cannot be read, wrong passphrase or corrupt data."""
+
+
+def _derive_fernet(passphrase: str, salt: bytes, n: int, r: int, p: int) -> Fernet:
+    kdf = Scrypt(salt=salt, length=32, n=n, r=r, p=p)
+    return Fernet(base64.urlsafe_b64encode(kdf.derive(passphrase.encode())))
+
+
+def _encrypt_record(fernet: Fernet, record: dict[str, Any]) -> str:
+    return fernet.encrypt(json.dumps(record, separators=(",", ":")).encode()).decode()
+
+
+def _decrypt_record(fernet: Fernet, line: str) -> dict[str, Any]:
+    try:
+        return json.loads(fernet.decrypt(line.strip().encode()))
+    except (InvalidToken, ValueError) as err:
+        raise BackupError("Wrong passphrase or corrupt archive") from err
+
+
+async def async_export_lines(
+    hass: HomeAssistant, store: ZLMLocalStore, passphrase: str
+) -> AsyncIterator[str]:
+    """Yield the archive line by line, only one chunk of codes is in memory at a time."""
+    salt = os.urandom(16)
+    fernet = await hass.async_add_executor_job(
+        _derive_fernet, passphrase, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P
+    )
+    yield json.dumps(
+        {
+            "format": BACKUP_FORMAT,
+            "version": BACKUP_VERSION,
+            "created": dt_util.utcnow().isoformat(),
+            "kdf": "scrypt",
+            "salt": base64.b64encode(salt).decode(),
+            "n": SCRYPT_N,
+            "r": SCRYPT_R,
+            "p": SCRYPT_P,
+        }
+    )
+
+    chunks = 0
+    await store.async_load_locks()
+    for lock in list(store.locks.values()):
+        slots = list(lock.slots)
+        # A lock without slots still gets one chunk so its settings are kept
+        for start in range(0, max(len(slots), 1), BACKUP_CHUNK_SLOTS):
+            part = slots[start : start + BACKUP_CHUNK_SLOTS]
+            codes = await store.async_get_plain_codes(lock, part)
+            record = {
+                "device_ieee": lock.device_ieee,
+                "name": lock.name,
+                "entity_id": lock.entity_id,
+                "max_slots": lock.max_slots,
+                "slot_offset": lock.slot_offset,
+                "slots": [
+                    {
+                        "slot": slot,
+                        "label": lock.slots[slot].label,
+                        "enabled": lock.slots[slot].enabled,
+                        "code": codes[slot],
+                    }
+                    for slot in part
+                ],
+            }
+            yield await hass.async_add_executor_job(_encrypt_record, fernet, record)
+            chunks += 1
+
+    yield await hass.async_add_executor_job(
+        _encrypt_record, fernet, {"end": True, "chunks": chunks}
+    )
+
+
+class BackupImporter:
+    """Apply an archive fed line by line. Applying the same archive twice is a no-op."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        store: ZLMLocalStore,
+        queues: Optional[ZLMCommandQueues],
+        passphrase: str,
+    ) -> None:
+        self.hass = hass
+        self.store = store
+        self.queues = queues  # when set, changed slots are also written to the locks
+        self._passphrase = passphrase
+        self._fernet: Optional[Fernet] = None
+        self.chunks = 0
+        self.finished = False
+        self.stats = {"changed": 0, "unchanged": 0, "skipped_locks": 0, "failed": 0}
+
+    async def async_feed(self, line: str) -> None:
+        line = line.strip()
+        if not line:
+            return
+        if self.finished:
+            raise BackupError("Data after the end of the archive")
+        if self._fernet is None:
+            await self._async_read_header(line)
+            return
+        record = await self.hass.async_add_executor_job(_decrypt_record, self._fernet, line)
+        if record.get("end"):
+            if record.get("chunks") != self.chunks:
+                raise BackupError("Archive is incomplete")
+            self.finished = True
+            return
+        self.chunks += 1
+        await self._async_apply(record)
+
+    async def _async_read_header(self, line: str) -> None:
+        try:
+            header = json.loads(line)
+        except ValueError as err:
+            raise BackupError("Not a lock manager archive") from err
+        if not isinstance(header, dict) or header.get("format") != BACKUP_FORMAT:
+            raise BackupError("Not a lock manager archive")
+        if header.get("version", 0) > BACKUP_VERSION:
+            raise BackupError("Archive was made by a newer version")
+        try:
+            salt = base64.b64decode(header["salt"], validate=True)
+            params = (int(header["n"]), int(header["r"]), int(header["p"]))
+        except (KeyError, TypeError, ValueError) as err:  # binascii.Error is a ValueError
+            raise BackupError("Not a lock manager archive") from err
+        # The archive chooses the KDF cost, only ours is accepted so a crafted
+        # header cannot make the derivation eat memory or CPU
+        if not salt or header.get("kdf") != "scrypt" or params != (SCRYPT_N, SCRYPT_R, SCRYPT_P):
+            raise BackupError("Unsupported key derivation settings")
+        self._fernet = await self.hass.async_add_executor_job(
+            _derive_fernet, self._passphrase, salt, *params
+        )
+
+    async def _async_apply(self, record: dict[str, Any]) -> None:
+        store = self.store
+        lock = await store.async_get_lock(record["device_ieee"])
+        if lock is None:
+            # Only locks selected in the integration options are managed
+            self.stats["skipped_locks"] += 1
+            return
+        store.update_lock_meta(
+            lock,
+            name=record.get("name"),
+            max_slots=record.get("max_slots"),
+            slot_offset=record.get("slot_offset"),
+        )
+
+        entries = record["slots"]
+        current = await store.async_get_plain_codes(lock, [e["slot"] for e in entries])
+        # New codes of the record are encrypted in one go, off the event loop
+        new = [e for e in entries if e.get("code") and e["code"] != current[e["slot"]]]
+        tokens = dict(
+            zip(
+                (e["slot"] for e in new),
+                await store.async_encrypt_many([e["code"] for e in new]),
+            )
+        )
+        # Slots of one lock are queued together, the lock's queue keeps them serial
+        await asyncio.gather(
+            *(
+                self._async_apply_slot(
+                    lock, entry, current[entry["slot"]], tokens.get(entry["slot"])
+                )
+                for entry in entries
+            )
+        )
+
+    async def _async_apply_slot(
+        self,
+        lock: Lock,
+        entry: dict[str, Any],
+        current_code: str | None,
+        token: str | None,
+    ) -> None:
+        slot = int(entry["slot"])
+        code = entry.get("code")
+        s = lock.slots.get(slot)
+        if code != current_code:
+            await self._async_write(lock, slot, code, entry, token)
+        elif code and (s.label != entry["label"] or s.enabled != entry["enabled"]):
+            if s.enabled != entry["enabled"]:
+                action = ACTION_ENABLE if entry["enabled"] else ACTION_DISABLE
+                await self._async_write_action(lock, slot, action)
+            self.store.set_label(lock, slot, entry["label"])
+            self.stats["changed"] += 1
+        else:
+            self.stats["unchanged"] += 1
+
+    async def _async_write(
+        self, lock: Lock, slot: int, code: str | None, entry: dict[str, Any], token: str | None
+    ) -> None:
+        if not code:
+            await self._async_write_action(lock, slot, ACTION_CLEAR)
+            self.stats["changed"] += 1
+            return
+        if self.queues is None:
+            self.store.set_code(
+                lock, slot, code, label=entry["label"], enabled=entry["enabled"], token=token
+            )
+        else:
+            if not await self._async_push(lock, slot, ACTION_SET, code, entry["label"], token):
+                return
+            if not entry["enabled"]:
+                await self._async_push(lock, slot, ACTION_DISABLE)
+        self.stats["changed"] += 1
+
+    async def _async_write_action(self, lock: Lock, slot: int, action: str) -> None:
+        if self.queues is not None:
+            await self._async_push(lock, slot, action)
+        elif action == ACTION_CLEAR:
+            self.store.clear_code(lock, slot)
+        else:
+            self.store.set_enabled(lock, slot, action == ACTION_ENABLE)
+
+    async def _async_push(
+        self,
+        lock: Lock,
+        slot: int,
+        action: str,
+        code: str | None = None,
+        label: str = "",
+        token: str | None = None,
+    ) -> bool:
+        assert self.queues is not None
+        job = self.queues.async_enqueue(
+            lock, action, slot, code=code, label=label, flush=False, token=token
+        )
+        await job.future
+        if job.status == JOB_FAILED:
+            self.stats["failed"] += 1
+            return False
+        return True
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from .const import DEFAULT_CODE_CACHE_SIZE, DEFAULT_CODE_CACHE_TTL
+
+
+class CodeCache:
+    """Bounded LRU of decrypted codes, entries expire after a TTL.
+
+    Plain codes only live here for a limited time, the store keeps the encrypted
+    tokens as the source of truth.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_CODE_CACHE_SIZE,
+        ttl: float = DEFAULT_CODE_CACHE_TTL,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, str]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+import logging
+import random
+import time
+from typing import Any, Optional
+import uuid
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .const import (
+    ACTION_SERVICES,
+    ACTION_SET,
+    ACTION_ENABLE,
+    ACTION_DISABLE,
+    ACTION_CLEAR,
+    QUEUE_MAX_ATTEMPTS,
+    QUEUE_BACKOFF_BASE,
+    QUEUE_BACKOFF_MAX,
+    QUEUE_JOB_HISTORY,
+    SIGNAL_JOB_UPDATE,
+)
+from .metrics import ZLMMetrics
+from .storage import Lock, ZLMLocalStore
+from .zigbee import async_call_lock_service
+
+_LOGGER = logging.getLogger(__name__)
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_MERGED = "merged"  # superseded by a later job on the same slot, or already in effect
+
+_TOGGLES = (ACTION_ENABLE, ACTION_DISABLE)
+
+
+async def async_apply_action(
+    hass: HomeAssistant,
+    store: ZLMLocalStore,
+    lock: Lock,
+    action: str,
+    slot: int,
+    code: str | None = None,
+    label: str = "",
+    token: str | None = None,
+    interactive: bool = False,
+) -> None:
+    """Write one slot action to the lock through ZHA, then update the store.
+
+    `slot` already has the lock offset applied, `token` is the code encrypted
+    ahead of time by bulk callers. The store schedules a delayed save,
+    callers flush when they need the change on disk before replying.
+    `interactive` writes go ahead of background ones at the rate limiter.
+    """
+    if action not in ACTION_SERVICES:
+        raise ValueError(f"Unknown action {action}")
+    data: dict[str, Any] = {"code_slot": slot}
+    if action == ACTION_SET:
+        data["user_code"] = code
+    try:
+        await async_call_lock_service(
+            hass, lock, ACTION_SERVICES[action], data, interactive=interactive
+        )
+    except Exception:
+        # The lock may or may not have applied it, let reconciliation check
+        store.mark_suspect(lock, slot)
+        raise
+
+    if action == ACTION_SET:
+        store.set_code(lock, slot, code, label=label, enabled=True, token=token)
+    elif action == ACTION_ENABLE:
+        store.set_enabled(lock, slot, True)
+    elif action == ACTION_DISABLE:
+        store.set_enabled(lock, slot, False)
+    else:
+        store.clear_code(lock, slot)
+
+
+def _is_retryable(err: Exception) -> bool:
+    if isinstance(err, ServiceValidationError):
+        return False
+    return isinstance(err, (asyncio.TimeoutError, HomeAssistantError))
+
+
+@dataclass
+class Job:
+    """One queued Zigbee write. `slot` has the lock offset applied."""
+
+    device_ieee: str
+    action: str
+    slot: int
+    code: Optional[str] = field(default=None, repr=False)
+    label: str = ""
+    token: Optional[str] = field(default=None, repr=False)  # pre-encrypted code
+    update_store: bool = True  # False for repairs that only push stored state
+    flush: bool = True  # flush the store after set/clear, bulk callers flush once
+    interactive: bool = False  # started from the panel, served first by the rate limiter
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = JOB_QUEUED
+    error: Optional[str] = None
+    attempts: int = 0
+    created: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+    future: asyncio.Future = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future(), repr=False
+    )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "device_ieee": self.device_ieee,
+            "action": self.action,
+            "slot": self.slot,
+            "status": self.status,
+            "error": self.error,
+            "attempts": self.attempts,
+        }
+
+
+class LockCommandQueue:
+    """Serial worker for one lock. Only one Zigbee write per lock is in flight."""
+
+    def __init__(self, manager: ZLMCommandQueues, device_ieee: str) -> None:
+        self.manager = manager
+        self.device_ieee = device_ieee
+        self.pending: deque[Job] = deque()
+        self.current: Optional[Job] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Metrics
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.merged = 0
+        self.last_latency: Optional[float] = None
+        self._latency_total = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self.pending) + (1 if self.current else 0)
+
+    @callback
+    def async_start(self) -> None:
+        if self._task is None:
+            self._task = self.manager.hass.async_create_background_task(
+                self._async_run(), f"zha_lock_manager queue {self.device_ieee}"
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.current is not None:
+            self.manager.finish(self, self.current, JOB_FAILED, "Queue stopped")
+            self.current = None
+        for job in self.pending:
+            self.manager.finish(self, job, JOB_FAILED, "Queue stopped")
+        self.pending.clear()
+
+    @callback
+    def async_put(self, job: Job) -> None:
+        """Queue a job, merging it with redundant pending work on the same slot."""
+        store = self.manager.store
+        for queued in list(self.pending):
+            if queued.slot != job.slot or not queued.update_store or not job.update_store:
+                continue
+            # A later toggle replaces a pending toggle, a later set or clear
+            # replaces anything still pending on that slot
+            if (job.action in _TOGGLES and queued.action in _TOGGLES) or job.action in (
+                ACTION_SET,
+                ACTION_CLEAR,
+            ):
+                self.pending.remove(queued)
+                self.manager.finish(self, queued, JOB_MERGED)
+
+        if job.action in _TOGGLES and job.update_store:
+            ahead = any(q.slot == job.slot for q in self.pending) or (
+                self.current is not None and self.current.slot == job.slot
+            )
+            lock = store.get_lock(self.device_ieee)
+            s = lock.slots.get(job.slot) if lock else None
+            if not ahead and s is not None and s.code_encrypted:
+                if s.enabled == (job.action == ACTION_ENABLE):
+                    # Already in effect on the lock, nothing to send
+                    self.manager.finish(self, job, JOB_MERGED)
+                    return
+
+        self.pending.append(job)
+        self._wakeup.set()
+        self.async_start()
+
+    async def _async_run(self) -> None:
+        while True:
+            if not self.pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            job = self.pending.popleft()
+            self.current = job
+            try:
+                await self._async_execute(job)
+            except Exception as err:  # noqa: BLE001 - e.g. the flush failed, keep the worker alive
+                _LOGGER.exception("ZLM: %s slot %s on %s failed", job.action, job.slot, job.device_ieee)
+                if not job.future.done():
+                    self.manager.finish(self, job, JOB_FAILED, str(err) or type(err).__name__)
+            finally:
+                self.current = None
+
+    async def _async_execute(self, job: Job) -> None:
+        manager = self.manager
+        store = manager.store
+        job.status = JOB_RUNNING
+        manager.announce(job)
+        while True:
+            lock = store.get_lock(job.device_ieee)
+            if lock is None:
+                manager.finish(self, job, JOB_FAILED, "Unknown lock")
+                return
+            job.attempts += 1
+            started = time.perf_counter()
+            try:
+                if job.update_store:
+                    await async_apply_action(
+                        manager.hass,
+                        store,
+                        lock,
+                        job.action,
+                        job.slot,
+                        job.code,
+                        job.label,
+                        job.token,
+                        job.interactive,
+                    )
+                else:
+                    data: dict[str, Any] = {"code_slot": job.slot}
+                    if job.action == ACTION_SET:
+                        data["user_code"] = job.code
+                    await async_call_lock_service(
+                        manager.hass,
+                        lock,
+                        ACTION_SERVICES[job.action],
+                        data,
+                        interactive=job.interactive,
+                    )
+            except Exception as err:  # noqa: BLE001 - the job carries the error
+                manager.record_attempt(job, time.perf_counter() - started, False)
+                if job.attempts < QUEUE_MAX_ATTEMPTS and _is_retryable(err):
+                    self.retries += 1
+                    delay = min(QUEUE_BACKOFF_MAX, QUEUE_BACKOFF_BASE * 2 ** (job.attempts - 1))
+                    delay += random.uniform(0, delay / 2)
+                    _LOGGER.debug(
+                        "ZLM: %s slot %s on %s failed (%s), retry in %.1fs",
+                        job.action,
+                        job.slot,
+                        job.device_ieee,
+                        err,
+                        delay,
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                manager.finish(self, job, JOB_FAILED, str(err) or type(err).__name__)
+                return
+            manager.record_attempt(job, time.perf_counter() - started, True)
+            break
+
+        if job.update_store and job.flush and job.action in (ACTION_SET, ACTION_CLEAR):
+            # Code material changed, get it on disk before reporting success
+            await store.async_flush()
+        manager.finish(self, job, JOB_DONE)
+
+    def stats(self) -> dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "depth": self.depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "merged": self.merged,
+            "last_latency": self.last_latency,
+            "avg_latency": (self._latency_total / finished) if finished else None,
+        }
+
+
+class ZLMCommandQueues:
+    """Per-lock Zigbee command queues plus a short history of finished jobs."""
+
+    def __init__(
+        self, hass: HomeAssistant, store: ZLMLocalStore, metrics: Optional[ZLMMetrics] = None
+    ) -> None:
+        self.hass = hass
+        self.store = store
+        self.metrics = metrics
+        self.queues: dict[str, LockCommandQueue] = {}
+        self.jobs: dict[str, Job] = {}
+        self._history: deque[str] = deque()
+
+    @callback
+    def async_enqueue(
+        self,
+        lock: Lock,
+        action: str,
+        slot: int,
+        code: str | None = None,
+        label: str = "",
+        update_store: bool = True,
+        flush: bool = True,
+        token: str | None = None,
+        interactive: bool = False,
+    ) -> Job:
+        job = Job(
+            device_ieee=lock.device_ieee,
+            action=action,
+            slot=slot,
+            code=code,
+            label=label,
+            token=token,
+            update_store=update_store,
+            flush=flush,
+            interactive=interactive,
+        )
+        self.jobs[job.job_id] = job
+        queue = self.queues.get(lock.device_ieee)
+        if queue is None:
+            queue = self.queues[lock.device_ieee] = LockCommandQueue(self, lock.device_ieee)
+        queue.async_put(job)
+        return job
+
+    @callback
+    def announce(self, job: Job) -> None:
+        async_dispatcher_send(self.hass, SIGNAL_JOB_UPDATE, job.as_dict())
+
+    @callback
+    def record_attempt(self, job: Job, seconds: float, ok: bool) -> None:
+        if self.metrics is not None:
+            self.metrics.record_write(job.device_ieee, seconds, ok)
+
+    @callback
+    def finish(
+        self, queue: LockCommandQueue, job: Job, status: str, error: str | None = None
+    ) -> None:
+        job.status = status
+        job.error = error
+        job.code = job.token = None  # do not keep codes around longer than needed
+        job.finished = time.monotonic()
+        if status == JOB_MERGED:
+            queue.merged += 1
+        else:
+            latency = job.finished - job.created
+            queue.last_latency = latency
+            queue._latency_total += latency
+            if status == JOB_DONE:
+                queue.completed += 1
+            else:
+                queue.failed += 1
+        if not job.future.done():
+            job.future.set_result(job)
+        self.announce(job)
+
+        # Keep a bounded history of finished jobs for zlm/get_job
+        self._history.append(job.job_id)
+        while len(self._history) > QUEUE_JOB_HISTORY:
+            self.jobs.pop(self._history.popleft(), None)
+
+    @callback
+    def async_shutdown(self) -> None:
+        for queue in self.queues.values():
+            queue.async_stop()
+        self.queues.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {ieee: queue.stats() for ieee, queue in self.queues.items()}
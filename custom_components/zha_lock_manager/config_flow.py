@@ -14,6 +14,15 @@ from .const import (
     CONF_LOCKS,
     CONF_ALARMO_ENABLED,
     CONF_ALARMO_ENTITY_ID,
+    CONF_SAVE_DELAY,
+    DEFAULT_SAVE_DELAY,
+    CONF_EVENT_DEDUP_WINDOW,
+    DEFAULT_EVENT_DEDUP_WINDOW,
+    CONF_ZIGBEE_RATE,
+    DEFAULT_ZIGBEE_RATE,
+    CONF_ZIGBEE_BURST,
+    DEFAULT_ZIGBEE_BURST,
+    DEFAULT_MAX_SLOTS,
     DEFAULT_SLOT_OFFSET,
 )
 
@@ -41,8 +50,9 @@ def _entity_to_lock_dict(hass: HomeAssistant, entity_id: str) -> dict[str, Any]
         "name": device.name or ent.original_name or ent.entity_id,
         "entity_id": ent.entity_id,
         "device_ieee": ieee or "",
-        # The panel manages these per lock. Keep defaults here only for new locks.
-        "max_slots": 30,
+        # The panel manages these per lock. Keep defaults here only for new locks,
+        # max_slots follows the lock once it reports its capacity.
+        "max_slots": DEFAULT_MAX_SLOTS,
         "slot_offset": DEFAULT_SLOT_OFFSET,
     }
 
@@ -132,6 +142,12 @@ class ZLMOptionsFlowHandler(config_entries.OptionsFlow):
         default_entities = list(by_entity.keys())
         alarmo_enabled_default = self.config_entry.options.get(CONF_ALARMO_ENABLED, False)
         alarmo_entity_default = self.config_entry.options.get(CONF_ALARMO_ENTITY_ID, "")
+        save_delay_default = self.config_entry.options.get(CONF_SAVE_DELAY, DEFAULT_SAVE_DELAY)
+        dedup_default = self.config_entry.options.get(
+            CONF_EVENT_DEDUP_WINDOW, DEFAULT_EVENT_DEDUP_WINDOW
+        )
+        rate_default = self.config_entry.options.get(CONF_ZIGBEE_RATE, DEFAULT_ZIGBEE_RATE)
+        burst_default = self.config_entry.options.get(CONF_ZIGBEE_BURST, DEFAULT_ZIGBEE_BURST)
 
         fields: dict[Any, Any] = {
             # Let users add or remove managed locks in the future
@@ -150,6 +166,21 @@ class ZLMOptionsFlowHandler(config_entries.OptionsFlow):
             ): selector.EntitySelector(
                 selector.EntitySelectorConfig(domain="alarm_control_panel")
             ),
+            # How long to coalesce store writes, in seconds
+            vol.Optional(CONF_SAVE_DELAY, default=save_delay_default): vol.All(
+                vol.Coerce(int), vol.Range(min=0, max=300)
+            ),
+            # Drop repeated keypad unlock frames within this many seconds, 0 to keep all
+            vol.Optional(CONF_EVENT_DEDUP_WINDOW, default=dedup_default): vol.All(
+                vol.Coerce(float), vol.Range(min=0, max=30)
+            ),
+            # Zigbee commands per second per coordinator, 0 for no limit
+            vol.Optional(CONF_ZIGBEE_RATE, default=rate_default): vol.All(
+                vol.Coerce(float), vol.Range(min=0, max=50)
+            ),
+            vol.Optional(CONF_ZIGBEE_BURST, default=burst_default): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=100)
+            ),
         }
 
         if user_input is not None:
@@ -189,6 +220,14 @@ class ZLMOptionsFlowHandler(config_entries.OptionsFlow):
                 data={
                     CONF_ALARMO_ENABLED: bool(user_input.get(CONF_ALARMO_ENABLED, False)),
                     CONF_ALARMO_ENTITY_ID: user_input.get(CONF_ALARMO_ENTITY_ID, ""),
+                    CONF_SAVE_DELAY: int(user_input.get(CONF_SAVE_DELAY, DEFAULT_SAVE_DELAY)),
+                    CONF_EVENT_DEDUP_WINDOW: float(
+                        user_input.get(CONF_EVENT_DEDUP_WINDOW, DEFAULT_EVENT_DEDUP_WINDOW)
+                    ),
+                    CONF_ZIGBEE_RATE: float(user_input.get(CONF_ZIGBEE_RATE, DEFAULT_ZIGBEE_RATE)),
+                    CONF_ZIGBEE_BURST: int(
+                        user_input.get(CONF_ZIGBEE_BURST, DEFAULT_ZIGBEE_BURST)
+                    ),
                 },
             )
 
@@ -1,8 +1,12 @@
+from homeassistant.const import Platform
+
 DOMAIN = "zha_lock_manager"
-PLATFORMS: list[str] = []  # no entities; UI-only + storage + WS API
+PLATFORMS: list[Platform] = [Platform.SENSOR]  # diagnostic sensors only
 
 STORAGE_KEY = DOMAIN
-STORAGE_VERSION = 1
+STORAGE_VERSION = 2  # 2: slots moved out of the index into one file per lock
+LOCK_STORAGE_PREFIX = f"{DOMAIN}.lock_"  # + device_ieee without colons
+LOCK_STORAGE_VERSION = 1
 
 KEY_STORAGE_KEY = f"{DOMAIN}_key"
 KEY_STORAGE_VERSION = 1
@@ -11,10 +15,116 @@ CONF_LOCKS = "locks"  # list of lock dicts
 CONF_ALARMO_ENABLED = "alarmo_enabled"
 CONF_ALARMO_ENTITY_ID = "alarmo_entity_id"
 
+CONF_SAVE_DELAY = "save_delay"  # seconds to coalesce store writes
+DEFAULT_SAVE_DELAY = 10
+
+# Repeats of the same keypad operation within this window are dropped
+CONF_EVENT_DEDUP_WINDOW = "event_dedup_window"  # seconds
+DEFAULT_EVENT_DEDUP_WINDOW = 2.0
+
+# Codes per executor job for batch encrypt and decrypt
+CRYPTO_CHUNK_SIZE = 50
+
+# Decrypted code cache used by the keypad unlock path
+DEFAULT_CODE_CACHE_SIZE = 256
+DEFAULT_CODE_CACHE_TTL = 3600  # seconds
+
 CONF_SLOT_OFFSET = "slot_offset"  # optional per-lock offset fix
 DEFAULT_SLOT_OFFSET = 0
 
+# Slots per lock until the lock reports how many PIN users it supports
+DEFAULT_MAX_SLOTS = 30
+
+SIGNAL_STORE_DELTA = f"{DOMAIN}_store_delta"
+SIGNAL_JOB_UPDATE = f"{DOMAIN}_job_update"
+SIGNAL_METRICS_UPDATE = f"{DOMAIN}_metrics_update"
+SIGNAL_USER_UPDATE = f"{DOMAIN}_user_update"
+SIGNAL_ALARM_RULES_UPDATE = f"{DOMAIN}_alarm_rules_update"
+
+# Latency samples kept per operation for percentiles
+METRICS_WINDOW = 200
+
 EVENT_ZHA = "zha_event"
+ZHA_COMMAND_OPERATION_EVENT = "operation_event_notification"
+
+ZHA_DOMAIN = "zha"
+
+# Max concurrent ZHA lock service calls per Zigbee coordinator
+DEFAULT_COORDINATOR_CONCURRENCY = 4
+
+# Token bucket per coordinator in front of every Zigbee command, rate 0 turns it off
+CONF_ZIGBEE_RATE = "zigbee_rate"  # commands per second
+DEFAULT_ZIGBEE_RATE = 4.0
+CONF_ZIGBEE_BURST = "zigbee_burst"  # commands sent back to back before the rate applies
+DEFAULT_ZIGBEE_BURST = 8
+
+# ZCL DoorLock cluster
+DOOR_LOCK_CLUSTER_ID = 0x0101
+USER_STATUS_AVAILABLE = 0
+USER_STATUS_ENABLED = 1
+USER_STATUS_DISABLED = 3
+# DoorLock attributes read by the capacity discovery, by the field they are stored as
+CAPACITY_ATTRIBUTES = {
+    "pin_users": 0x0012,  # number_of_pin_users_supported
+    "max_pin_length": 0x0017,
+    "min_pin_length": 0x0018,
+}
+
+# Lock capacity discovery
+CAPACITY_REFRESH_INTERVAL = 7 * 86400  # seconds before a lock's capacity is read again
+CAPACITY_CHECK_INTERVAL = 3600  # seconds between looks for missing or stale capacities
+
+# Reconciliation sweeps read slots in small batches with a pause in between
+RECONCILE_BATCH_SIZE = 5
+RECONCILE_BATCH_DELAY = 2.0  # seconds
+
+# Per-lock Zigbee command queue
+QUEUE_CALL_TIMEOUT = 30  # seconds per attempt, not counting the wait for a rate limit token
+QUEUE_MAX_ATTEMPTS = 4
+QUEUE_BACKOFF_BASE = 2.0  # seconds, doubled per attempt plus jitter
+QUEUE_BACKOFF_MAX = 60.0
+QUEUE_JOB_HISTORY = 200  # finished jobs kept for zlm/get_job
+
+# Slot schedules
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+SCHEDULE_END_DISABLE = "disable"
+SCHEDULE_END_CLEAR = "clear"
+SCHEDULE_RETRY_DELAY = 300  # seconds before a failed scheduled write is retried
+
+# Multi-lock users
+USER_SYNC_PENDING = "pending"
+USER_SYNC_DONE = "synced"
+USER_SYNC_FAILED = "failed"
+USER_RETRY_INTERVAL = 600  # seconds between retries of failed lock syncs
+
+# Access log of lock operation events
+ACCESS_LOG_SIZE = 5000  # entries kept in memory for zlm/query_log
+ACCESS_LOG_FILE = "zha_lock_manager_access.log"  # under the HA config directory
+ACCESS_LOG_MAX_BYTES = 1_000_000  # rotate the file beyond this size
+ACCESS_LOG_BACKUPS = 3  # rotated files kept, .1 is the newest
+ACCESS_LOG_FLUSH_INTERVAL = 60  # seconds between batched file writes
+ACCESS_LOG_FLUSH_BATCH = 200  # write early once this many entries are pending
+
+# Encrypted backup archives
+BACKUP_FORMAT = "zha_lock_manager_backup"
+BACKUP_VERSION = 1
+BACKUP_CHUNK_SLOTS = 50  # slots per encrypted record
+BACKUP_DIR = "zha_lock_manager_backups"  # under the HA config directory
+MIN_PASSPHRASE_LENGTH = 8
+IMPORT_SESSION_TIMEOUT = 600  # seconds an unfinished import waits for its next batch
+
+# Bulk slot actions
+ACTION_SET = "set"
+ACTION_ENABLE = "enable"
+ACTION_DISABLE = "disable"
+ACTION_CLEAR = "clear"
+BULK_ACTIONS = (ACTION_SET, ACTION_ENABLE, ACTION_DISABLE, ACTION_CLEAR)
+ACTION_SERVICES = {
+    ACTION_SET: "set_lock_user_code",
+    ACTION_ENABLE: "enable_lock_user_code",
+    ACTION_DISABLE: "disable_lock_user_code",
+    ACTION_CLEAR: "clear_lock_user_code",
+}
 
 # Frontend / panel
 PANEL_URL_BASE = "/zha-lock-manager-frontend"
@@ -33,4 +143,36 @@ WS_ENABLE_CODE = f"{WS_NS}/enable_code"
 WS_DISABLE_CODE = f"{WS_NS}/disable_code"
 WS_CLEAR_CODE = f"{WS_NS}/clear_code"
 WS_RENAME_CODE = f"{WS_NS}/rename_code"
-WS_SAVE_LOCK_META = f"{WS_NS}/save_lock_meta"  # name/slot_offset/max_slots
\ No newline at end of file
+WS_SAVE_LOCK_META = f"{WS_NS}/save_lock_meta"  # name/slot_offset/max_slots
+WS_BULK_APPLY = f"{WS_NS}/bulk_apply"
+WS_GET_STATS = f"{WS_NS}/get_stats"
+WS_SUBSCRIBE = f"{WS_NS}/subscribe"
+WS_RECONCILE = f"{WS_NS}/reconcile"
+WS_GET_JOB = f"{WS_NS}/get_job"
+WS_ROTATE_KEY = f"{WS_NS}/rotate_key"
+WS_KEY_ROTATION_STATUS = f"{WS_NS}/key_rotation_status"
+WS_EXPORT = f"{WS_NS}/export"
+WS_IMPORT = f"{WS_NS}/import"
+WS_SET_SCHEDULE = f"{WS_NS}/set_schedule"
+WS_LIST_USERS = f"{WS_NS}/list_users"
+WS_SAVE_USER = f"{WS_NS}/save_user"
+WS_DELETE_USER = f"{WS_NS}/delete_user"
+WS_GET_ALARM_RULES = f"{WS_NS}/get_alarm_rules"
+WS_SAVE_ALARM_RULE = f"{WS_NS}/save_alarm_rule"  # one lock
+WS_QUERY_LOG = f"{WS_NS}/query_log"
+
+# Alarm panel states a rule can require before disarming
+ALARM_ARM_STATES = (
+    "armed_home",
+    "armed_away",
+    "armed_night",
+    "armed_vacation",
+    "armed_custom_bypass",
+    "arming",
+    "pending",
+    "triggered",
+)
+
+# Services
+SERVICE_EXPORT = "export_codes"
+SERVICE_IMPORT = "import_codes"
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .zigbee import rate_limit_stats
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Counters and timings for a support dump. Codes and key material never go in."""
+    domain_data = hass.data.get(DOMAIN, {})
+    store = domain_data.get("store")
+    diag: dict[str, Any] = {
+        "options": dict(entry.options),
+        "locks": {},
+    }
+    if store is not None:
+        diag["revision"] = store.revision
+        diag["key_rotation"] = store.key_rotation_status()
+        await store.async_load_locks()
+        for ieee, lock in store.locks.items():
+            diag["locks"][ieee] = {
+                "name": lock.name,
+                "entity_id": lock.entity_id,
+                "max_slots": lock.max_slots,
+                "slot_offset": lock.slot_offset,
+                "slots": len(lock.slots),
+                "codes": sum(1 for _ in lock.slots.populated()),
+                "suspect_slots": sorted(store.suspect_slots(lock)),
+                "last_reconciled": lock.last_reconciled,
+                "capacity": lock.capacity,
+            }
+        statuses: dict[str, int] = {}
+        for user in store.users.values():
+            for state in (*user.assignments.values(), *user.revoking.values()):
+                statuses[state["status"]] = statuses.get(state["status"], 0) + 1
+        diag["users"] = {"count": len(store.users), "assignments": statuses}
+    if (metrics := domain_data.get("metrics")) is not None:
+        diag["metrics"] = metrics.as_dict()
+    if (queues := domain_data.get("queues")) is not None:
+        diag["queues"] = queues.stats()
+    if (listener := domain_data.get("events")) is not None:
+        diag["events"] = listener.stats()
+    if (access_log := domain_data.get("access_log")) is not None:
+        diag["access_log"] = access_log.stats()
+    if (discovery := domain_data.get("discovery")) is not None:
+        diag["discovery"] = discovery.stats()
+    diag["rate_limit"] = rate_limit_stats(hass)
+    return diag
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+import logging
+from typing import Any, Optional
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .const import CAPACITY_CHECK_INTERVAL, CAPACITY_REFRESH_INTERVAL, SIGNAL_STORE_DELTA
+from .storage import Lock, ZLMLocalStore, lock_capacity
+from .zigbee import async_read_lock_capacity
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _due(lock: Lock, now: datetime) -> bool:
+    read_at = dt_util.parse_datetime((lock.capacity or {}).get("read_at") or "")
+    return read_at is None or now - read_at >= timedelta(seconds=CAPACITY_REFRESH_INTERVAL)
+
+
+class ZLMDiscovery:
+    """Reads how many PIN users each lock supports from its DoorLock cluster.
+
+    Locks whose capacity was never read, or not for CAPACITY_REFRESH_INTERVAL,
+    are read one at a time as background Zigbee commands, so setup never waits
+    on a sleeping lock and panel writes keep their priority. A failed read is
+    tried again on the next check, every CAPACITY_CHECK_INTERVAL, and a newly
+    added lock is read right away.
+    """
+
+    def __init__(self, hass: HomeAssistant, store: ZLMLocalStore) -> None:
+        self.hass = hass
+        self.store = store
+        self._task: Optional[asyncio.Task] = None
+        self._unsub_check: Optional[CALLBACK_TYPE] = None
+        self._unsub_delta: Optional[CALLBACK_TYPE] = None
+        self.reads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    @callback
+    def async_start(self) -> None:
+        self._unsub_check = async_track_time_interval(
+            self.hass, self._async_check, timedelta(seconds=CAPACITY_CHECK_INTERVAL)
+        )
+        self._unsub_delta = async_dispatcher_connect(
+            self.hass, SIGNAL_STORE_DELTA, self._async_store_delta
+        )
+        self._async_check()
+
+    @callback
+    def async_stop(self) -> None:
+        for unsub in (self._unsub_check, self._unsub_delta):
+            if unsub is not None:
+                unsub()
+        self._unsub_check = self._unsub_delta = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @callback
+    def _async_store_delta(self, delta: dict[str, Any]) -> None:
+        if delta["slot"] is None and delta["changes"].get("added"):
+            self._async_check()
+
+    @callback
+    def _async_check(self, _now: Optional[datetime] = None) -> None:
+        # A running pass looks for due locks again before it ends
+        if self._task is None or self._task.done():
+            self._task = self.hass.async_create_background_task(
+                self._async_discover(), "zha_lock_manager discovery"
+            )
+
+    async def _async_discover(self) -> None:
+        tried: set[str] = set()
+        while True:
+            now = dt_util.utcnow()
+            due = [
+                ieee
+                for ieee, lock in self.store.locks.items()
+                if ieee not in tried and _due(lock, now)
+            ]
+            if not due:
+                return
+            for ieee in due:
+                tried.add(ieee)
+                await self._async_read(ieee)
+
+    async def _async_read(self, ieee: str) -> None:
+        try:
+            capacity = await async_read_lock_capacity(self.hass, ieee)
+        except HomeAssistantError as err:
+            self.failures += 1
+            self.last_error = str(err)
+            _LOGGER.debug("ZLM: Reading the capacity of %s failed: %s", ieee, err)
+            return
+        self.reads += 1
+        # Removed while the read was out
+        if (lock := self.store.get_lock(ieee)) is None:
+            return
+        self.store.set_capacity(lock, {**capacity, "read_at": dt_util.utcnow().isoformat()})
+        _LOGGER.debug("ZLM: Capacity of %s: %s", ieee, capacity)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "reads": self.reads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "unknown": sum(1 for lock in self.store.locks.values() if not lock_capacity(lock)["pin_users"]),
+        }
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Iterable, Mapping, Optional
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .access_log import ZLMAccessLog
+from .alarm_rules import AlarmRoute, compile_routes
+from .const import (
+    CONF_ALARMO_ENABLED,
+    CONF_ALARMO_ENTITY_ID,
+    CONF_EVENT_DEDUP_WINDOW,
+    DEFAULT_EVENT_DEDUP_WINDOW,
+    EVENT_ZHA,
+    SIGNAL_ALARM_RULES_UPDATE,
+    SIGNAL_STORE_DELTA,
+    ZHA_COMMAND_OPERATION_EVENT,
+)
+from .metrics import ZLMMetrics
+from .storage import ZLMLocalStore
+
+_LOGGER = logging.getLogger(__name__)
+
+# device_ieee -> (slot_offset, entity_id)
+LockIndex = Mapping[str, tuple[int, str]]
+
+
+def lock_index(lock_configs: Iterable[Mapping[str, Any]]) -> dict[str, tuple[int, str]]:
+    """Index the locks of entry.data, available before the store is loaded."""
+    return {
+        item["device_ieee"]: (int(item.get("slot_offset", 0)), item["entity_id"])
+        for item in lock_configs
+        if item.get("device_ieee") and item.get("entity_id") and item.get("name")
+    }
+
+
+class ZLMEventListener:
+    """Listen for ZHA lock operation events to optionally disarm Alarmo.
+
+    The bus filter runs for every zha_event in the house, so it only checks the
+    device against the index of managed locks and the command name. Anything
+    else never reaches the handler.
+
+    The listener starts from the lock index of the config entry, before the
+    store has loaded. An unlock that arrives while it is still loading, or
+    before its lock's file was read, waits for the load instead of being
+    dropped.
+
+    Some locks send the same operation event twice, or Zigbee retransmits it.
+    The same (device_ieee, slot, operation) within the dedup window of the
+    last accepted one is counted as a duplicate and not acted on. Every other
+    operation event, whatever its source, goes to the access log.
+
+    Where an unlock disarms comes from a table compiled from the options and
+    the per-lock alarm rules (alarm_rules.py). It is rebuilt when rules or
+    locks change, the event path only looks up (device_ieee, slot).
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        store: ZLMLocalStore,
+        metrics: Optional[ZLMMetrics] = None,
+        access_log: Optional[ZLMAccessLog] = None,
+    ) -> None:
+        self.hass = hass
+        self.entry = entry
+        self.store = store
+        self.metrics = metrics
+        self.access_log = access_log
+        self.managed: LockIndex = {}
+        self.filtered = 0
+        self.handled = 0
+        self.deferred = 0
+        self.dropped = 0  # deferred events given up because the store failed to load
+        self.duplicates = 0
+        self.dedup_window = float(
+            entry.options.get(CONF_EVENT_DEDUP_WINDOW, DEFAULT_EVENT_DEDUP_WINDOW)
+        )
+        # (device_ieee, slot, operation) -> monotonic time it was last accepted
+        self._last_seen: dict[tuple[str, Optional[int], str], float] = {}
+        # None until compiled, compiling needs the loaded store
+        self._routes: Optional[Mapping[tuple[str, int], AlarmRoute]] = None
+        self.not_routed = 0
+
+    @callback
+    def async_update_managed(self) -> None:
+        """Refresh the managed lock index after locks were added or removed."""
+        self.managed = {
+            ieee: (int(lock.slot_offset), lock.entity_id) for ieee, lock in self.store.locks.items()
+        }
+        self._async_rules_changed()
+
+    @callback
+    def async_compile_routes(self) -> Mapping[tuple[str, int], AlarmRoute]:
+        options = self.entry.options
+        self._routes = compile_routes(
+            self.store.locks,
+            self.store.alarm_rules,
+            bool(options.get(CONF_ALARMO_ENABLED, False)),
+            options.get(CONF_ALARMO_ENTITY_ID) or "",
+        )
+        return self._routes
+
+    @callback
+    def _async_rules_changed(self, *_: Any) -> None:
+        if self.store.loaded:
+            self.async_compile_routes()
+        else:
+            self._routes = None
+
+    @callback
+    def _async_store_delta(self, delta: dict[str, Any]) -> None:
+        # Routes cover slots 1..max_slots of every lock
+        if delta["slot"] is None and delta["changes"].keys() & {"added", "removed", "max_slots"}:
+            self._async_rules_changed()
+
+    @callback
+    def async_start(self, index: Optional[LockIndex] = None) -> CALLBACK_TYPE:
+        if index is None:
+            self.async_update_managed()
+        else:
+            self.managed = index
+        unsubs = [
+            self.hass.bus.async_listen(
+                EVENT_ZHA, self._async_handle_event, event_filter=self._async_filter
+            ),
+            async_dispatcher_connect(self.hass, SIGNAL_STORE_DELTA, self._async_store_delta),
+            async_dispatcher_connect(
+                self.hass, SIGNAL_ALARM_RULES_UPDATE, self._async_rules_changed
+            ),
+        ]
+
+        @callback
+        def _unsubscribe() -> None:
+            for unsub in unsubs:
+                unsub()
+
+        return _unsubscribe
+
+    @callback
+    def _async_filter(self, event_data: Mapping[str, Any]) -> bool:
+        if (
+            event_data.get("device_ieee") in self.managed
+            and event_data.get("command") == ZHA_COMMAND_OPERATION_EVENT
+        ):
+            return True
+        self.filtered += 1
+        return False
+
+    @callback
+    def _async_handle_event(self, event: Event) -> None:
+        if not self.store.loaded or not self.store.lock_loaded(event.data["device_ieee"]):
+            self.deferred += 1
+            self.hass.async_create_background_task(
+                self._async_handle_when_loaded(event), "zha_lock_manager deferred event"
+            )
+            return
+        self.handled += 1
+        if self.metrics is None:
+            self._async_process(event)
+            return
+        with self.metrics.timed(self.metrics.events):
+            self._async_process(event)
+
+    async def _async_handle_when_loaded(self, event: Event) -> None:
+        try:
+            await self.store.async_wait_loaded()
+        except HomeAssistantError as err:
+            self.dropped += 1
+            _LOGGER.warning("ZLM: Lock event dropped: %s", err)
+            return
+        # The first event of a lock reads its file, later ones take the fast path
+        await self.store.async_get_lock(event.data["device_ieee"])
+        self._async_handle_event(event)
+
+    @callback
+    def _async_process(self, event: Event) -> None:
+        data = event.data
+        device_ieee = data["device_ieee"]
+        args = data.get("args") or {}
+        operation = str(args.get("operation")).lower()
+        source = str(args.get("source")).lower()
+        slot: Optional[int]
+        try:
+            slot = int(args["code_slot"]) if args.get("code_slot") is not None else None
+        except (TypeError, ValueError):
+            slot = None
+
+        if self.dedup_window > 0:
+            key = (device_ieee, slot, operation)
+            now = time.monotonic()
+            last = self._last_seen.get(key)
+            if last is not None and now - last < self.dedup_window:
+                self.duplicates += 1
+                _LOGGER.debug(
+                    "ZLM: Dropped repeated %s from slot %s of %s", operation, slot, device_ieee
+                )
+                return
+            self._last_seen[key] = now
+
+        if self.access_log is not None:
+            self.access_log.async_record(
+                event.time_fired_timestamp, device_ieee, slot, operation, source
+            )
+
+        # Only keypad unlocks with a slot can disarm
+        if operation != "unlock" or source != "keypad" or slot is None:
+            return
+
+        # Alarmo off, lock or slot excluded, or no alarm panel to send it to
+        routes = self._routes if self._routes is not None else self.async_compile_routes()
+        route = routes.get((device_ieee, slot))
+        if route is None:
+            self.not_routed += 1
+            return
+        if route.arm_states:
+            state = self.hass.states.get(route.entity_id)
+            if state is None or state.state not in route.arm_states:
+                self.not_routed += 1
+                _LOGGER.debug(
+                    "ZLM: Not disarming %s from slot %s of %s, panel is %s",
+                    route.entity_id,
+                    slot,
+                    device_ieee,
+                    state.state if state else "unknown",
+                )
+                return
+
+        # Indexed lookup, offset already applied, decrypts only on a cache miss
+        code = self.store.lookup_code(device_ieee, slot)
+        if not code:
+            _LOGGER.debug(
+                "ZLM: No stored code for %s reported slot %s",
+                device_ieee,
+                slot,
+            )
+            return
+
+        _LOGGER.debug(
+            "ZLM: Disarming Alarmo via keypad code from reported slot %s for %s",
+            slot,
+            device_ieee,
+        )
+        self.hass.async_create_task(self._async_disarm(event, route.entity_id, code))
+
+    async def _async_disarm(self, event: Event, alarmo_entity: str, code: str) -> None:
+        ok = False
+        try:
+            await self.hass.services.async_call(
+                "alarm_control_panel",
+                "alarm_disarm",
+                {"entity_id": alarmo_entity, "code": code},
+                blocking=True,
+            )
+            ok = True
+        except HomeAssistantError as err:
+            _LOGGER.warning("ZLM: Alarmo disarm failed: %s", err)
+        finally:
+            if self.metrics is not None:
+                # From the moment ZHA fired the event, so bus and handler time count too
+                self.metrics.record_disarm(
+                    event.data["device_ieee"], time.time() - event.time_fired_timestamp, ok
+                )
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "filtered": self.filtered,
+            "handled": self.handled,
+            "deferred": self.deferred,
+            "dropped": self.dropped,
+            "duplicates": self.duplicates,
+            "not_routed": self.not_routed,
+        }
@@ -1,5 +1,12 @@
 /* ZHA Lock Manager panel, Lit-based custom panel */
 import { LitElement, html, css } from "https://unpkg.com/lit@2.8.0/index.js?module";
+import { repeat } from "https://unpkg.com/lit@2.8.0/directives/repeat.js?module";
+import { guard } from "https://unpkg.com/lit@2.8.0/directives/guard.js?module";
+
+/* Slot rows have a fixed height so the visible window follows from scrollTop alone */
+const ROW_HEIGHT = { desktop: 56, mobile: 116 };
+const OVERSCAN = 8; // rows rendered above and below the visible ones
+const MOBILE_QUERY = "(max-width: 1200px)";
 
 class ZhaLockManagerPanel extends LitElement {
   static get properties() {
@@ -12,6 +19,10 @@ class ZhaLockManagerPanel extends LitElement {
       _selected: { type: Number },
       _busy: { type: Boolean },
       _error: { type: String },
+      _rules: { type: Object },
+      _log: { type: Object },
+      _narrowWindow: { type: Boolean },
+      _win: { type: Object },
     };
   }
 
@@ -21,34 +32,279 @@ class ZhaLockManagerPanel extends LitElement {
     this._selected = 0;
     this._busy = false;
     this._error = "";
-    this._onResize = () => this.requestUpdate();
+    this._rules = null;
+    this._log = null; // { device_ieee, entries } of the lock shown
+    this._revision = null;
+    this._rowCache = new WeakMap();
+    this._emptyRows = new Map(); // shared placeholders, so empty slots keep their identity
+    // Optimistic slot edits by "device_ieee/slot": { ieee, slot, prev, patch, jobs }
+    this._pending = new Map();
+    this._failed = new Map(); // "device_ieee/slot" -> error of the last failed edit
+    this._jobKeys = new Map(); // job_id -> pending key, until the job finishes
+    this._unsub = null;
+    this._win = { start: 0, end: 2 * OVERSCAN };
+    this._raf = null;
+    this._mql = window.matchMedia(MOBILE_QUERY);
+    this._narrowWindow = this._mql.matches;
+    this._onMedia = (e) => {
+      this._narrowWindow = e.matches;
+    };
+    this._onResize = () => this._scheduleWindow();
   }
 
   connectedCallback() {
     super.connectedCallback();
+    this._narrowWindow = this._mql.matches;
+    this._mql.addEventListener("change", this._onMedia);
     window.addEventListener("resize", this._onResize);
+    this._subscribe();
     this._refresh();
   }
   disconnectedCallback() {
+    this._mql.removeEventListener("change", this._onMedia);
     window.removeEventListener("resize", this._onResize);
+    if (this._raf) {
+      cancelAnimationFrame(this._raf);
+      this._raf = null;
+    }
+    if (this._unsub) {
+      this._unsub.then((unsub) => unsub()).catch(() => {});
+      this._unsub = null;
+    }
     super.disconnectedCallback();
   }
 
+  /* Live slot deltas, so other admins and our own actions show up without a full reload */
+  _subscribe() {
+    if (this._unsub || !this.hass?.connection) return;
+    this._unsub = this.hass.connection.subscribeMessage((d) => this._applyDelta(d), {
+      type: "zlm/subscribe",
+    });
+    this._unsub.catch(() => {
+      this._unsub = null;
+    });
+  }
+
+  _applyDelta(d) {
+    if (d.job) {
+      this._onJob(d.job);
+      return;
+    }
+    if (d.user) return; // users are managed over zlm/list_users, not shown here yet
+    if (this._revision !== null && d.revision <= this._revision) return; // already in our copy
+    // A gap means we missed something, fetch the locks changed since our revision
+    if (this._revision !== null && d.revision > this._revision + 1) {
+      this._refresh();
+      return;
+    }
+    this._revision = d.revision;
+    const ch = d.changes || {};
+    if (d.slot === null || d.slot === undefined) {
+      if (ch.removed) {
+        this._locks = this._locks.filter((l) => l.device_ieee !== d.device_ieee);
+      } else if (ch.added) {
+        const { added, ...meta } = ch;
+        this._locks = [
+          ...this._locks.filter((l) => l.device_ieee !== d.device_ieee),
+          { ...meta, device_ieee: d.device_ieee, slots: {} },
+        ];
+      } else {
+        this._locks = this._locks.map((l) =>
+          l.device_ieee === d.device_ieee ? { ...l, ...ch, revision: d.revision } : l
+        );
+      }
+      return;
+    }
+    const key = this._key(d.device_ieee, d.slot);
+    const entry = this._pending.get(key);
+    this._patchSlot(d.device_ieee, d.slot, ch, d.revision);
+    if (entry) {
+      // The store moved on, roll back to that from now on, and keep showing our edits on top
+      entry.prev = { ...(entry.prev || this._emptyRow(d.slot)), ...ch };
+      this._patchSlot(d.device_ieee, d.slot, entry.patch);
+    } else if (this._failed.delete(key)) {
+      this.requestUpdate();
+    }
+  }
+
+  _key(ieee, slot) {
+    return `${ieee}/${slot}`;
+  }
+
+  /* Merge fields into one slot, a new lock object so rows and caches see the change */
+  _patchSlot(ieee, slot, changes, revision) {
+    const key = String(slot);
+    this._locks = this._locks.map((l) => {
+      if (l.device_ieee !== ieee) return l;
+      const prev = l.slots?.[key] || this._emptyRow(slot);
+      return { ...l, revision: revision ?? l.revision, slots: { ...l.slots, [key]: { ...prev, ...changes } } };
+    });
+  }
+
+  /* Zigbee writes are queued server side, successes arrive as slot deltas */
+  _onJob(job) {
+    if (job.status === "queued" || job.status === "running") return;
+    const key = this._jobKeys.get(job.job_id);
+    this._jobKeys.delete(job.job_id);
+    if (job.status !== "failed") {
+      if (key) this._settle(key);
+      return;
+    }
+    const lock = this._locks.find((l) => l.device_ieee === job.device_ieee);
+    const slot = job.slot - (lock?.slot_offset || 0);
+    this._error = `${job.action} on ${lock?.name || job.device_ieee} slot ${slot} failed: ${job.error}`;
+    if (key) this._rollback(key, job.error || "Write failed");
+  }
+
+  /* Optimistic slot edit: shown right away, confirmed by the store delta, undone if the job fails.
+     Nothing blocks, several slots can have edits in flight at once. */
+  async _slotAction(slot, type, changes, payload = {}) {
+    const ieee = this._lock.device_ieee;
+    const key = this._key(ieee, slot);
+    const entry = this._pending.get(key);
+    this._pending.set(key, {
+      ieee,
+      slot,
+      prev: entry ? entry.prev : this._lock.slots?.[String(slot)],
+      patch: { ...entry?.patch, ...changes },
+      jobs: (entry?.jobs || 0) + 1,
+    });
+    this._failed.delete(key);
+    this._patchSlot(ieee, slot, changes);
+    try {
+      const job = await this._ws(type, { device_ieee: ieee, slot, ...payload });
+      if (job.status === "done" || job.status === "merged") this._settle(key);
+      else this._jobKeys.set(job.job_id, key);
+    } catch (e) {
+      this._rollback(key, e?.message || String(e));
+    }
+  }
+
+  /* One job of a slot finished, the slot stays pending while others are queued */
+  _settle(key) {
+    const entry = this._pending.get(key);
+    if (!entry) return;
+    if (entry.jobs > 1) entry.jobs -= 1;
+    else this._pending.delete(key);
+    this.requestUpdate();
+  }
+
+  _rollback(key, error) {
+    const entry = this._pending.get(key);
+    this._pending.delete(key);
+    this._failed.set(key, error);
+    if (entry) {
+      this._locks = this._locks.map((l) => {
+        if (l.device_ieee !== entry.ieee) return l;
+        const slots = { ...l.slots };
+        if (entry.prev) slots[String(entry.slot)] = entry.prev;
+        else delete slots[String(entry.slot)];
+        return { ...l, slots };
+      });
+    }
+    this.requestUpdate();
+  }
+
+  /* After the store copy of a lock was replaced, show the edits still in flight on top of it */
+  _reapplyPending(ieee = null) {
+    for (const entry of this._pending.values()) {
+      if (ieee !== null && entry.ieee !== ieee) continue;
+      const lock = this._locks.find((l) => l.device_ieee === entry.ieee);
+      if (!lock) continue;
+      entry.prev = lock.slots?.[String(entry.slot)];
+      this._patchSlot(entry.ieee, entry.slot, entry.patch);
+    }
+  }
+
+  /* Replace one lock with the copy returned by a mutation, no second round trip */
+  _replaceLock(lock) {
+    if (!lock?.device_ieee) return;
+    this._locks = this._locks.map((l) =>
+      l.device_ieee === lock.device_ieee && (lock.revision ?? 0) >= (l.revision ?? 0) ? lock : l
+    );
+    this._reapplyPending(lock.device_ieee);
+  }
+
   get isMobile() {
-    return this.narrow || window.innerWidth <= 1200;
+    return this.narrow || this._narrowWindow;
+  }
+
+  updated(changed) {
+    // Row height or the number of rows may have changed, the window follows
+    if (changed.has("_locks") || changed.has("_selected") || changed.has("_narrowWindow") || changed.has("narrow")) {
+      this._scheduleWindow();
+    }
+  }
+
+  /* Scroll and resize land here, at most one window update per frame */
+  _scheduleWindow() {
+    if (this._raf) return;
+    this._raf = requestAnimationFrame(() => {
+      this._raf = null;
+      this._updateWindow();
+    });
+  }
+
+  _updateWindow() {
+    const vp = this.renderRoot?.querySelector(".viewport");
+    if (!vp) return;
+    const h = this._rowHeight;
+    const first = Math.floor(vp.scrollTop / h);
+    const start = Math.max(0, first - OVERSCAN);
+    const end = first + Math.ceil(vp.clientHeight / h) + OVERSCAN;
+    if (start !== this._win.start || end !== this._win.end) this._win = { start, end };
+  }
+
+  get _rowHeight() {
+    return this.isMobile ? ROW_HEIGHT.mobile : ROW_HEIGHT.desktop;
+  }
+
+  /* The rows in the window, plus the space the rows outside it would take */
+  _visibleRows(lock) {
+    const rows = this._slotRows(lock);
+    const start = Math.min(this._win.start, rows.length);
+    const end = Math.min(this._win.end, rows.length);
+    const h = this._rowHeight;
+    return { rows: rows.slice(start, end), top: start * h, bottom: (rows.length - end) * h };
+  }
+
+  _selectLock(idx) {
+    this._selected = idx;
+    const vp = this.renderRoot?.querySelector(".viewport");
+    if (vp) vp.scrollTop = 0;
+    this._win = { start: 0, end: this._win.end - this._win.start };
   }
 
   async _ws(type, payload = {}) {
     return await this.hass.callWS({ type, ...payload });
   }
-  async _refresh() {
+  /* Incremental when we already have data: the server only sends locks changed since our revision */
+  async _refresh(full = false) {
     try {
-      this._busy = true;
-      this._locks = await this._ws("zlm/list_locks");
-      this._busy = false;
+      this._subscribe();
+      if (full || this._revision === null || !this._locks.length) {
+        const res = await this._ws("zlm/list_locks", { since_revision: -1 });
+        this._locks = res.locks;
+        this._revision = res.revision;
+        this._rules = await this._ws("zlm/get_alarm_rules");
+      } else {
+        const res = await this._ws("zlm/list_locks", { since_revision: this._revision });
+        this._revision = res.revision;
+        if (!res.not_modified) {
+          const changed = new Map(res.locks.map((l) => [l.device_ieee, l]));
+          const keep = new Set(res.device_ieees);
+          const merged = this._locks
+            .filter((l) => keep.has(l.device_ieee))
+            .map((l) => changed.get(l.device_ieee) || l);
+          for (const l of res.locks) {
+            if (!merged.some((m) => m.device_ieee === l.device_ieee)) merged.push(l);
+          }
+          this._locks = merged;
+        }
+      }
+      this._reapplyPending();
       this.requestUpdate();
     } catch (e) {
-      this._busy = false;
       this._error = e?.message || String(e);
     }
   }
@@ -66,74 +322,125 @@ class ZhaLockManagerPanel extends LitElement {
       : "https://brands.home-assistant.io/zha_lock_manager/icon.png";
   }
 
+  /* Rows are memoized per lock object, deltas replace the object so the cache stays correct */
   _slotRows(lock) {
+    const cached = this._rowCache.get(lock);
+    if (cached) return cached;
     const rows = [];
-    const max = lock.max_slots ?? 30;
+    const max = this._slotLimit(lock);
     for (let i = 1; i <= max; i++) {
-      const key = String(i);
-      const s = lock.slots?.[key] || { slot: i, label: "", enabled: false, has_code: false };
-      rows.push(s);
+      rows.push(lock.slots?.[String(i)] || this._emptyRow(i));
     }
+    this._rowCache.set(lock, rows);
     return rows;
   }
 
+  /* Slots the lock can hold: max_slots, within the PIN users it reported */
+  _slotLimit(lock) {
+    const max = lock.max_slots ?? 30;
+    const users = lock.capacity?.pin_users;
+    return users ? Math.max(0, Math.min(max, users - (lock.slot_offset || 0))) : max;
+  }
+
+  _emptyRow(slot) {
+    let s = this._emptyRows.get(slot);
+    if (!s) {
+      s = Object.freeze({ slot, label: "", enabled: false, has_code: false });
+      this._emptyRows.set(slot, s);
+    }
+    return s;
+  }
+
   async _setCode(slot) {
     const code = prompt(`Enter new code for slot ${slot}`);
     if (!code) return;
-    const label = prompt("Optional label for this code") || "";
-    try {
-      this._busy = true;
-      await this._ws("zlm/set_code", { device_ieee: this._lock.device_ieee, slot, code, label });
-      await this._refresh();
-    } catch (e) {
-      alert("Failed: " + e);
-    } finally {
-      this._busy = false;
+    const { min_pin_length: min, max_pin_length: max } = this._lock?.capacity || {};
+    if ((min && code.length < min) || (max && code.length > max)) {
+      alert(max ? `Codes for this lock have ${min || 1} to ${max} digits` : `Codes for this lock have at least ${min} digits`);
+      return;
     }
+    const label = prompt("Optional label for this code") || "";
+    await this._slotAction(slot, "zlm/set_code", { label, enabled: true, has_code: true }, { code, label });
   }
 
   async _toggle(slot) {
     const s = this._lock?.slots?.[String(slot)];
     if (!s || !s.has_code) return;
     const enable = !s.enabled;
-    try {
-      this._busy = true;
-      const type = enable ? "zlm/enable_code" : "zlm/disable_code";
-      await this._ws(type, { device_ieee: this._lock.device_ieee, slot });
-      await this._refresh();
-    } catch (e) {
-      alert("Failed: " + e);
-    } finally {
-      this._busy = false;
-    }
+    await this._slotAction(slot, enable ? "zlm/enable_code" : "zlm/disable_code", { enabled: enable });
   }
 
   async _clear(slot) {
     if (!confirm(`Clear code at slot ${slot}?`)) return;
+    await this._slotAction(slot, "zlm/clear_code", { label: "", enabled: false, has_code: false, schedule: null });
+  }
+
+  /* Validity window prompts. Dates are local, weekly is e.g. "mon,tue,fri 08:00-17:00" */
+  async _schedule(slot) {
+    const cur = this._lock?.slots?.[String(slot)]?.schedule;
+    const start = prompt("Valid from (YYYY-MM-DD HH:MM, blank for now)", cur?.start ? this._localTime(cur.start) : "");
+    if (start === null) return;
+    const end = prompt("Valid until (YYYY-MM-DD HH:MM, blank for no end)", cur?.end ? this._localTime(cur.end) : "");
+    if (end === null) return;
+    const weeklyText = prompt(
+      "Weekly hours, e.g. mon,tue,wed 08:00-17:00; sat 10:00-12:00 (blank for all week)",
+      (cur?.weekly || []).map((w) => `${w.days.join(",")} ${w.start}-${w.end}`).join("; ")
+    );
+    if (weeklyText === null) return;
+    let schedule = null;
+    if (start || end || weeklyText.trim()) {
+      schedule = { on_end: confirm("Clear the code when it expires? Cancel only disables it.") ? "clear" : "disable" };
+      if (start) schedule.start = start;
+      if (end) schedule.end = end;
+      schedule.weekly = weeklyText
+        .split(";")
+        .map((part) => part.trim())
+        .filter(Boolean)
+        .map((part) => {
+          const [days, hours = ""] = part.split(/\s+/);
+          const [from, to] = hours.split("-");
+          return { days: days.split(","), start: from, end: to };
+        });
+    }
     try {
-      this._busy = true;
-      await this._ws("zlm/clear_code", { device_ieee: this._lock.device_ieee, slot });
-      await this._refresh();
+      this._replaceLock(
+        await this._ws("zlm/set_schedule", { device_ieee: this._lock.device_ieee, slot, schedule })
+      );
     } catch (e) {
-      alert("Failed: " + e);
-    } finally {
-      this._busy = false;
+      alert("Failed: " + (e?.message || e));
     }
   }
 
+  _localTime(iso) {
+    const d = new Date(iso);
+    const pad = (n) => String(n).padStart(2, "0");
+    return `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())} ${pad(d.getHours())}:${pad(d.getMinutes())}`;
+  }
+
+  _scheduleText(s) {
+    const sc = s.schedule;
+    if (!sc) return "";
+    const parts = [];
+    if (sc.start) parts.push(`from ${this._localTime(sc.start)}`);
+    if (sc.end) parts.push(`until ${this._localTime(sc.end)}`);
+    for (const w of sc.weekly || []) parts.push(`${w.days.join(",")} ${w.start}-${w.end}`);
+    return parts.join(", ");
+  }
+
   async _saveMeta() {
     const name = this.renderRoot.querySelector("#name").value;
     const max_slots = parseInt(this.renderRoot.querySelector("#max").value || "30");
     const slot_offset = parseInt(this.renderRoot.querySelector("#offset").value || "0");
     try {
       this._busy = true;
-      await this._ws("zlm/save_lock_meta", {
-        device_ieee: this._lock.device_ieee,
-        name,
-        max_slots,
-        slot_offset,
-      });
-      await this._refresh();
+      this._replaceLock(
+        await this._ws("zlm/save_lock_meta", {
+          device_ieee: this._lock.device_ieee,
+          name,
+          max_slots,
+          slot_offset,
+        })
+      );
     } catch (e) {
       alert("Failed: " + e);
     } finally {
@@ -141,73 +448,222 @@ class ZhaLockManagerPanel extends LitElement {
     }
   }
 
-  /* Desktop table, order: Slot, Status, Name, Actions */
+  /* Alarm routing for the selected lock, comma separated lists */
+  async _saveRule() {
+    const q = (id) => this.renderRoot.querySelector(id);
+    const list = (id) =>
+      q(id)
+        .value.split(",")
+        .map((v) => v.trim())
+        .filter(Boolean);
+    const rule = {
+      disarm: q("#rdisarm").checked,
+      entity_id: q("#rentity").value.trim(),
+      arm_states: list("#rstates"),
+      never_disarm: list("#rnever")
+        .map((v) => parseInt(v))
+        .filter((n) => n > 0),
+    };
+    const device_ieee = this._lock.device_ieee;
+    try {
+      this._busy = true;
+      const res = await this._ws("zlm/save_alarm_rule", { device_ieee, rule });
+      this._rules = { ...this._rules, locks: { ...this._rules.locks, [device_ieee]: res.rule } };
+    } catch (e) {
+      alert("Failed: " + (e?.message || e));
+    } finally {
+      this._busy = false;
+    }
+  }
+
+  _renderRules(lock) {
+    const rules = this._rules;
+    if (!rules?.enabled) return "";
+    const r = rules.locks?.[lock.device_ieee] || {};
+    return html`
+      <div class="card">
+        <h3>Alarm</h3>
+        <div class="meta">
+          <div class="field">
+            <div class="cap">Disarm on keypad unlock</div>
+            <input id="rdisarm" type="checkbox" .checked=${r.disarm ?? true} />
+          </div>
+          <div class="field">
+            <div class="cap">Alarm panel</div>
+            <input id="rentity" .value=${r.entity_id || ""} placeholder=${rules.default_entity_id} />
+          </div>
+          <div class="field">
+            <div class="cap">Only when</div>
+            <input
+              id="rstates"
+              .value=${(r.arm_states || []).join(", ")}
+              placeholder="any state"
+              title=${rules.arm_states.join(", ")}
+            />
+          </div>
+          <div class="field">
+            <div class="cap">Never disarm slots</div>
+            <input id="rnever" .value=${(r.never_disarm || []).join(", ")} placeholder="e.g. 3, 7" />
+          </div>
+          <div class="field save-wrap">
+            <ha-button class="save" @click=${() => this._saveRule()} ?disabled=${this._busy}>Save</ha-button>
+          </div>
+        </div>
+      </div>
+    `;
+  }
+
+  /* Recent operation events of the selected lock, loaded on demand */
+  async _loadLog() {
+    const device_ieee = this._lock.device_ieee;
+    try {
+      const res = await this._ws("zlm/query_log", { device_ieee, limit: 50 });
+      this._log = { device_ieee, entries: res.entries };
+    } catch (e) {
+      this._error = e?.message || String(e);
+    }
+  }
+
+  _renderLog(lock) {
+    const log = this._log?.device_ieee === lock.device_ieee ? this._log : null;
+    return html`
+      <div class="card">
+        <h3>Access log</h3>
+        <ha-button @click=${() => this._loadLog()}>${log ? "Refresh" : "Show recent events"}</ha-button>
+        ${log
+          ? log.entries.length
+            ? html`
+                <table class="slots log">
+                  <thead>
+                    <tr><th>Time</th><th>Slot</th><th>Operation</th><th>Source</th></tr>
+                  </thead>
+                  <tbody>
+                    ${log.entries.map(
+                      (e) => html`
+                        <tr>
+                          <td>${new Date(e.time).toLocaleString()}</td>
+                          <td>${e.slot ?? ""} ${lock.slots?.[String(e.slot)]?.label || ""}</td>
+                          <td>${e.operation}</td>
+                          <td>${e.source}</td>
+                        </tr>
+                      `
+                    )}
+                  </tbody>
+                </table>
+              `
+            : html`<div class="sub">No events recorded yet.</div>`
+          : ""}
+      </div>
+    `;
+  }
+
+  /* Saving while a slot has edits in flight, Failed after a rollback until dismissed */
+  _slotBadges(key, pending, failed) {
+    if (pending) return html`<span class="badge pending">Saving</span>`;
+    if (!failed) return "";
+    const dismiss = () => {
+      this._failed.delete(key);
+      this.requestUpdate();
+    };
+    return html`<span class="badge failed" title="${failed}, click to dismiss" @click=${dismiss}>Failed</span>`;
+  }
+
+
+  /* Rows keyed by slot, a row is only re-rendered when its slot object or badge changed */
+  _slotItems(lock, rows, renderRow) {
+    return repeat(
+      rows,
+      (s) => s.slot,
+      (s) => {
+        const key = this._key(lock.device_ieee, s.slot);
+        const pending = this._pending.has(key);
+        const failed = this._failed.get(key);
+        return guard([s, pending, failed], () => renderRow(s, this._slotBadges(key, pending, failed)));
+      }
+    );
+  }
+
+  _slotButtons(s) {
+    return html`
+      <ha-button class="action" @click=${() => this._setCode(s.slot)}>Set</ha-button>
+      <ha-button class="action" @click=${() => this._toggle(s.slot)} ?disabled=${!s.has_code}>
+        ${s.enabled ? "Disable" : "Enable"}
+      </ha-button>
+      <ha-button class="action" @click=${() => this._clear(s.slot)} ?disabled=${!s.has_code}>Clear</ha-button>
+      <ha-button class="action" @click=${() => this._schedule(s.slot)} ?disabled=${!s.has_code}>Schedule</ha-button>
+    `;
+  }
+
+  _slotStatus(s, badges) {
+    return html`
+      ${s.has_code ? (s.enabled ? "Enabled" : "Disabled") : "Empty"} ${badges}
+      ${s.schedule ? html`<div class="sched">${this._scheduleText(s)}</div>` : ""}
+    `;
+  }
+
+  /* Desktop table, order: Slot, Status, Name, Actions. Only the rows in view are rendered */
   _renderSlotsDesktop(lock) {
+    const { rows, top, bottom } = this._visibleRows(lock);
     return html`
       <div class="card">
         <h3>Slots</h3>
-        <table class="slots">
-          <thead>
-            <tr>
-              <th class="col-num">Slot</th>
-              <th class="col-status">Status</th>
-              <th class="col-label">Name</th>
-              <th class="col-actions">Actions</th>
-            </tr>
-          </thead>
-          <tbody>
-            ${this._slotRows(lock).map((s) => {
-              const status = s.has_code ? (s.enabled ? "Enabled" : "Disabled") : "Empty";
-              const toggleLabel = s.enabled ? "Disable" : "Enable";
-              return html`
-                <tr>
-                  <td>${s.slot}</td>
-                  <td>${status}</td>
-                  <td>${s.label || ""}</td>
-                  <td class="col-actions">
-                    <div class="btn-grid">
-                      <ha-button class="action" @click=${() => this._setCode(s.slot)} ?disabled=${this._busy}>Set</ha-button>
-                      <ha-button class="action" @click=${() => this._toggle(s.slot)} ?disabled=${this._busy || !s.has_code}>
-                        ${toggleLabel}
-                      </ha-button>
-                      <ha-button class="action" @click=${() => this._clear(s.slot)} ?disabled=${this._busy || !s.has_code}>Clear</ha-button>
-                    </div>
-                  </td>
-                </tr>
-              `;
-            })}
-          </tbody>
-        </table>
+        <div class="viewport" @scroll=${() => this._scheduleWindow()}>
+          <table class="slots">
+            <thead>
+              <tr>
+                <th class="col-num">Slot</th>
+                <th class="col-status">Status</th>
+                <th class="col-label">Name</th>
+                <th class="col-actions">Actions</th>
+              </tr>
+            </thead>
+            <tbody>
+              ${top ? html`<tr class="spacer" style="height: ${top}px"></tr>` : ""}
+              ${this._slotItems(
+                lock,
+                rows,
+                (s, badges) => html`
+                  <tr class="row">
+                    <td>${s.slot}</td>
+                    <td>${this._slotStatus(s, badges)}</td>
+                    <td>${s.label || ""}</td>
+                    <td class="col-actions">
+                      <div class="btn-grid">${this._slotButtons(s)}</div>
+                    </td>
+                  </tr>
+                `
+              )}
+              ${bottom ? html`<tr class="spacer" style="height: ${bottom}px"></tr>` : ""}
+            </tbody>
+          </table>
+        </div>
       </div>
     `;
   }
 
-  /* Mobile stacked, texts centered above equal width buttons */
+  /* Mobile stacked, texts centered above equal width buttons. Windowed like the table */
   _renderSlotsMobile(lock) {
+    const { rows, top, bottom } = this._visibleRows(lock);
     return html`
       <div class="card">
         <h3>Slots</h3>
-        <div class="mobile-slots">
-          ${this._slotRows(lock).map((s) => {
-            const status = s.has_code ? (s.enabled ? "Enabled" : "Disabled") : "Empty";
-            const toggleLabel = s.enabled ? "Disable" : "Enable";
-            return html`
+        <div class="viewport mobile-slots" @scroll=${() => this._scheduleWindow()}>
+          <div style="height: ${top}px"></div>
+          ${this._slotItems(
+            lock,
+            rows,
+            (s, badges) => html`
               <div class="mrow">
                 <div class="mhead">
                   <div class="mcell mnum">#${s.slot}</div>
-                  <div class="mcell mstatus">${status}</div>
+                  <div class="mcell mstatus">${this._slotStatus(s, badges)}</div>
                   <div class="mcell mlabel">${s.label || ""}</div>
                 </div>
-                <div class="mactions btn-grid">
-                  <ha-button class="action" @click=${() => this._setCode(s.slot)} ?disabled=${this._busy}>Set</ha-button>
-                  <ha-button class="action" @click=${() => this._toggle(s.slot)} ?disabled=${this._busy || !s.has_code}>
-                    ${toggleLabel}
-                  </ha-button>
-                  <ha-button class="action" @click=${() => this._clear(s.slot)} ?disabled=${this._busy || !s.has_code}>Clear</ha-button>
-                </div>
+                <div class="mactions btn-grid">${this._slotButtons(s)}</div>
               </div>
-            `;
-          })}
+            `
+          )}
+          <div style="height: ${bottom}px"></div>
         </div>
       </div>
     `;
@@ -217,7 +673,7 @@ class ZhaLockManagerPanel extends LitElement {
     // e.detail.index or e.detail.item may be present depending on MWC version
     const item = e.detail.item || e.target.selected; // defensive
     const value = item?.getAttribute?.("value") || item?.value;
-    if (value === "refresh") this._refresh();
+    if (value === "refresh") this._refresh(true);
   }
 
   render() {
@@ -249,10 +705,7 @@ class ZhaLockManagerPanel extends LitElement {
                     (l, idx) => html`
                       <li
                         class="${idx === this._selected ? "sel" : ""}"
-                        @click=${() => {
-                          this._selected = idx;
-                          this.requestUpdate();
-                        }}
+                        @click=${() => this._selectLock(idx)}
                       >
                         <div class="name">${l.name}</div>
                         <div class="sub">${l.entity_id} · ${l.device_ieee}</div>
@@ -275,7 +728,16 @@ class ZhaLockManagerPanel extends LitElement {
                         </div>
                         <div class="field">
                           <div class="cap">Max slots</div>
-                          <input id="max" type="number" min="1" max="250" .value=${String(lock.max_slots || 30)} />
+                          <input
+                            id="max"
+                            type="number"
+                            min="1"
+                            max=${lock.capacity?.pin_users ? lock.capacity.pin_users - (lock.slot_offset || 0) : 250}
+                            .value=${String(lock.max_slots || 30)}
+                          />
+                          ${lock.capacity?.pin_users
+                            ? html`<div class="sub">The lock has ${lock.capacity.pin_users} PIN users</div>`
+                            : ""}
                         </div>
                         <div class="field">
                           <div class="cap">Slot offset</div>
@@ -288,7 +750,9 @@ class ZhaLockManagerPanel extends LitElement {
                       </div>
                     </div>
 
+                    ${this._renderRules(lock)}
                     ${this.isMobile ? this._renderSlotsMobile(lock) : this._renderSlotsDesktop(lock)}
+                    ${this._renderLog(lock)}
                   `
                 : html`<div class="card">No locks configured in integration options.</div>`}
             </div>
@@ -343,6 +807,14 @@ class ZhaLockManagerPanel extends LitElement {
         justify-content: center;
       }
 
+      /* Slot list scrolls inside the card, rows have the fixed ROW_HEIGHT */
+      .viewport { max-height: 70vh; overflow-y: auto; }
+      .viewport thead th { position: sticky; top: 0; background: var(--card-background-color); z-index: 1; }
+      table.slots tr.row { height: 56px; }
+      table.slots tr.row td { padding-top: 0; padding-bottom: 0; }
+      table.slots tr.spacer td { padding: 0; border: 0; }
+      .viewport .sched { white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+
       /* Desktop table */
       table.slots { width: 100%; border-collapse: collapse; }
       table.slots th, table.slots td { padding: 8px; border-bottom: 1px solid rgba(0,0,0,0.08); }
@@ -350,13 +822,18 @@ class ZhaLockManagerPanel extends LitElement {
       table.slots th.col-actions, table.slots td.col-actions { text-align: center; }
 
       /* Equal width actions */
-      .btn-grid { display: grid; grid-template-columns: repeat(3, 1fr); gap: 8px; }
+      .btn-grid { display: grid; grid-template-columns: repeat(4, 1fr); gap: 8px; }
       .action { width: 100%; }
 
       /* Mobile list */
-      .mobile-slots .mrow { padding: 10px 8px; border-bottom: 1px solid rgba(0,0,0,0.08); }
+      .mobile-slots .mrow { height: 116px; box-sizing: border-box; padding: 10px 8px; border-bottom: 1px solid rgba(0,0,0,0.08); }
       .mobile-slots .mhead { display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 8px; text-align: center; align-items: center; margin-bottom: 10px; }
-      .mobile-slots .mactions { display: grid; grid-template-columns: repeat(3, 1fr); gap: 10px; }
+      .mobile-slots .mactions { display: grid; grid-template-columns: repeat(4, 1fr); gap: 10px; }
+      .sched { font-size: 12px; opacity: 0.7; }
+      .badge { font-size: 11px; padding: 1px 6px; border-radius: 8px; margin-left: 4px; white-space: nowrap; }
+      .badge.pending { background: rgba(0,0,0,0.08); }
+      .badge.failed { background: #ffebee; color: #b71c1c; cursor: pointer; }
+      table.log { margin-top: 8px; font-size: 0.92rem; }
 
       .err { background: #ffebee; color: #b71c1c; padding: 8px 12px; border-radius: 12px; margin-bottom: 8px; }
 
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from collections import deque
+from contextlib import contextmanager
+import functools
+import math
+import time
+from typing import Any, Callable, Iterator, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from .const import DOMAIN, METRICS_WINDOW, SIGNAL_METRICS_UPDATE
+
+
+def _percentile(ordered: list[float], pct: float) -> Optional[float]:
+    """Nearest rank percentile of an already sorted list."""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class OpStats:
+    """Outcome counters plus the last METRICS_WINDOW latencies of one operation."""
+
+    __slots__ = ("ok", "failed", "last", "_samples")
+
+    def __init__(self) -> None:
+        self.ok = 0
+        self.failed = 0
+        self.last: Optional[float] = None
+        self._samples: deque[float] = deque(maxlen=METRICS_WINDOW)
+
+    def add(self, seconds: float, ok: bool = True) -> None:
+        self.last = seconds
+        self._samples.append(seconds)
+        if ok:
+            self.ok += 1
+        else:
+            self.failed += 1
+
+    @property
+    def failure_rate(self) -> Optional[float]:
+        total = self.ok + self.failed
+        return self.failed / total if total else None
+
+    def percentiles(self) -> tuple[Optional[float], Optional[float]]:
+        ordered = sorted(self._samples)
+        return _percentile(ordered, 50), _percentile(ordered, 95)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Latencies in milliseconds."""
+        p50, p95 = self.percentiles()
+        return {
+            "ok": self.ok,
+            "failed": self.failed,
+            "failure_rate": self.failure_rate,
+            "last_ms": _ms(self.last),
+            "p50_ms": _ms(p50),
+            "p95_ms": _ms(p95),
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+class ZLMMetrics:
+    """Timing and outcome counters for the hot paths.
+
+    Zigbee writes and event to disarm latency are kept per lock, WS commands per
+    command type. Recording is a deque append, percentiles are only computed when
+    someone reads them (diagnostics, sensors, zlm/get_stats).
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self.writes: dict[str, OpStats] = {}  # per lock, one sample per service call
+        self.disarms: dict[str, OpStats] = {}  # per lock, zha_event fired to disarm done
+        self.ws: dict[str, OpStats] = {}  # per WS command type
+        self.events = OpStats()  # zha_event handler run time
+        self.saves = OpStats()  # explicit store writes, serialize plus disk
+        self.serialize = OpStats()  # building the stored payload, every save
+
+    @staticmethod
+    def _get(table: dict[str, OpStats], key: str) -> OpStats:
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = OpStats()
+        return stats
+
+    @callback
+    def record_write(self, device_ieee: str, seconds: float, ok: bool) -> None:
+        self._get(self.writes, device_ieee).add(seconds, ok)
+        async_dispatcher_send(self.hass, SIGNAL_METRICS_UPDATE, device_ieee)
+
+    @callback
+    def record_disarm(self, device_ieee: str, seconds: float, ok: bool) -> None:
+        self._get(self.disarms, device_ieee).add(seconds, ok)
+        async_dispatcher_send(self.hass, SIGNAL_METRICS_UPDATE, device_ieee)
+
+    @callback
+    def record_ws(self, command: str, seconds: float, ok: bool) -> None:
+        self._get(self.ws, command).add(seconds, ok)
+
+    @contextmanager
+    def timed(self, stats: OpStats) -> Iterator[None]:
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            stats.add(time.perf_counter() - start, ok)
+
+    def lock_summary(self, device_ieee: str) -> dict[str, Any]:
+        writes = self.writes.get(device_ieee)
+        disarms = self.disarms.get(device_ieee)
+        return {
+            "writes": writes.as_dict() if writes else None,
+            "disarms": disarms.as_dict() if disarms else None,
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "writes": {ieee: s.as_dict() for ieee, s in self.writes.items()},
+            "disarms": {ieee: s.as_dict() for ieee, s in self.disarms.items()},
+            "ws": {command: s.as_dict() for command, s in self.ws.items()},
+            "events": self.events.as_dict(),
+            "saves": self.saves.as_dict(),
+            "serialize": self.serialize.as_dict(),
+        }
+
+
+def timed_ws(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Record run time and outcome of an async WS handler under its command type.
+
+    An exception counts as a failure, handlers that reply with send_error count as
+    done, the reply went out.
+    """
+
+    @functools.wraps(func)
+    async def _wrapper(hass: HomeAssistant, connection: Any, msg: dict[str, Any]) -> None:
+        metrics: Optional[ZLMMetrics] = hass.data.get(DOMAIN, {}).get("metrics")
+        start = time.perf_counter()
+        ok = False
+        try:
+            await func(hass, connection, msg)
+            ok = True
+        finally:
+            if metrics is not None:
+                metrics.record_ws(msg["type"], time.perf_counter() - start, ok)
+
+    return _wrapper
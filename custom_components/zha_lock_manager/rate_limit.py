@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import time
+from typing import Any, Optional
+
+
+class ZigbeeRateLimiter:
+    """Token bucket shared by every Zigbee command sent through one coordinator.
+
+    Tokens refill at `rate` per second up to `burst`. A command that finds no
+    token waits in one of two FIFO queues. Interactive commands (a slot changed
+    from the panel) are always served before background ones (bulk apply,
+    schedules, user sync, reconciliation), and may take a free token even while
+    background commands wait. A single timer wakes the queues when the next
+    token is due, so waiting costs no polling. A rate of 0 turns limiting off.
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._interactive: deque[asyncio.Future] = deque()
+        self._background: deque[asyncio.Future] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted = {"interactive": 0, "background": 0}
+        self.delayed = 0  # commands that had to wait for a token
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def configure(self, rate: float, burst: int) -> None:
+        """Apply changed options, waiting commands keep their place."""
+        self._refill()
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = min(self._tokens, float(self.burst))
+        self._release()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def async_acquire(self, interactive: bool = False) -> float:
+        """Wait for a token, return the seconds waited."""
+        kind = "interactive" if interactive else "background"
+        if self.rate <= 0:
+            self.granted[kind] += 1
+            return 0.0
+        self._refill()
+        ahead = self._interactive if interactive else (self._interactive or self._background)
+        if not ahead and self._tokens >= 1:
+            self._tokens -= 1
+            self.granted[kind] += 1
+            return 0.0
+
+        waiters = self._interactive if interactive else self._background
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        started = time.monotonic()
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                if future in waiters:  # the timer may have dropped it already
+                    waiters.remove(future)
+                if not (self._interactive or self._background) and self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            else:
+                # Granted just as we were cancelled, hand the token back
+                self._tokens = min(float(self.burst), self._tokens + 1)
+                self._release()
+            raise
+        waited = time.monotonic() - started
+        self.granted[kind] += 1
+        self.delayed += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        return waited
+
+    def _schedule(self) -> None:
+        if self._timer is not None or not (self._interactive or self._background):
+            return
+        delay = 0.0 if self.rate <= 0 else max(0.0, (1 - self._tokens) / self.rate)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._release()
+
+    def _release(self) -> None:
+        """Hand out the tokens that are available, interactive waiters first."""
+        self._refill()
+        for waiters in (self._interactive, self._background):
+            while waiters and (self._tokens >= 1 or self.rate <= 0):
+                future = waiters.popleft()
+                if future.done():
+                    continue
+                if self.rate > 0:
+                    self._tokens -= 1
+                future.set_result(None)
+        self._schedule()
+
+    def stats(self) -> dict[str, Any]:
+        self._refill()
+        delayed = self.delayed
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "waiting_interactive": len(self._interactive),
+            "waiting_background": len(self._background),
+            "granted_interactive": self.granted["interactive"],
+            "granted_background": self.granted["background"],
+            "delayed": delayed,
+            "avg_wait": (self.wait_total / delayed) if delayed else None,
+            "max_wait": self.wait_max,
+        }
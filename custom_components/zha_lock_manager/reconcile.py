@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from .command_queue import JOB_FAILED, ZLMCommandQueues
+from .const import (
+    ACTION_SET,
+    ACTION_ENABLE,
+    ACTION_DISABLE,
+    ACTION_CLEAR,
+    RECONCILE_BATCH_SIZE,
+    RECONCILE_BATCH_DELAY,
+    USER_STATUS_AVAILABLE,
+    USER_STATUS_DISABLED,
+)
+from .storage import Lock, ZLMLocalStore, slot_limit
+from .zigbee import async_read_user_code
+
+_LOGGER = logging.getLogger(__name__)
+
+# Mismatch kinds
+MISSING_ON_LOCK = "missing_on_lock"  # store has a code, the lock slot is empty
+UNEXPECTED_ON_LOCK = "unexpected_on_lock"  # the lock has a code the store does not know
+ENABLED_MISMATCH = "enabled_mismatch"
+CODE_MISMATCH = "code_mismatch"
+
+
+def _candidate_slots(store: ZLMLocalStore, lock: Lock, full: bool) -> list[int]:
+    """Slots worth reading back.
+
+    By default only slots the store knows about plus slots whose last write
+    failed. A full sweep covers every slot up to max_slots, or the PIN users
+    the lock reported when it has fewer.
+    """
+    slots = set(lock.slots) | store.suspect_slots(lock)
+    if full:
+        offset = int(lock.slot_offset)
+        slots |= set(range(1 + offset, slot_limit(lock) + 1 + offset))
+    return sorted(slots)
+
+
+def _diff_slot(
+    lock: Lock, slot: int, status: int, lock_code: str | None, stored_code: str | None
+) -> str | None:
+    s = lock.slots.get(slot)
+    has_code = bool(s and s.code_encrypted)
+    if status == USER_STATUS_AVAILABLE:
+        return MISSING_ON_LOCK if has_code else None
+    if not has_code:
+        return UNEXPECTED_ON_LOCK
+    if s.enabled != (status != USER_STATUS_DISABLED):
+        return ENABLED_MISMATCH
+    # Some locks mask codes on read, only compare when one came back
+    if lock_code and lock_code != stored_code:
+        return CODE_MISMATCH
+    return None
+
+
+async def _async_push(
+    queues: ZLMCommandQueues, lock: Lock, action: str, slot: int, code: str | None = None
+) -> None:
+    job = queues.async_enqueue(lock, action, slot, code=code, update_store=False)
+    await job.future
+    if job.status == JOB_FAILED:
+        raise HomeAssistantError(job.error or "Write failed")
+
+
+async def _async_repair_slot(
+    queues: ZLMCommandQueues, lock: Lock, slot: int, kind: str, code: str | None
+) -> None:
+    """Push the stored state of one slot back to the lock through its queue."""
+    if kind == UNEXPECTED_ON_LOCK:
+        await _async_push(queues, lock, ACTION_CLEAR, slot)
+        return
+    s = lock.slots[slot]
+    if kind in (MISSING_ON_LOCK, CODE_MISMATCH):
+        if not code:
+            raise HomeAssistantError("Stored code cannot be decrypted")
+        await _async_push(queues, lock, ACTION_SET, slot, code)
+        if s.enabled:
+            return
+    await _async_push(queues, lock, ACTION_ENABLE if s.enabled else ACTION_DISABLE, slot)
+
+
+async def async_reconcile_lock(
+    hass: HomeAssistant,
+    store: ZLMLocalStore,
+    queues: ZLMCommandQueues,
+    lock: Lock,
+    *,
+    full: bool = False,
+    repair: bool = False,
+) -> dict[str, Any]:
+    """Read slots back from a lock, diff against the store, optionally repair.
+
+    Reads go one at a time in batches of RECONCILE_BATCH_SIZE with a pause in
+    between, so a sweep does not flood a sleepy lock or the coordinator.
+    """
+    slots = _candidate_slots(store, lock, full)
+    # One batched decrypt in the executor instead of one per slot on the loop
+    stored_codes = await store.async_get_plain_codes(lock, slots)
+    mismatches: list[dict[str, Any]] = []
+    errors: list[dict[str, Any]] = []
+    verified: set[int] = set()
+    repaired = 0
+
+    for start in range(0, len(slots), RECONCILE_BATCH_SIZE):
+        if start:
+            await asyncio.sleep(RECONCILE_BATCH_DELAY)
+        for slot in slots[start : start + RECONCILE_BATCH_SIZE]:
+            try:
+                status, lock_code = await async_read_user_code(hass, lock.device_ieee, slot)
+            except HomeAssistantError as err:
+                errors.append({"slot": slot, "error": str(err)})
+                continue
+
+            kind = _diff_slot(lock, slot, status, lock_code, stored_codes[slot])
+            if kind is None:
+                verified.add(slot)
+                continue
+
+            mismatch: dict[str, Any] = {"slot": slot, "kind": kind, "lock_status": status}
+            if repair:
+                try:
+                    await _async_repair_slot(queues, lock, slot, kind, stored_codes[slot])
+                except Exception as err:  # noqa: BLE001 - report and keep sweeping
+                    mismatch["repair_error"] = str(err) or type(err).__name__
+                else:
+                    mismatch["repaired"] = True
+                    verified.add(slot)
+                    repaired += 1
+            mismatches.append(mismatch)
+
+    when = dt_util.utcnow().isoformat()
+    store.mark_reconciled(lock, when, verified)
+    if mismatches:
+        _LOGGER.info(
+            "ZLM: %s slot(s) differ on %s, %s repaired", len(mismatches), lock.device_ieee, repaired
+        )
+
+    return {
+        "device_ieee": lock.device_ieee,
+        "scanned": len(slots),
+        "mismatches": mismatches,
+        "repaired": repaired,
+        "errors": errors,
+        "last_reconciled": when,
+    }
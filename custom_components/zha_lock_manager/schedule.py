@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, time, timedelta
+import heapq
+import itertools
+import logging
+from typing import Any, Coroutine, Optional
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import dt as dt_util
+
+from .command_queue import JOB_FAILED, ZLMCommandQueues
+from .const import (
+    ACTION_ENABLE,
+    ACTION_DISABLE,
+    ACTION_CLEAR,
+    SCHEDULE_END_DISABLE,
+    SCHEDULE_END_CLEAR,
+    SCHEDULE_RETRY_DELAY,
+    SIGNAL_STORE_DELTA,
+    WEEKDAYS,
+)
+from .storage import Lock, ZLMLocalStore
+
+_LOGGER = logging.getLogger(__name__)
+
+# Stored schedule, all keys optional but at least one of start, end, weekly:
+#   {"start": ISO UTC, "end": ISO UTC,
+#    "weekly": [{"days": ["mon", ...], "start": "HH:MM", "end": "HH:MM"}],
+#    "on_end": "disable" | "clear"}
+# Weekly windows are in Home Assistant's local time, an end at or before the
+# start runs past midnight.
+
+
+def normalize_schedule(data: dict[str, Any]) -> dict[str, Any]:
+    """Turn a validated WS payload into the stored form. Raises ValueError."""
+    schedule: dict[str, Any] = {}
+    for key in ("start", "end"):
+        value: Optional[datetime] = data.get(key)
+        if value is not None:
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=dt_util.get_default_time_zone())
+            schedule[key] = dt_util.as_utc(value).isoformat()
+    if "start" in schedule and "end" in schedule and schedule["end"] <= schedule["start"]:
+        raise ValueError("end must be after start")
+    weekly = [
+        {
+            "days": sorted(set(window["days"]), key=WEEKDAYS.index),
+            "start": window["start"].strftime("%H:%M"),
+            "end": window["end"].strftime("%H:%M"),
+        }
+        for window in data.get("weekly", [])
+    ]
+    if weekly:
+        schedule["weekly"] = weekly
+    if not schedule:
+        raise ValueError("A schedule needs a start, an end or weekly windows")
+    schedule["on_end"] = data.get("on_end", SCHEDULE_END_DISABLE)
+    return schedule
+
+
+def _bound(schedule: dict[str, Any], key: str) -> Optional[datetime]:
+    value = schedule.get(key)
+    return dt_util.parse_datetime(value) if value else None
+
+
+def _window_bounds(day: date, window: dict[str, Any]) -> tuple[datetime, datetime]:
+    tz = dt_util.get_default_time_zone()
+    start = datetime.combine(day, time.fromisoformat(window["start"]), tzinfo=tz)
+    end = datetime.combine(day, time.fromisoformat(window["end"]), tzinfo=tz)
+    if end <= start:
+        end += timedelta(days=1)
+    return dt_util.as_utc(start), dt_util.as_utc(end)
+
+
+def _weekly_windows(schedule: dict[str, Any], now: datetime, days_back: int, days_ahead: int):
+    """Yield (start, end) of weekly windows starting within the given local days."""
+    today = dt_util.as_local(now).date()
+    for offset in range(-days_back, days_ahead + 1):
+        day = today + timedelta(days=offset)
+        weekday = WEEKDAYS[day.weekday()]
+        for window in schedule.get("weekly", []):
+            if weekday in window["days"]:
+                yield _window_bounds(day, window)
+
+
+def is_active(schedule: dict[str, Any], now: datetime) -> bool:
+    start, end = _bound(schedule, "start"), _bound(schedule, "end")
+    if (start and now < start) or (end and now >= end):
+        return False
+    if not schedule.get("weekly"):
+        return True
+    # Yesterday too, for windows running past midnight
+    return any(s <= now < e for s, e in _weekly_windows(schedule, now, 1, 0))
+
+
+def desired_action(schedule: dict[str, Any], now: datetime) -> str:
+    end = _bound(schedule, "end")
+    if end and now >= end and schedule.get("on_end") == SCHEDULE_END_CLEAR:
+        return ACTION_CLEAR
+    return ACTION_ENABLE if is_active(schedule, now) else ACTION_DISABLE
+
+
+def next_transition(schedule: dict[str, Any], now: datetime) -> Optional[datetime]:
+    """The next moment the desired state of the slot may change, None if never."""
+    start, end = _bound(schedule, "start"), _bound(schedule, "end")
+    if end and now >= end:
+        return None
+    candidates = [b for b in (start, end) if b and b > now]
+    if schedule.get("weekly"):
+        for s, e in _weekly_windows(schedule, now, 1, 7):
+            candidates.extend(b for b in (s, e) if b > now)
+    return min(candidates, default=None)
+
+
+class ZLMScheduler:
+    """Applies slot schedules with one timer for all slots.
+
+    Pending transitions sit in a heap of (when, seq, device_ieee, slot), the
+    timer is armed for the earliest one. Replacing or dropping a slot's
+    schedule only updates `_due`, stale heap entries are skipped when popped.
+    Due transitions are queued together through the per-lock command queues
+    and the store is flushed once per batch.
+    """
+
+    def __init__(self, hass: HomeAssistant, store: ZLMLocalStore, queues: ZLMCommandQueues) -> None:
+        self.hass = hass
+        self.store = store
+        self.queues = queues
+        self._heap: list[tuple[datetime, int, str, int]] = []
+        self._due: dict[tuple[str, int], datetime] = {}
+        self._seq = itertools.count()
+        self._timer_at: Optional[datetime] = None
+        self._unsub_timer: Optional[CALLBACK_TYPE] = None
+        self._unsub_delta: Optional[CALLBACK_TYPE] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @callback
+    def async_start(self) -> None:
+        """Recompute every schedule from the store, e.g. after a restart."""
+        self._unsub_delta = async_dispatcher_connect(
+            self.hass, SIGNAL_STORE_DELTA, self._async_store_delta
+        )
+        self._async_track(self._async_load_and_apply(), "zha_lock_manager schedule load")
+
+    async def _async_load_and_apply(self) -> None:
+        # Only locks the index lists with schedules are read from disk
+        await self.store.async_load_locks(self.store.scheduled_locks())
+        items = [
+            (lock, slot)
+            for ieee, lock in self.store.locks.items()
+            if self.store.lock_loaded(ieee)
+            for slot, _ in lock.slots.schedules()
+        ]
+        if items:
+            await self._async_apply(items, dt_util.utcnow())
+
+    @callback
+    def async_stop(self) -> None:
+        if self._unsub_delta is not None:
+            self._unsub_delta()
+            self._unsub_delta = None
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._timer_at = None
+        for task in self._tasks:
+            task.cancel()
+        self._heap.clear()
+        self._due.clear()
+
+    def pending(self) -> int:
+        return len(self._due)
+
+    @callback
+    def _async_store_delta(self, delta: dict[str, Any]) -> None:
+        """Re-evaluate a slot when its schedule, code or enabled flag changed."""
+        slot = delta["slot"]
+        if slot is None:
+            return
+        changes = delta["changes"]
+        if "schedule" not in changes and "has_code" not in changes and "enabled" not in changes:
+            return
+        key = (delta["device_ieee"], slot)
+        lock = self.store.get_lock(delta["device_ieee"])
+        s = lock.slots.get(slot) if lock else None
+        if s is None or not s.schedule:
+            self._due.pop(key, None)
+            return
+        self._async_apply_soon([(lock, slot)])
+
+    @callback
+    def _async_apply_soon(self, items: list[tuple[Lock, int]]) -> None:
+        self._async_track(self._async_apply(items, dt_util.utcnow()), "zha_lock_manager schedule")
+
+    @callback
+    def _async_track(self, coro: Coroutine[Any, Any, None], name: str) -> None:
+        task = self.hass.async_create_background_task(coro, name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @callback
+    def _push(self, device_ieee: str, slot: int, when: datetime) -> None:
+        self._due[(device_ieee, slot)] = when
+        heapq.heappush(self._heap, (when, next(self._seq), device_ieee, slot))
+        self._arm()
+
+    @callback
+    def _arm(self) -> None:
+        """Point the single timer at the earliest live transition."""
+        heap = self._heap
+        while heap and self._due.get((heap[0][2], heap[0][3])) != heap[0][0]:
+            heapq.heappop(heap)
+        when = heap[0][0] if heap else None
+        if when == self._timer_at:
+            return
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        self._timer_at = when
+        if when is not None:
+            self._unsub_timer = async_track_point_in_utc_time(self.hass, self._async_fire, when)
+
+    async def _async_fire(self, deadline: datetime) -> None:
+        self._unsub_timer = None
+        self._timer_at = None
+        now = max(deadline, dt_util.utcnow())
+        items: list[tuple[Lock, int]] = []
+        while self._heap and self._heap[0][0] <= now:
+            when, _, ieee, slot = heapq.heappop(self._heap)
+            if self._due.get((ieee, slot)) != when:
+                continue
+            del self._due[(ieee, slot)]
+            if (lock := self.store.get_lock(ieee)) is not None:
+                items.append((lock, slot))
+        self._arm()
+        if items:
+            await self._async_apply(items, now)
+
+    async def _async_apply(self, items: list[tuple[Lock, int]], now: datetime) -> None:
+        """Bring slots to their scheduled state and queue their next transition."""
+        jobs = []
+        for lock, slot in items:
+            s = lock.slots.get(slot)
+            schedule = s.schedule if s is not None else None
+            if not schedule:
+                self._due.pop((lock.device_ieee, slot), None)
+                continue
+            action = desired_action(schedule, now)
+            if s.code_encrypted and (
+                action == ACTION_CLEAR or s.enabled != (action == ACTION_ENABLE)
+            ):
+                job = self.queues.async_enqueue(lock, action, slot, flush=False)
+                jobs.append((lock, slot, schedule, job))
+            if action != ACTION_CLEAR and (when := next_transition(schedule, now)):
+                self._push(lock.device_ieee, slot, when)
+            else:
+                self._due.pop((lock.device_ieee, slot), None)
+
+        if not jobs:
+            return
+        await asyncio.gather(*(job.future for *_, job in jobs))
+        retry_at = dt_util.utcnow() + timedelta(seconds=SCHEDULE_RETRY_DELAY)
+        for lock, slot, schedule, job in jobs:
+            if job.status != JOB_FAILED:
+                continue
+            _LOGGER.warning(
+                "ZLM: Scheduled %s of slot %s on %s failed (%s), retrying later",
+                job.action,
+                slot,
+                lock.device_ieee,
+                job.error,
+            )
+            current = self._due.get((lock.device_ieee, slot))
+            if current is None or retry_at < current:
+                self._push(lock.device_ieee, slot, retry_at)
+        await self.store.async_flush()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from homeassistant.components.sensor import (
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN, ZHA_DOMAIN, CONF_LOCKS, SIGNAL_METRICS_UPDATE
+from .events import lock_index
+from .metrics import OpStats, ZLMMetrics, _ms
+
+
+def _rate(stats: OpStats) -> Optional[float]:
+    rate = stats.failure_rate
+    return None if rate is None else round(rate * 100, 1)
+
+
+@dataclass(frozen=True, kw_only=True)
+class ZLMSensorDescription(SensorEntityDescription):
+    table: str  # ZLMMetrics attribute holding the per lock stats
+    value_fn: Callable[[OpStats], Optional[float]]
+
+
+SENSORS: tuple[ZLMSensorDescription, ...] = (
+    ZLMSensorDescription(
+        key="write_latency_p50",
+        translation_key="write_latency_p50",
+        table="writes",
+        value_fn=lambda s: _ms(s.percentiles()[0]),
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    ZLMSensorDescription(
+        key="write_latency_p95",
+        translation_key="write_latency_p95",
+        table="writes",
+        value_fn=lambda s: _ms(s.percentiles()[1]),
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    ZLMSensorDescription(
+        key="write_failure_rate",
+        translation_key="write_failure_rate",
+        table="writes",
+        value_fn=_rate,
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    ZLMSensorDescription(
+        key="disarm_latency",
+        translation_key="disarm_latency",
+        table="disarms",
+        value_fn=lambda s: _ms(s.last),
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Diagnostic sensors per managed lock, disabled until a user enables them.
+
+    Built from the lock index of the entry, the store may still be loading.
+    """
+    metrics: ZLMMetrics = hass.data[DOMAIN]["metrics"]
+    async_add_entities(
+        ZLMMetricSensor(metrics, device_ieee, description)
+        for device_ieee in lock_index(entry.data.get(CONF_LOCKS, []))
+        for description in SENSORS
+    )
+
+
+class ZLMMetricSensor(SensorEntity):
+    """One hot path metric of one lock, attached to the lock's ZHA device."""
+
+    entity_description: ZLMSensorDescription
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self, metrics: ZLMMetrics, device_ieee: str, description: ZLMSensorDescription
+    ) -> None:
+        self.entity_description = description
+        self._metrics = metrics
+        self._device_ieee = device_ieee
+        self._attr_unique_id = f"{device_ieee}_{description.key}"
+        self._attr_device_info = DeviceInfo(identifiers={(ZHA_DOMAIN, device_ieee)})
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(
+            async_dispatcher_connect(self.hass, SIGNAL_METRICS_UPDATE, self._async_update)
+        )
+
+    @callback
+    def _async_update(self, device_ieee: str) -> None:
+        if device_ieee == self._device_ieee:
+            self.async_write_ha_state()
+
+    @property
+    def native_value(self) -> Optional[float]:
+        table: dict[str, OpStats] = getattr(self._metrics, self.entity_description.table)
+        stats = table.get(self._device_ieee)
+        return None if stats is None else self.entity_description.value_fn(stats)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        table: dict[str, OpStats] = getattr(self._metrics, self.entity_description.table)
+        stats = table.get(self._device_ieee)
+        if stats is None:
+            return None
+        return {"ok": stats.ok, "failed": stats.failed}
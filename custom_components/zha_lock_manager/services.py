@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from itertools import islice
+import logging
+import os
+from typing import IO
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+
+from .backup import BackupImporter, async_export_lines
+from .const import (
+    DOMAIN,
+    BACKUP_DIR,
+    MIN_PASSPHRASE_LENGTH,
+    SERVICE_EXPORT,
+    SERVICE_IMPORT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_READ_BATCH = 20  # archive lines read per executor job
+
+_FILENAME = vol.All(cv.string, vol.Match(r"^[\w.-]+$"))
+
+EXPORT_SCHEMA = vol.Schema(
+    {
+        vol.Required("passphrase"): vol.All(cv.string, vol.Length(min=MIN_PASSPHRASE_LENGTH)),
+        vol.Required("filename"): _FILENAME,
+    }
+)
+
+IMPORT_SCHEMA = vol.Schema(
+    {
+        vol.Required("passphrase"): cv.string,
+        vol.Required("filename"): _FILENAME,
+        vol.Optional("push", default=False): cv.boolean,
+    }
+)
+
+
+def _backup_path(hass: HomeAssistant, filename: str) -> str:
+    return hass.config.path(BACKUP_DIR, filename)
+
+
+def _open_for_write(path: str) -> IO[str]:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Codes are inside, keep the file private
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    return os.fdopen(fd, "w", encoding="utf-8")
+
+
+def _read_lines(handle: IO[str]) -> list[str]:
+    return list(islice(handle, _READ_BATCH))
+
+
+def _loaded(hass: HomeAssistant):
+    domain_data = hass.data.get(DOMAIN, {})
+    store = domain_data.get("store")
+    if store is None:
+        raise HomeAssistantError("Lock manager is not loaded")
+    return store, domain_data.get("queues")
+
+
+async def _async_export(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Write the archive to <config>/zha_lock_manager_backups, one line at a time."""
+    store, _ = _loaded(hass)
+    path = _backup_path(hass, call.data["filename"])
+    handle = await hass.async_add_executor_job(_open_for_write, path)
+    try:
+        async for line in async_export_lines(hass, store, call.data["passphrase"]):
+            await hass.async_add_executor_job(handle.write, line + "\n")
+    finally:
+        await hass.async_add_executor_job(handle.close)
+    _LOGGER.info("ZLM: Exported lock codes to %s", path)
+
+
+async def _async_import(hass: HomeAssistant, call: ServiceCall) -> None:
+    store, queues = _loaded(hass)
+    if call.data["push"] and queues is None:
+        raise HomeAssistantError("Lock manager queues are not running")
+    path = _backup_path(hass, call.data["filename"])
+    try:
+        handle = await hass.async_add_executor_job(open, path, "r", -1, "utf-8")
+    except FileNotFoundError as err:
+        raise ServiceValidationError(f"Backup {call.data['filename']} not found") from err
+
+    importer = BackupImporter(
+        hass, store, queues if call.data["push"] else None, call.data["passphrase"]
+    )
+    try:
+        while lines := await hass.async_add_executor_job(_read_lines, handle):
+            for line in lines:
+                await importer.async_feed(line)
+    finally:
+        await hass.async_add_executor_job(handle.close)
+        await store.async_flush()
+    if not importer.finished:
+        raise HomeAssistantError("Archive is incomplete")
+    _LOGGER.info("ZLM: Imported lock codes from %s: %s", path, importer.stats)
+
+
+def async_register_services(hass: HomeAssistant) -> None:
+    """Register the backup services, they use whichever store is loaded."""
+    if hass.services.has_service(DOMAIN, SERVICE_EXPORT):
+        return
+
+    async def _export(call: ServiceCall) -> None:
+        await _async_export(hass, call)
+
+    async def _import(call: ServiceCall) -> None:
+        await _async_import(hass, call)
+
+    hass.services.async_register(DOMAIN, SERVICE_EXPORT, _export, schema=EXPORT_SCHEMA)
+    hass.services.async_register(DOMAIN, SERVICE_IMPORT, _import, schema=IMPORT_SCHEMA)
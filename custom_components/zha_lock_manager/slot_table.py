@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from typing import Any, Iterator, Optional
+
+
+def _bits(mask: int) -> Iterator[int]:
+    """Yield the positions of set bits, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Slot:
+    """View of one row in a SlotTable, reads and writes go to the table."""
+
+    __slots__ = ("_table", "slot")
+
+    def __init__(self, table: SlotTable, slot: int) -> None:
+        self._table = table
+        self.slot = slot
+
+    @property
+    def label(self) -> str:
+        return self._table._labels[self.slot]
+
+    @label.setter
+    def label(self, value: str) -> None:
+        self._table._labels[self.slot] = value
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._table._enabled >> self.slot & 1)
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        if value:
+            self._table._enabled |= 1 << self.slot
+        else:
+            self._table._enabled &= ~(1 << self.slot)
+
+    @property
+    def code_encrypted(self) -> Optional[str]:
+        return self._table._tokens[self.slot]
+
+    @code_encrypted.setter
+    def code_encrypted(self, value: Optional[str]) -> None:
+        self._table._tokens[self.slot] = value
+        if value:
+            self._table._has_code |= 1 << self.slot
+        else:
+            self._table._has_code &= ~(1 << self.slot)
+
+    @property
+    def schedule(self) -> Optional[dict[str, Any]]:
+        return self._table._schedules.get(self.slot)
+
+    @schedule.setter
+    def schedule(self, value: Optional[dict[str, Any]]) -> None:
+        if value:
+            self._table._schedules[self.slot] = value
+        else:
+            self._table._schedules.pop(self.slot, None)
+
+    def __repr__(self) -> str:
+        return f"Slot(slot={self.slot}, label={self.label!r}, enabled={self.enabled})"
+
+
+class SlotTable:
+    """Slots of one lock, stored as parallel lists indexed by slot number.
+
+    Presence, enabled and has_code are int bitmaps, so a 250 slot lock costs two
+    lists and three ints instead of 250 objects. The mapping methods mirror the
+    Dict[int, Slot] this replaces and hand out Slot views. Schedules are rare and
+    live in a small dict keyed by slot.
+    """
+
+    __slots__ = ("_labels", "_tokens", "_present", "_enabled", "_has_code", "_schedules")
+
+    def __init__(self) -> None:
+        self._labels: list[str] = []
+        self._tokens: list[Optional[str]] = []
+        self._present = 0
+        self._enabled = 0
+        self._has_code = 0
+        self._schedules: dict[int, dict[str, Any]] = {}
+
+    def _grow(self, slot: int) -> None:
+        missing = slot + 1 - len(self._labels)
+        if missing > 0:
+            self._labels.extend([""] * missing)
+            self._tokens.extend([None] * missing)
+
+    # Mapping interface
+    def __contains__(self, slot: object) -> bool:
+        return isinstance(slot, int) and slot >= 0 and bool(self._present >> slot & 1)
+
+    def __len__(self) -> int:
+        return self._present.bit_count()
+
+    def __iter__(self) -> Iterator[int]:
+        return _bits(self._present)
+
+    def __getitem__(self, slot: int) -> Slot:
+        if slot not in self:
+            raise KeyError(slot)
+        return Slot(self, slot)
+
+    def get(self, slot: int, default: Any = None) -> Any:
+        return Slot(self, slot) if slot in self else default
+
+    def values(self) -> Iterator[Slot]:
+        return (Slot(self, slot) for slot in self)
+
+    def add(self, slot: int, label: str = "", enabled: bool = True, token: Optional[str] = None) -> Slot:
+        """Create a slot row, or return the existing one untouched."""
+        if slot < 0:
+            raise ValueError("Slot numbers start at 0")
+        if slot in self:
+            return Slot(self, slot)
+        self._grow(slot)
+        self._present |= 1 << slot
+        view = Slot(self, slot)
+        view.label = label
+        view.enabled = enabled
+        view.code_encrypted = token
+        return view
+
+    # Fast paths without views
+    def populated(self) -> Iterator[int]:
+        """Slot numbers that hold a code, in order."""
+        return _bits(self._has_code)
+
+    def rows(self) -> Iterator[tuple[int, str, bool, Optional[str]]]:
+        """(slot, label, enabled, token) for every slot, in order."""
+        labels, tokens, enabled = self._labels, self._tokens, self._enabled
+        for slot in _bits(self._present):
+            yield slot, labels[slot], bool(enabled >> slot & 1), tokens[slot]
+
+    def schedules(self) -> Iterator[tuple[int, dict[str, Any]]]:
+        """(slot, schedule) for every slot that has a schedule."""
+        return iter(self._schedules.items())
+
+    def to_storage(self) -> dict[str, dict[str, Any]]:
+        """Serialize straight to the stored format."""
+        data = {
+            str(slot): {"label": label, "enabled": enabled, "code_encrypted": token}
+            for slot, label, enabled, token in self.rows()
+        }
+        for slot, schedule in self._schedules.items():
+            data[str(slot)]["schedule"] = schedule
+        return data
+
+    @classmethod
+    def from_storage(cls, raw: dict[str, dict[str, Any]]) -> SlotTable:
+        table = cls()
+        for key, value in raw.items():
+            table.add(
+                int(key),
+                label=value.get("label", ""),
+                enabled=value.get("enabled", True),
+                token=value.get("code_encrypted"),
+            )
+            if value.get("schedule"):
+                table._schedules[int(key)] = value["schedule"]
+        return table
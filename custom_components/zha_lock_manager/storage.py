@@ -1,42 +1,151 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass, field
-from typing import Any, Dict, Optional
+import logging
+from typing import Any, Dict, Iterable, Optional
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
 
-from cryptography.fernet import Fernet, InvalidToken
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 
+from .cache import CodeCache
 from .const import (
     STORAGE_KEY,
     STORAGE_VERSION,
+    LOCK_STORAGE_PREFIX,
+    LOCK_STORAGE_VERSION,
     KEY_STORAGE_KEY,
     KEY_STORAGE_VERSION,
+    DEFAULT_SAVE_DELAY,
+    SIGNAL_STORE_DELTA,
+    SIGNAL_USER_UPDATE,
+    SIGNAL_ALARM_RULES_UPDATE,
+    CRYPTO_CHUNK_SIZE,
+    CAPACITY_ATTRIBUTES,
+    DEFAULT_MAX_SLOTS,
 )
+from .metrics import ZLMMetrics
+from .slot_table import Slot, SlotTable
 
-
-@dataclass
-class Slot:
-    slot: int
-    label: str = ""
-    enabled: bool = True
-    code_encrypted: Optional[str] = None  # base64 fernet token
+_LOGGER = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class Lock:
     name: str
     entity_id: str
     device_ieee: str
-    max_slots: int = 30
+    max_slots: int = DEFAULT_MAX_SLOTS
     slot_offset: int = 0
-    slots: Dict[int, Slot] = field(default_factory=dict)
+    slots: SlotTable = field(default_factory=SlotTable)
+    revision: int = 0  # store revision of the last change to this lock
+    last_reconciled: Optional[str] = None  # ISO timestamp of the last read-back sweep
+    # CAPACITY_ATTRIBUTES fields the lock reported plus "read_at", see discovery.py
+    capacity: Optional[dict[str, Any]] = None
+    # Serialized form for the WS API, dropped on every change
+    cached_dict: Optional[dict] = field(default=None, repr=False, compare=False)
+
+
+def lock_capacity(lock: Lock) -> dict[str, Optional[int]]:
+    """What the lock reported about its PIN users, None where it is not known."""
+    capacity = lock.capacity or {}
+    return {name: capacity.get(name) for name in CAPACITY_ATTRIBUTES}
+
+
+def slot_limit(lock: Lock) -> int:
+    """Highest slot (offset not applied) that can be used: max_slots, within the PIN users."""
+    if pin_users := lock_capacity(lock)["pin_users"]:
+        return max(0, min(lock.max_slots, pin_users - lock.slot_offset))
+    return lock.max_slots
+
+
+def validate_slot(lock: Lock, slot: int, code: Optional[str] = None) -> None:
+    """Raise ValueError for a slot, or a code, the lock cannot hold."""
+    if not 1 <= slot <= slot_limit(lock):
+        raise ValueError("Slot out of range")
+    if code is None:
+        return
+    capacity = lock_capacity(lock)
+    if (shortest := capacity["min_pin_length"]) and len(code) < shortest:
+        raise ValueError(f"Code must have at least {shortest} digits")
+    if (longest := capacity["max_pin_length"]) and len(code) > longest:
+        raise ValueError(f"Code must have at most {longest} digits")
+
+
+@dataclass(slots=True)
+class User:
+    """A person with one code that is kept in sync on several locks.
+
+    `assignments` maps device_ieee to {"slot", "status", "error", "attempts"},
+    with the slot numbered like the panel (lock offset not applied). `revoking`
+    holds slots that still need to be cleared, keyed "device_ieee/slot" with
+    the same state plus "device_ieee".
+    """
+
+    user_id: str
+    name: str
+    code_encrypted: Optional[str] = field(default=None, repr=False)
+    enabled: bool = True
+    assignments: Dict[str, dict[str, Any]] = field(default_factory=dict)
+    revoking: Dict[str, dict[str, Any]] = field(default_factory=dict)
+    deleted: bool = False  # dropped once every slot is cleared
+
+    def as_storage(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "code_encrypted": self.code_encrypted,
+            "enabled": self.enabled,
+            "assignments": self.assignments,
+            "revoking": self.revoking,
+            "deleted": self.deleted,
+        }
 
 
 class Crypto:
-    def __init__(self, key: bytes):
-        self._fernet = Fernet(key)
+    """Fernet with optional retired keys that are still accepted for decryption."""
+
+    def __init__(self, key: bytes, old_keys: tuple[bytes, ...] = ()):
+        self._primary = Fernet(key)
+        self._old = [Fernet(k) for k in old_keys]
+        self._fernet = MultiFernet([self._primary, *self._old])
+
+    def is_current(self, token: str) -> bool:
+        """True when the token was made with the primary key (HMAC check only)."""
+        try:
+            self._primary.extract_timestamp(token.encode())
+        except InvalidToken:
+            return False
+        return True
+
+    def needs_rotation(self, token: str) -> bool:
+        """True when the token was made with one of the old keys."""
+        if self.is_current(token):
+            return False
+        for fernet in self._old:
+            try:
+                fernet.extract_timestamp(token.encode())
+            except InvalidToken:
+                continue
+            return True
+        return False
+
+    def rotate_many(self, tokens: list[str]) -> list[Optional[str]]:
+        """Re-encrypt tokens under the primary key, None for current or invalid ones."""
+        out: list[Optional[str]] = []
+        for token in tokens:
+            if self.is_current(token):
+                out.append(None)
+                continue
+            try:
+                out.append(self._fernet.rotate(token.encode()).decode())
+            except InvalidToken:
+                out.append(None)
+        return out
 
     def encrypt(self, plaintext: str) -> str:
         return self._fernet.encrypt(plaintext.encode()).decode()
@@ -44,88 +153,464 @@ class Crypto:
     def decrypt(self, token: str) -> str:
         return self._fernet.decrypt(token.encode()).decode()
 
+    def encrypt_many(self, plaintexts: list[str]) -> list[str]:
+        return [self.encrypt(p) for p in plaintexts]
+
+    def decrypt_many(self, tokens: list[Optional[str]]) -> list[Optional[str]]:
+        """Decrypt a batch, None for missing or invalid tokens."""
+        out: list[Optional[str]] = []
+        for token in tokens:
+            try:
+                out.append(self.decrypt(token) if token else None)
+            except InvalidToken:
+                out.append(None)
+        return out
+
+
+class _IndexStore(Store):
+    """The index file, which held every lock's slots inline in version 1."""
+
+    async def _async_migrate_func(
+        self, old_major_version: int, old_minor_version: int, old_data: dict[str, Any]
+    ) -> dict[str, Any]:
+        # Inline slots are moved to the lock files by async_load, which then
+        # writes those before the index so an interrupted move starts over
+        return old_data
+
+
+def lock_storage_key(ieee: str) -> str:
+    return LOCK_STORAGE_PREFIX + ieee.replace(":", "")
+
+
+def _lock_meta(lock: Lock, scheduled: bool) -> dict[str, Any]:
+    """Serialize the index entry of one lock, everything but the slots."""
+    return {
+        "name": lock.name,
+        "entity_id": lock.entity_id,
+        "max_slots": lock.max_slots,
+        "slot_offset": lock.slot_offset,
+        "revision": lock.revision,
+        "last_reconciled": lock.last_reconciled,
+        "capacity": lock.capacity,
+        # Lets the scheduler load only the locks it has work on
+        "scheduled": scheduled,
+    }
+
 
 class ZLMLocalStore:
-    """HA storage wrapper with encrypted codes and typed mapping."""
+    """HA storage wrapper with encrypted codes and typed mapping.
 
-    def __init__(self, hass: HomeAssistant):
+    Storage is split in a small index (lock metadata, users, alarm rules) and
+    one file per lock with its slots. Lock files are read on first access
+    through async_get_lock, until then a lock only has its metadata and an
+    empty slot table. Mutations go through the helpers below, which schedule a
+    delayed save of the index and of the touched lock's file only, so a write
+    costs the size of that lock rather than of the whole installation.
+
+    For the keypad unlock path the store also keeps an index from the slot the lock
+    reports, (device_ieee, code_slot), to the stored slot with the offset applied,
+    plus a small cache of decrypted codes. Both are kept current by the helpers.
+
+    Every mutation bumps `revision` and is dispatched on SIGNAL_STORE_DELTA as a
+    delta with only the changed fields, never the code itself.
+    """
+
+    def __init__(self, hass: HomeAssistant, save_delay: float = DEFAULT_SAVE_DELAY):
         self.hass = hass
-        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY, private=True)
+        self._store = _IndexStore(hass, STORAGE_VERSION, STORAGE_KEY, private=True)
+        self._lock_stores: Dict[str, Store] = {}
         self._key_store = Store(hass, KEY_STORAGE_VERSION, KEY_STORAGE_KEY, private=True)
         self.crypto: Optional[Crypto] = None
         self.locks: Dict[str, Lock] = {}
+        self.users: Dict[str, User] = {}
+        # Alarm routing rule per device_ieee, see alarm_rules.py
+        self.alarm_rules: Dict[str, dict[str, Any]] = {}
+        self.save_delay = save_delay
+        # Locks with changes not yet in their file
+        self._dirty: set[str] = set()
+        # Locks whose file was not read yet, and the reads in flight
+        self._unloaded: set[str] = set()
+        self._load_tasks: Dict[str, asyncio.Task] = {}
+        # Locks with schedules per the index, kept for locks not read yet
+        self._scheduled: set[str] = set()
+        self._code_index: Dict[tuple[str, int], int] = {}
+        self._code_cache = CodeCache()
+        self.revision = 0
+        # Slots whose last write failed, so the lock state is unknown (memory only)
+        self._suspect: Dict[str, set[int]] = {}
+        # Key store contents: {"key", "old_keys", "rotation"}
+        self._key_data: dict[str, Any] = {}
+        self._rotation_task: Optional[asyncio.Task] = None
+        self.metrics: Optional[ZLMMetrics] = None  # set by the entry once created
+        self._loaded = asyncio.Event()
+        self.load_error: Optional[Exception] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded.is_set() and self.load_error is None
+
+    async def async_wait_loaded(self) -> None:
+        """Wait until async_load has built the slot model, raise if the load failed."""
+        await self._loaded.wait()
+        if self.load_error is not None:
+            raise HomeAssistantError("Lock manager store failed to load") from self.load_error
+
+    @callback
+    def async_load_failed(self, err: Exception) -> None:
+        """Release the waiters of a load that raised, they get the error."""
+        self.load_error = err
+        self._loaded.set()
 
     async def async_load(self) -> None:
         # Load or generate key
         key_data = await self._key_store.async_load()
         if not key_data or "key" not in key_data:
-            key = Fernet.generate_key()
-            await self._key_store.async_save({"key": key.decode()})
-        else:
-            key = key_data["key"].encode()
-        self.crypto = Crypto(key)
+            key_data = {"key": Fernet.generate_key().decode()}
+            await self._key_store.async_save(key_data)
+        self._key_data = key_data
+        self._build_crypto()
 
         data = await self._store.async_load()
+        self._dirty = set()
+        self._unloaded = set()
+        self._scheduled = set()
+        self._code_index = {}
+        self._code_cache.clear()
+        self._suspect = {}
         if not data:
+            self.revision = 0
             self.locks = {}
+            self.users = {}
+            self.alarm_rules = {}
+            self._loaded.set()
             return
 
+        self.revision = int(data.get("revision", 0))
         self.locks = {}
+        migrated = False
         for ieee, raw in data.get("locks", {}).items():
-            slots: Dict[int, Slot] = {}
-            for k, v in raw.get("slots", {}).items():
-                slots[int(k)] = Slot(
-                    slot=int(k),
-                    label=v.get("label", ""),
-                    enabled=v.get("enabled", True),
-                    code_encrypted=v.get("code_encrypted"),
-                )
-            self.locks[ieee] = Lock(
+            lock = self.locks[ieee] = Lock(
                 name=raw["name"],
                 entity_id=raw["entity_id"],
                 device_ieee=ieee,
-                max_slots=raw.get("max_slots", 30),
+                max_slots=raw.get("max_slots", DEFAULT_MAX_SLOTS),
                 slot_offset=raw.get("slot_offset", 0),
-                slots=slots,
+                revision=raw.get("revision", 0),
+                last_reconciled=raw.get("last_reconciled"),
+                capacity=raw.get("capacity"),
             )
+            self.revision = max(self.revision, lock.revision)
+            if "slots" in raw:
+                # Version 1 index, the slots go to the lock file on the save below
+                lock.slots = SlotTable.from_storage(raw["slots"])
+                self._reindex_lock(lock)
+                self._dirty.add(ieee)
+                migrated = True
+            else:
+                self._unloaded.add(ieee)
+                if raw.get("scheduled"):
+                    self._scheduled.add(ieee)
 
-    async def async_save(self) -> None:
-        data = {
+        self.users = {
+            user_id: User(
+                user_id=user_id,
+                name=raw["name"],
+                code_encrypted=raw.get("code_encrypted"),
+                enabled=raw.get("enabled", True),
+                assignments=raw.get("assignments", {}),
+                revoking=raw.get("revoking", {}),
+                deleted=raw.get("deleted", False),
+            )
+            for user_id, raw in data.get("users", {}).items()
+        }
+        self.alarm_rules = data.get("alarm_rules", {})
+        if migrated:
+            _LOGGER.info("ZLM: Moving the slots of %d locks to one file per lock", len(self.locks))
+            await self.async_save()
+        self._loaded.set()
+
+    # Lock files
+
+    def _lock_store(self, ieee: str) -> Store:
+        if (store := self._lock_stores.get(ieee)) is None:
+            store = self._lock_stores[ieee] = Store(
+                self.hass, LOCK_STORAGE_VERSION, lock_storage_key(ieee), private=True
+            )
+        return store
+
+    def lock_loaded(self, ieee: str) -> bool:
+        """False while the lock's file was not read, its slot table is empty then."""
+        return ieee not in self._unloaded
+
+    async def async_get_lock(self, ieee: str) -> Optional[Lock]:
+        """Return a lock with its slots, reading its file on first access."""
+        lock = self.locks.get(ieee)
+        if lock is None or ieee not in self._unloaded:
+            return lock
+        if (task := self._load_tasks.get(ieee)) is None:
+            # Concurrent callers share one read
+            task = self._load_tasks[ieee] = self.hass.async_create_background_task(
+                self._async_load_lock(lock), "zha_lock_manager load lock"
+            )
+        await asyncio.shield(task)
+        return self.locks.get(ieee)
+
+    async def async_load_locks(self, ieees: Optional[Iterable[str]] = None) -> None:
+        """Read the files of some locks, or of every lock, concurrently."""
+        if not self._unloaded:
+            return
+        await asyncio.gather(
+            *(self.async_get_lock(ieee) for ieee in (self.locks if ieees is None else ieees))
+        )
+
+    def scheduled_locks(self) -> list[str]:
+        """Locks not read yet that had schedules when the index was written."""
+        return [ieee for ieee in self._scheduled if ieee in self._unloaded]
+
+    async def _async_load_lock(self, lock: Lock) -> None:
+        ieee = lock.device_ieee
+        try:
+            data = await self._lock_store(ieee).async_load()
+        finally:
+            self._load_tasks.pop(ieee, None)
+        if ieee not in self._unloaded or self.locks.get(ieee) is not lock:
+            return  # removed or wiped meanwhile
+        lock.slots = SlotTable.from_storage((data or {}).get("slots", {}))
+        lock.cached_dict = None
+        self._unloaded.discard(ieee)
+        self._reindex_lock(lock)
+
+    # Saving
+
+    def _index_data(self) -> dict[str, Any]:
+        """Build the index payload, metadata only so it stays small."""
+        if self.metrics is None:
+            return self._build_index()
+        with self.metrics.timed(self.metrics.serialize):
+            return self._build_index()
+
+    def _build_index(self) -> dict[str, Any]:
+        return {
+            "revision": self.revision,
             "locks": {
-                ieee: {
-                    "name": lock.name,
-                    "entity_id": lock.entity_id,
-                    "max_slots": lock.max_slots,
-                    "slot_offset": lock.slot_offset,
-                    "slots": {
-                        str(s.slot): {
-                            "label": s.label,
-                            "enabled": s.enabled,
-                            "code_encrypted": s.code_encrypted,
-                        }
-                        for s in lock.slots.values()
-                    },
-                }
+                ieee: _lock_meta(
+                    lock,
+                    ieee in self._scheduled
+                    if ieee in self._unloaded
+                    else next(lock.slots.schedules(), None) is not None,
+                )
                 for ieee, lock in self.locks.items()
-            }
+            },
+            # Few users with few assignments, cheap to write out every time
+            "users": {user_id: user.as_storage() for user_id, user in self.users.items()},
+            "alarm_rules": self.alarm_rules,
         }
-        await self._store.async_save(data)
+
+    def _lock_data(self, lock: Lock) -> dict[str, Any]:
+        """Build the payload of one lock file, called when it is written."""
+        self._dirty.discard(lock.device_ieee)
+        if self.metrics is None:
+            return {"slots": lock.slots.to_storage()}
+        with self.metrics.timed(self.metrics.serialize):
+            return {"slots": lock.slots.to_storage()}
+
+    @callback
+    def async_schedule_save(self, lock: Optional[Lock] = None) -> None:
+        """Coalesce the write of the index, and of a lock's file, with other pending changes."""
+        if lock is not None and lock.device_ieee not in self._unloaded:
+            # A lock not read yet has only metadata changes, which live in the index.
+            # Writing its empty slot table would lose the file.
+            self._dirty.add(lock.device_ieee)
+            self._lock_store(lock.device_ieee).async_delay_save(
+                lambda: self._lock_data(lock), self.save_delay
+            )
+        self._store.async_delay_save(self._index_data, self.save_delay)
+
+    async def async_save(self) -> None:
+        """Write pending lock files and the index now, cancelling delayed saves."""
+        if self.metrics is None:
+            await self._async_write()
+            return
+        with self.metrics.timed(self.metrics.saves):
+            await self._async_write()
+
+    async def _async_write(self) -> None:
+        # Lock files first, so the index never points at slots that are not on disk
+        locks = [self.locks[ieee] for ieee in self._dirty if ieee in self.locks]
+        await asyncio.gather(
+            *(
+                self._lock_store(lock.device_ieee).async_save(self._lock_data(lock))
+                for lock in locks
+            )
+        )
+        await self._store.async_save(self._index_data())
+
+    async def async_flush(self) -> None:
+        """Write pending changes now, for callers that need durability before replying."""
+        await self.async_save()
+
+    def _reindex_lock(self, lock: Lock) -> None:
+        """Rebuild the reported slot index for one lock and drop its cached codes."""
+        ieee = lock.device_ieee
+        self._drop_index(ieee)
+        offset = int(lock.slot_offset)
+        for slot in lock.slots.populated():
+            self._code_index[(ieee, slot - offset)] = slot
+
+    def _drop_index(self, ieee: str) -> None:
+        for key in [k for k in self._code_index if k[0] == ieee]:
+            self._code_cache.invalidate((ieee, self._code_index.pop(key)))
+
+    def _notify(self, ieee: str, slot: Optional[int], changes: dict[str, Any]) -> None:
+        self.revision += 1
+        if (lock := self.locks.get(ieee)) is not None:
+            lock.revision = self.revision
+            lock.cached_dict = None
+        delta = {
+            "revision": self.revision,
+            "device_ieee": ieee,
+            "slot": slot,
+            "changes": changes,
+        }
+        async_dispatcher_send(self.hass, SIGNAL_STORE_DELTA, delta)
 
     # Convenience helpers
     def get_lock(self, ieee: str) -> Optional[Lock]:
+        """Return a lock as is, callers that need its slots use async_get_lock."""
         return self.locks.get(ieee)
 
     def ensure_slot(self, lock: Lock, slot: int) -> Slot:
-        if slot not in lock.slots:
-            lock.slots[slot] = Slot(slot=slot)
-        return lock.slots[slot]
+        return lock.slots.add(slot)
+
+    def add_lock(self, lock: Lock) -> None:
+        self.locks[lock.device_ieee] = lock
+        self._reindex_lock(lock)
+        self.async_schedule_save(lock)
+        self._notify(
+            lock.device_ieee,
+            None,
+            {
+                "added": True,
+                "name": lock.name,
+                "entity_id": lock.entity_id,
+                "max_slots": lock.max_slots,
+                "slot_offset": lock.slot_offset,
+            },
+        )
+
+    def remove_lock(self, ieee: str) -> None:
+        if self.locks.pop(ieee, None) is not None:
+            self._drop_index(ieee)
+            self.alarm_rules.pop(ieee, None)
+            self._dirty.discard(ieee)
+            self._unloaded.discard(ieee)
+            self._scheduled.discard(ieee)
+            self.hass.async_create_background_task(
+                self._lock_store(ieee).async_remove(), "zha_lock_manager remove lock"
+            )
+            self._lock_stores.pop(ieee, None)
+            self.async_schedule_save()
+            self._notify(ieee, None, {"removed": True})
+
+    def update_lock_meta(
+        self,
+        lock: Lock,
+        name: Optional[str] = None,
+        max_slots: Optional[int] = None,
+        slot_offset: Optional[int] = None,
+    ) -> None:
+        changes: dict[str, Any] = {}
+        if name is not None and name != lock.name:
+            lock.name = changes["name"] = name
+        if max_slots is not None and int(max_slots) != lock.max_slots:
+            lock.max_slots = changes["max_slots"] = int(max_slots)
+        if slot_offset is not None and int(slot_offset) != lock.slot_offset:
+            lock.slot_offset = changes["slot_offset"] = int(slot_offset)
+            self._reindex_lock(lock)
+        if changes:
+            self.async_schedule_save(lock)
+            self._notify(lock.device_ieee, None, changes)
+
+    def set_capacity(self, lock: Lock, capacity: dict[str, Any]) -> None:
+        """Record a capacity read from the lock.
 
-    def set_code(self, lock: Lock, slot: int, code: str, label: str = "", enabled: bool = True) -> None:
+        While max_slots is still the default it follows the number of PIN users.
+        Only the index is written, and the panel only hears of actual changes.
+        """
+        before = lock_capacity(lock)
+        lock.capacity = capacity
+        changes: dict[str, Any] = {}
+        if (after := lock_capacity(lock)) != before:
+            changes["capacity"] = after
+            pin_users = after["pin_users"]
+            if (
+                pin_users
+                and pin_users != before["pin_users"]
+                and lock.max_slots == DEFAULT_MAX_SLOTS
+                and pin_users > lock.slot_offset
+            ):
+                lock.max_slots = changes["max_slots"] = pin_users - lock.slot_offset
+        self.async_schedule_save()
+        if changes:
+            self._notify(lock.device_ieee, None, changes)
+
+    def set_enabled(self, lock: Lock, slot: int, enabled: bool) -> None:
+        self.ensure_slot(lock, slot).enabled = enabled
+        self.async_schedule_save(lock)
+        self._notify(lock.device_ieee, slot, {"enabled": enabled})
+
+    def set_label(self, lock: Lock, slot: int, label: str) -> None:
+        self.ensure_slot(lock, slot).label = label
+        self.async_schedule_save(lock)
+        self._notify(lock.device_ieee, slot, {"label": label})
+
+    def save_user(self, user: User) -> None:
+        """Insert or replace a user, the caller has mutated it in place or built it new."""
+        self.users[user.user_id] = user
+        self.async_schedule_save()
+        async_dispatcher_send(self.hass, SIGNAL_USER_UPDATE, user.user_id)
+
+    def remove_user(self, user_id: str) -> None:
+        if self.users.pop(user_id, None) is not None:
+            self.async_schedule_save()
+            async_dispatcher_send(self.hass, SIGNAL_USER_UPDATE, user_id)
+
+    def set_alarm_rule(self, lock: Lock, rule: Optional[dict[str, Any]]) -> None:
+        """Replace the alarm routing rule of a lock, None goes back to the defaults."""
+        if rule is None:
+            self.alarm_rules.pop(lock.device_ieee, None)
+        else:
+            self.alarm_rules[lock.device_ieee] = rule
+        self.async_schedule_save()
+        async_dispatcher_send(self.hass, SIGNAL_ALARM_RULES_UPDATE, lock.device_ieee)
+
+    def set_schedule(self, lock: Lock, slot: int, schedule: Optional[dict[str, Any]]) -> None:
+        """Attach a validity schedule to a slot, or drop it with None."""
+        self.ensure_slot(lock, slot).schedule = schedule
+        self.async_schedule_save(lock)
+        self._notify(lock.device_ieee, slot, {"schedule": schedule})
+
+    def set_code(
+        self,
+        lock: Lock,
+        slot: int,
+        code: str,
+        label: str = "",
+        enabled: bool = True,
+        token: Optional[str] = None,
+    ) -> None:
+        """Store a code. Pass `token` when it was already encrypted in a batch."""
         assert self.crypto
         s = self.ensure_slot(lock, slot)
         s.label = label
         s.enabled = enabled
-        s.code_encrypted = self.crypto.encrypt(code)
+        s.code_encrypted = token or self.crypto.encrypt(code)
+        self._code_index[(lock.device_ieee, slot - int(lock.slot_offset))] = slot
+        self._code_cache.put((lock.device_ieee, slot), code)
+        self.async_schedule_save(lock)
+        self._notify(
+            lock.device_ieee, slot, {"label": label, "enabled": enabled, "has_code": True}
+        )
 
     def clear_code(self, lock: Lock, slot: int) -> None:
         """Clear code and metadata for a slot."""
@@ -134,6 +619,31 @@ class ZLMLocalStore:
             s.code_encrypted = None
             s.enabled = False
             s.label = ""  # fix: also clear label so the UI shows Empty with no name
+            s.schedule = None  # a schedule without a code has nothing to act on
+            self._code_index.pop((lock.device_ieee, slot - int(lock.slot_offset)), None)
+            self._code_cache.invalidate((lock.device_ieee, slot))
+            self.async_schedule_save(lock)
+            self._notify(
+                lock.device_ieee,
+                slot,
+                {"label": "", "enabled": False, "has_code": False, "schedule": None},
+            )
+
+    def mark_suspect(self, lock: Lock, slot: int) -> None:
+        """Remember a slot whose lock state may differ from the store."""
+        self._suspect.setdefault(lock.device_ieee, set()).add(slot)
+
+    def suspect_slots(self, lock: Lock) -> set[int]:
+        return set(self._suspect.get(lock.device_ieee, ()))
+
+    def mark_reconciled(self, lock: Lock, when: str, verified: set[int]) -> None:
+        """Record a finished read-back sweep and forget suspects it verified."""
+        if (suspects := self._suspect.get(lock.device_ieee)) is not None:
+            suspects -= verified
+        lock.last_reconciled = when
+        # Only the index holds last_reconciled, the slot file is unchanged
+        self.async_schedule_save()
+        self._notify(lock.device_ieee, None, {"last_reconciled": when})
 
     def get_plain_code(self, lock: Lock, slot: int) -> Optional[str]:
         assert self.crypto
@@ -141,12 +651,204 @@ class ZLMLocalStore:
         if not s or not s.code_encrypted:
             return None
         try:
-            return self.crypto.decrypt(s.code_encrypted)
+            code = self.crypto.decrypt(s.code_encrypted)
         except InvalidToken:
             return None
+        if self.rotating and self.crypto.needs_rotation(s.code_encrypted):
+            # Lazy half of key rotation, the sweep will skip this one
+            s.code_encrypted = self.crypto.encrypt(code)
+            self.async_schedule_save(lock)
+        return code
+
+    async def async_encrypt_many(self, plaintexts: list[str]) -> list[str]:
+        """Encrypt a batch in the executor, chunked so no single job runs long."""
+        assert self.crypto
+        out: list[str] = []
+        for start in range(0, len(plaintexts), CRYPTO_CHUNK_SIZE):
+            out.extend(
+                await self.hass.async_add_executor_job(
+                    self.crypto.encrypt_many, plaintexts[start : start + CRYPTO_CHUNK_SIZE]
+                )
+            )
+        return out
+
+    async def async_decrypt_many(self, tokens: list[Optional[str]]) -> list[Optional[str]]:
+        """Decrypt a batch in the executor, None for missing or invalid tokens."""
+        assert self.crypto
+        out: list[Optional[str]] = []
+        for start in range(0, len(tokens), CRYPTO_CHUNK_SIZE):
+            out.extend(
+                await self.hass.async_add_executor_job(
+                    self.crypto.decrypt_many, tokens[start : start + CRYPTO_CHUNK_SIZE]
+                )
+            )
+        return out
+
+    async def async_get_plain_codes(self, lock: Lock, slots: list[int]) -> Dict[int, Optional[str]]:
+        """Decrypt the codes of several slots of one lock off the event loop."""
+        tokens = [
+            s.code_encrypted if (s := lock.slots.get(slot)) is not None else None
+            for slot in slots
+        ]
+        return dict(zip(slots, await self.async_decrypt_many(tokens)))
+
+    def lookup_code(self, ieee: str, code_slot: int) -> Optional[str]:
+        """Return the plain code for a slot as reported by the lock, offset not applied.
+
+        Hot path for zha_event: an index lookup and a cache hit in the common case,
+        a single decrypt on a miss.
+        """
+        slot = self._code_index.get((ieee, code_slot))
+        if slot is None:
+            return None
+        key = (ieee, slot)
+        code = self._code_cache.get(key)
+        if code is None:
+            lock = self.locks.get(ieee)
+            code = self.get_plain_code(lock, slot) if lock else None
+            if code:
+                self._code_cache.put(key, code)
+        return code
+
+    # Key rotation
+    #
+    # Starting a rotation saves a new primary key with the old ones kept for
+    # decryption, before any token is touched. A background sweep then re-encrypts
+    # one lock at a time and records finished locks in the key store, so an
+    # interrupted sweep resumes where it stopped. Tokens read in the meantime are
+    # re-encrypted on access. Old keys are dropped once no token uses them.
+
+    def _build_crypto(self) -> None:
+        self.crypto = Crypto(
+            self._key_data["key"].encode(),
+            tuple(k.encode() for k in self._key_data.get("old_keys", [])),
+        )
+
+    @property
+    def rotating(self) -> bool:
+        return self._key_data.get("rotation") is not None
+
+    def key_rotation_status(self) -> dict[str, Any]:
+        rotation = self._key_data.get("rotation")
+        return {
+            "active": rotation is not None,
+            "started": rotation["started"] if rotation else None,
+            "locks_done": len(rotation["done"]) if rotation else len(self.locks),
+            "locks_total": len(self.locks),
+            "old_keys": len(self._key_data.get("old_keys", [])),
+        }
+
+    async def async_start_key_rotation(self) -> dict[str, Any]:
+        """Switch to a new primary key and re-encrypt every slot in the background."""
+        if not self.rotating:
+            self._key_data = {
+                "key": Fernet.generate_key().decode(),
+                "old_keys": [self._key_data["key"], *self._key_data.get("old_keys", [])],
+                "rotation": {"started": dt_util.utcnow().isoformat(), "done": []},
+            }
+            await self._key_store.async_save(self._key_data)
+            self._build_crypto()
+        self.async_resume_key_rotation()
+        return self.key_rotation_status()
+
+    @callback
+    def async_resume_key_rotation(self) -> None:
+        """Start the sweep if a rotation is pending and no sweep runs yet."""
+        if self.rotating and self._rotation_task is None:
+            self._rotation_task = self.hass.async_create_background_task(
+                self._async_rotation_sweep(), "zha_lock_manager key rotation"
+            )
+
+    @callback
+    def async_stop_key_rotation(self) -> None:
+        """Stop the sweep, progress is kept and it resumes on next load."""
+        if self._rotation_task is not None:
+            self._rotation_task.cancel()
+            self._rotation_task = None
+
+    async def _async_rotation_sweep(self) -> None:
+        try:
+            rotation = self._key_data["rotation"]
+            for ieee in list(self.locks):
+                if ieee in rotation["done"] or (lock := await self.async_get_lock(ieee)) is None:
+                    continue
+                await self._async_rotate_lock(lock)
+                # Lock data first, then progress, so progress never runs ahead of disk
+                await self.async_flush()
+                rotation["done"].append(ieee)
+                await self._key_store.async_save(self._key_data)
+
+            await self._async_rotate_users()
+
+            # Retire old keys only when no token needs them anymore
+            assert self.crypto
+            await self.async_load_locks()
+            tokens = [
+                token
+                for lock in self.locks.values()
+                for _, _, _, token in lock.slots.rows()
+                if token
+            ]
+            tokens.extend(u.code_encrypted for u in self.users.values() if u.code_encrypted)
+            if not any(self.crypto.needs_rotation(token) for token in tokens):
+                self._key_data = {"key": self._key_data["key"]}
+                await self._key_store.async_save(self._key_data)
+                self._build_crypto()
+                _LOGGER.info("ZLM: Key rotation finished, old keys retired")
+            else:
+                # Tokens were written with an old key meanwhile, go around again
+                rotation["done"] = []
+                await self._key_store.async_save(self._key_data)
+                self.hass.loop.call_soon(self.async_resume_key_rotation)
+        finally:
+            self._rotation_task = None
+
+    async def _async_rotate_lock(self, lock: Lock) -> None:
+        assert self.crypto
+        slots = [lock.slots[slot] for slot in lock.slots.populated()]
+        old_tokens = [s.code_encrypted for s in slots]
+        new_tokens: list[Optional[str]] = []
+        for start in range(0, len(old_tokens), CRYPTO_CHUNK_SIZE):
+            new_tokens.extend(
+                await self.hass.async_add_executor_job(
+                    self.crypto.rotate_many, old_tokens[start : start + CRYPTO_CHUNK_SIZE]
+                )
+            )
+        changed = False
+        for s, old, new in zip(slots, old_tokens, new_tokens):
+            # Skip slots that were rewritten while we were in the executor
+            if new and s.code_encrypted == old:
+                s.code_encrypted = new
+                changed = True
+        if changed:
+            self.async_schedule_save(lock)
+
+    async def _async_rotate_users(self) -> None:
+        assert self.crypto
+        users = [u for u in self.users.values() if u.code_encrypted]
+        if not users:
+            return
+        old_tokens = [u.code_encrypted for u in users]
+        new_tokens = await self.hass.async_add_executor_job(self.crypto.rotate_many, old_tokens)
+        for user, old, new in zip(users, old_tokens, new_tokens):
+            if new and user.code_encrypted == old:
+                user.code_encrypted = new
+        await self.async_flush()
 
     async def async_wipe(self) -> None:
         """Delete all persisted data and reset memory."""
+        self.async_stop_key_rotation()
+        lock_stores = [self._lock_store(ieee) for ieee in self.locks]
+        self._lock_stores = {}
         self.locks = {}
+        self.users = {}
+        self.alarm_rules = {}
+        self._dirty = set()
+        self._unloaded = set()
+        self._scheduled = set()
+        self._code_index = {}
+        self._code_cache.clear()
+        self._suspect = {}
+        await asyncio.gather(*(store.async_remove() for store in lock_stores))
         await self._store.async_remove()
         await self._key_store.async_remove()
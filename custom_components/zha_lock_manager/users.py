@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+import logging
+from typing import Any, Optional
+import uuid
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .command_queue import JOB_FAILED, ZLMCommandQueues
+from .const import (
+    ACTION_SET,
+    ACTION_ENABLE,
+    ACTION_DISABLE,
+    ACTION_CLEAR,
+    USER_SYNC_PENDING,
+    USER_SYNC_DONE,
+    USER_SYNC_FAILED,
+    USER_RETRY_INTERVAL,
+)
+from .storage import User, ZLMLocalStore
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def user_to_dict(user: User) -> dict[str, Any]:
+    """Serialize a user for the WS API, without the code."""
+
+    return {
+        "user_id": user.user_id,
+        "name": user.name,
+        "enabled": user.enabled,
+        "has_code": bool(user.code_encrypted),
+        "deleted": user.deleted,
+        "assignments": [{"device_ieee": ieee, **state} for ieee, state in user.assignments.items()],
+        "revoking": list(user.revoking.values()),
+    }
+
+
+def _state(slot: int) -> dict[str, Any]:
+    return {"slot": slot, "status": USER_SYNC_PENDING, "error": None, "attempts": 0}
+
+
+def _revoke(user: User, ieee: str, slot: int) -> None:
+    user.revoking[f"{ieee}/{slot}"] = {"device_ieee": ieee, **_state(slot)}
+
+
+class ZLMUserManager:
+    """Keeps each user's code on all of their assigned locks.
+
+    A change fans out to every affected lock at once through the per-lock
+    command queues, so different locks are written concurrently (bounded per
+    coordinator) while each lock stays serial. Every assignment records its
+    own status, and failed ones are retried every USER_RETRY_INTERVAL.
+    """
+
+    def __init__(self, hass: HomeAssistant, store: ZLMLocalStore, queues: ZLMCommandQueues) -> None:
+        self.hass = hass
+        self.store = store
+        self.queues = queues
+        self._sync_locks: dict[str, asyncio.Lock] = {}
+        self._unsub_retry: Optional[CALLBACK_TYPE] = None
+
+    @callback
+    def async_start(self) -> None:
+        self._unsub_retry = async_track_time_interval(
+            self.hass, self._async_retry, timedelta(seconds=USER_RETRY_INTERVAL)
+        )
+        # Work that was cut short by a restart
+        self.hass.async_create_background_task(self._async_retry(), "zha_lock_manager users")
+
+    @callback
+    def async_stop(self) -> None:
+        if self._unsub_retry is not None:
+            self._unsub_retry()
+            self._unsub_retry = None
+
+    async def async_save_user(
+        self,
+        user_id: Optional[str],
+        name: str,
+        code: Optional[str],
+        enabled: bool,
+        assignments: dict[str, int],
+    ) -> User:
+        """Create or update a user and push the change to the locks.
+
+        `code` None keeps the current code. Only assignments that are affected
+        are written: all of them on a new code, new ones, and for an enable
+        change just the enable or disable. A new name only relabels the slots,
+        the lock does not store it.
+        """
+        store = self.store
+        user = store.users.get(user_id) if user_id else None
+        if user is None:
+            user = User(user_id=user_id or uuid.uuid4().hex, name=name)
+        elif user.deleted:
+            # Still clearing its slots, those clears go out with this save
+            user.deleted = False
+        code_changed = code is not None
+        if code_changed:
+            user.code_encrypted = (await store.async_encrypt_many([code]))[0]
+        if not user.code_encrypted:
+            raise ValueError("A new user needs a code")
+        name_changed = name != user.name
+        toggled = enabled != user.enabled
+        user.name = name
+        user.enabled = enabled
+
+        # Slots that are no longer assigned get cleared
+        for ieee, state in list(user.assignments.items()):
+            if assignments.get(ieee) != state["slot"]:
+                del user.assignments[ieee]
+                _revoke(user, ieee, state["slot"])
+
+        full: set[str] = set()
+        toggle: set[str] = set()
+        for ieee, slot in assignments.items():
+            state = user.assignments.get(ieee)
+            if state is None:
+                user.assignments[ieee] = _state(slot)
+                # Assigned again before the clear went out, the set overrides it
+                user.revoking.pop(f"{ieee}/{slot}", None)
+                full.add(ieee)
+            elif code_changed or state["status"] != USER_SYNC_DONE:
+                state["status"] = USER_SYNC_PENDING
+                full.add(ieee)
+            elif toggled:
+                state["status"] = USER_SYNC_PENDING
+                toggle.add(ieee)
+
+        if name_changed:
+            # Full writes carry the new label already
+            for ieee in user.assignments.keys() - full:
+                if (lock := await store.async_get_lock(ieee)) is not None:
+                    slot = int(user.assignments[ieee]["slot"]) + int(lock.slot_offset)
+                    store.set_label(lock, slot, name)
+
+        store.save_user(user)
+        await self._async_sync(user, full, toggle, set(user.revoking))
+        return user
+
+    async def async_delete_user(self, user_id: str) -> Optional[User]:
+        """Clear the user's code on every lock, the user goes once all are cleared."""
+        user = self.store.users.get(user_id)
+        if user is None:
+            return None
+        user.deleted = True
+        for ieee, state in user.assignments.items():
+            _revoke(user, ieee, state["slot"])
+        user.assignments = {}
+        self.store.save_user(user)
+        await self._async_sync(user, set(), set(), set(user.revoking))
+        return user
+
+    async def _async_retry(self, _now: Any = None) -> None:
+        for user in list(self.store.users.values()):
+            full = {
+                ieee for ieee, state in user.assignments.items() if state["status"] != USER_SYNC_DONE
+            }
+            if full or user.revoking:
+                await self._async_sync(user, full, set(), set(user.revoking))
+
+    async def _async_sync(
+        self, user: User, full: set[str], toggle: set[str], revoke: set[str]
+    ) -> None:
+        if not (full or toggle or revoke):
+            return
+        sync_lock = self._sync_locks.setdefault(user.user_id, asyncio.Lock())
+        async with sync_lock:
+            code = None
+            if full:
+                code = (await self.store.async_decrypt_many([user.code_encrypted]))[0]
+                if code is None:
+                    _LOGGER.error("ZLM: Code of user %s cannot be decrypted", user.name)
+                    return
+
+            tasks = []
+            for ieee in full | toggle:
+                if (state := user.assignments.get(ieee)) is None:
+                    continue
+                if ieee in full:
+                    actions = [ACTION_SET] if user.enabled else [ACTION_SET, ACTION_DISABLE]
+                else:
+                    actions = [ACTION_ENABLE if user.enabled else ACTION_DISABLE]
+                tasks.append(self._async_push(user, ieee, state, actions, code))
+            for key in revoke:
+                if (state := user.revoking.get(key)) is not None:
+                    tasks.append(
+                        self._async_push(user, state["device_ieee"], state, [ACTION_CLEAR], None)
+                    )
+            await asyncio.gather(*tasks)
+
+            for key in [k for k, s in user.revoking.items() if s["status"] == USER_SYNC_DONE]:
+                del user.revoking[key]
+            if user.deleted and not user.revoking:
+                self.store.remove_user(user.user_id)
+                self._sync_locks.pop(user.user_id, None)
+            else:
+                self.store.save_user(user)
+            await self.store.async_flush()
+
+    async def _async_push(
+        self,
+        user: User,
+        ieee: str,
+        state: dict[str, Any],
+        actions: list[str],
+        code: Optional[str],
+    ) -> None:
+        """Run the actions for one lock in order, recording the outcome in `state`."""
+        lock = await self.store.async_get_lock(ieee)
+        state["attempts"] += 1
+        if lock is None:
+            if actions == [ACTION_CLEAR]:
+                # Lock is no longer managed, nothing left to clear
+                state.update(status=USER_SYNC_DONE, error=None)
+            else:
+                state.update(status=USER_SYNC_FAILED, error="Unknown lock")
+            return
+        slot = int(state["slot"]) + int(lock.slot_offset)
+        for action in actions:
+            job = self.queues.async_enqueue(
+                lock,
+                action,
+                slot,
+                code=code if action == ACTION_SET else None,
+                label=user.name,
+                flush=False,
+                token=user.code_encrypted if action == ACTION_SET else None,
+            )
+            await job.future
+            if job.status == JOB_FAILED:
+                state.update(status=USER_SYNC_FAILED, error=job.error)
+                _LOGGER.debug(
+                    "ZLM: Sync of user %s to %s failed: %s", user.name, ieee, job.error
+                )
+                return
+        state.update(status=USER_SYNC_DONE, error=None)
+        self.store.save_user(user)
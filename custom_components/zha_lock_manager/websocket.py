@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Any, Dict, List
+import uuid
 
 import voluptuous as vol
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.components import websocket_api
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
@@ -17,8 +23,49 @@ from .const import (
     WS_CLEAR_CODE,
     WS_RENAME_CODE,
     WS_SAVE_LOCK_META,
+    WS_BULK_APPLY,
+    WS_GET_STATS,
+    WS_SUBSCRIBE,
+    SIGNAL_STORE_DELTA,
+    SIGNAL_JOB_UPDATE,
+    SIGNAL_USER_UPDATE,
+    WS_RECONCILE,
+    ACTION_SET,
+    ACTION_ENABLE,
+    ACTION_DISABLE,
+    ACTION_CLEAR,
+    BULK_ACTIONS,
+    WS_GET_JOB,
+    WS_ROTATE_KEY,
+    WS_KEY_ROTATION_STATUS,
+    WS_EXPORT,
+    WS_IMPORT,
+    WS_SET_SCHEDULE,
+    WS_LIST_USERS,
+    WS_SAVE_USER,
+    WS_DELETE_USER,
+    WS_GET_ALARM_RULES,
+    WS_SAVE_ALARM_RULE,
+    WS_QUERY_LOG,
+    ALARM_ARM_STATES,
+    CONF_ALARMO_ENABLED,
+    CONF_ALARMO_ENTITY_ID,
+    WEEKDAYS,
+    SCHEDULE_END_DISABLE,
+    SCHEDULE_END_CLEAR,
+    MIN_PASSPHRASE_LENGTH,
+    IMPORT_SESSION_TIMEOUT,
 )
-from .storage import ZLMLocalStore
+from .access_log import ZLMAccessLog
+from .alarm_rules import normalize_rule
+from .backup import BackupError, BackupImporter, async_export_lines
+from .command_queue import JOB_FAILED, ZLMCommandQueues
+from .metrics import timed_ws
+from .reconcile import async_reconcile_lock
+from .schedule import normalize_schedule
+from .storage import ZLMLocalStore, lock_capacity, validate_slot
+from .users import ZLMUserManager, user_to_dict
+from .zigbee import rate_limit_stats
 
 
 def _require_store(hass: HomeAssistant) -> ZLMLocalStore:
@@ -28,211 +75,850 @@ def _require_store(hass: HomeAssistant) -> ZLMLocalStore:
     return store
 
 
+def _require_queues(hass: HomeAssistant) -> ZLMCommandQueues:
+    queues: ZLMCommandQueues | None = hass.data.get(DOMAIN, {}).get("queues")
+    if queues is None:
+        raise websocket_api.ActiveConnectionError("Lock manager queues are not running")
+    return queues
+
+
+def _require_users(hass: HomeAssistant) -> ZLMUserManager:
+    users: ZLMUserManager | None = hass.data.get(DOMAIN, {}).get("users")
+    if users is None:
+        raise websocket_api.ActiveConnectionError("Lock manager users are not running")
+    return users
+
+
+async def _async_enqueue_slot_action(
+    hass: HomeAssistant, connection, msg: dict[str, Any], action: str
+) -> None:
+    """Queue one slot write and reply with its job id.
+
+    The reply also carries the lock as currently stored. With `wait` the reply is
+    sent once the job has finished, which is what scripts usually want.
+    """
+    store = _require_store(hass)
+    queues = _require_queues(hass)
+    lock = await store.async_get_lock(msg["device_ieee"])
+    if not lock:
+        connection.send_error(msg["id"], "not_found", "Unknown lock")
+        return
+    try:
+        validate_slot(lock, msg["slot"], msg.get("code"))
+    except ValueError as err:
+        connection.send_error(msg["id"], "invalid_format", str(err))
+        return
+
+    slot = int(msg["slot"]) + int(lock.slot_offset)
+    job = queues.async_enqueue(
+        lock, action, slot, code=msg.get("code"), label=msg.get("label", ""), interactive=True
+    )
+    if msg["wait"]:
+        await job.future
+        if job.status == JOB_FAILED:
+            connection.send_error(msg["id"], "zigbee_error", job.error or "Write failed")
+            return
+    connection.send_result(msg["id"], {**job.as_dict(), "lock": _lock_to_dict(lock)})
+
+
 def _lock_to_dict(lock) -> dict:
-    return {
-        "name": lock.name,
-        "entity_id": lock.entity_id,
-        "device_ieee": lock.device_ieee,
-        "max_slots": int(lock.max_slots),
-        "slot_offset": int(lock.slot_offset),
-        "slots": {
-            str(s.slot): {
-                "slot": s.slot,
-                "label": s.label,
-                "enabled": bool(s.enabled),
-                "has_code": bool(s.code_encrypted),
-            }
-            for s in sorted(lock.slots.values(), key=lambda x: x.slot)
-        },
+    """Serialize a lock for the panel, cached until the lock changes."""
+    if lock.cached_dict is None:
+        lock.cached_dict = {
+            "name": lock.name,
+            "entity_id": lock.entity_id,
+            "device_ieee": lock.device_ieee,
+            "max_slots": int(lock.max_slots),
+            "slot_offset": int(lock.slot_offset),
+            "revision": lock.revision,
+            "last_reconciled": lock.last_reconciled,
+            # What the lock reported, slots beyond pin_users - slot_offset are refused
+            "capacity": lock_capacity(lock),
+            # Rows come out of the slot table already in slot order
+            "slots": {
+                str(slot): {
+                    "slot": slot,
+                    "label": label,
+                    "enabled": enabled,
+                    "has_code": bool(token),
+                }
+                for slot, label, enabled, token in lock.slots.rows()
+            },
+        }
+        slots = lock.cached_dict["slots"]
+        for slot, schedule in lock.slots.schedules():
+            slots[str(slot)]["schedule"] = schedule
+    return lock.cached_dict
+
+
+def _filter_lock_dict(
+    data: dict, slot_range: list[int] | None, only_populated: bool
+) -> dict:
+    """Return a view of a serialized lock limited to some slots, without touching the cache."""
+    if slot_range is None and not only_populated:
+        return data
+    start, end = slot_range if slot_range is not None else (None, None)
+    slots = {
+        key: s
+        for key, s in data["slots"].items()
+        if (not only_populated or s["has_code"])
+        and (start is None or start <= s["slot"] <= end)
     }
+    return {**data, "slots": slots}
 
 
-@websocket_api.websocket_command({vol.Required("type"): WS_LIST_LOCKS})
+SLOT_RANGE_SCHEMA = vol.All(
+    [vol.Coerce(int)], vol.Length(min=2, max=2), lambda r: sorted(r)
+)
+
+LOCK_QUERY_SCHEMA = {
+    vol.Optional("since_revision"): int,
+    vol.Optional("slot_range"): SLOT_RANGE_SCHEMA,
+    vol.Optional("only_populated", default=False): bool,
+}
+
+
+@websocket_api.websocket_command({vol.Required("type"): WS_LIST_LOCKS, **LOCK_QUERY_SCHEMA})
 @websocket_api.async_response
+@timed_ws
 async def ws_list_locks(hass, connection, msg):
+    """List locks.
+
+    Without `since_revision` this returns a plain list of locks. With it, the
+    result is `{"revision", "not_modified", "locks", "device_ieees"}` where `locks`
+    only has locks changed after that revision and `device_ieees` lets the client
+    drop removed locks.
+    """
     store = _require_store(hass)
-    payload: List[Dict[str, Any]] = [_lock_to_dict(l) for l in store.locks.values()]
-    connection.send_result(msg["id"], payload)
+    slot_range = msg.get("slot_range")
+    only_populated = msg["only_populated"]
+
+    if "since_revision" not in msg:
+        await store.async_load_locks()
+        payload: List[Dict[str, Any]] = [
+            _filter_lock_dict(_lock_to_dict(l), slot_range, only_populated)
+            for l in store.locks.values()
+        ]
+        connection.send_result(msg["id"], payload)
+        return
+
+    since = msg["since_revision"]
+    if store.revision <= since:
+        connection.send_result(msg["id"], {"revision": store.revision, "not_modified": True})
+        return
+    await store.async_load_locks(
+        [ieee for ieee, l in store.locks.items() if l.revision > since]
+    )
+    connection.send_result(
+        msg["id"],
+        {
+            "revision": store.revision,
+            "not_modified": False,
+            "locks": [
+                _filter_lock_dict(_lock_to_dict(l), slot_range, only_populated)
+                for l in store.locks.values()
+                if l.revision > since
+            ],
+            "device_ieees": list(store.locks),
+        },
+    )
 
 
 @websocket_api.websocket_command(
     {
         vol.Required("type"): WS_GET_LOCK,
         vol.Required("device_ieee"): str,
+        **LOCK_QUERY_SCHEMA,
     }
 )
 @websocket_api.async_response
+@timed_ws
 async def ws_get_lock(hass, connection, msg):
     store = _require_store(hass)
-    lock = store.get_lock(msg["device_ieee"])
+    lock = await store.async_get_lock(msg["device_ieee"])
     if not lock:
         connection.send_error(msg["id"], "not_found", "Unknown lock")
         return
-    connection.send_result(msg["id"], _lock_to_dict(lock))
+    if msg.get("since_revision") is not None and lock.revision <= msg["since_revision"]:
+        connection.send_result(msg["id"], {"revision": lock.revision, "not_modified": True})
+        return
+    connection.send_result(
+        msg["id"],
+        _filter_lock_dict(_lock_to_dict(lock), msg.get("slot_range"), msg["only_populated"]),
+    )
+
+
+SLOT_ACTION_SCHEMA = {
+    vol.Required("device_ieee"): str,
+    vol.Required("slot"): int,
+    vol.Optional("wait", default=False): bool,
+}
 
 
 @websocket_api.websocket_command(
     {
         vol.Required("type"): WS_SET_CODE,
-        vol.Required("device_ieee"): str,
-        vol.Required("slot"): int,
+        **SLOT_ACTION_SCHEMA,
         vol.Required("code"): str,
         vol.Optional("label", default=""): str,
     }
 )
 @websocket_api.async_response
+@timed_ws
 async def ws_set_code(hass, connection, msg):
+    await _async_enqueue_slot_action(hass, connection, msg, ACTION_SET)
+
+
+@websocket_api.websocket_command({vol.Required("type"): WS_ENABLE_CODE, **SLOT_ACTION_SCHEMA})
+@websocket_api.async_response
+@timed_ws
+async def ws_enable_code(hass, connection, msg):
+    await _async_enqueue_slot_action(hass, connection, msg, ACTION_ENABLE)
+
+
+@websocket_api.websocket_command({vol.Required("type"): WS_DISABLE_CODE, **SLOT_ACTION_SCHEMA})
+@websocket_api.async_response
+@timed_ws
+async def ws_disable_code(hass, connection, msg):
+    await _async_enqueue_slot_action(hass, connection, msg, ACTION_DISABLE)
+
+
+@websocket_api.websocket_command({vol.Required("type"): WS_CLEAR_CODE, **SLOT_ACTION_SCHEMA})
+@websocket_api.async_response
+@timed_ws
+async def ws_clear_code(hass, connection, msg):
+    await _async_enqueue_slot_action(hass, connection, msg, ACTION_CLEAR)
+
+
+@websocket_api.websocket_command(
+    {vol.Required("type"): WS_GET_JOB, vol.Required("job_id"): str}
+)
+@websocket_api.async_response
+@timed_ws
+async def ws_get_job(hass, connection, msg):
+    job = _require_queues(hass).jobs.get(msg["job_id"])
+    if job is None:
+        connection.send_error(msg["id"], "not_found", "Unknown job")
+        return
+    connection.send_result(msg["id"], job.as_dict())
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): WS_RENAME_CODE,
+        vol.Required("device_ieee"): str,
+        vol.Required("slot"): int,
+        vol.Required("label"): str,
+    }
+)
+@websocket_api.async_response
+@timed_ws
+async def ws_rename_code(hass, connection, msg):
     store = _require_store(hass)
-    lock = store.get_lock(msg["device_ieee"])
+    lock = await store.async_get_lock(msg["device_ieee"])
     if not lock:
         connection.send_error(msg["id"], "not_found", "Unknown lock")
         return
-
+    try:
+        validate_slot(lock, msg["slot"])
+    except ValueError as err:
+        connection.send_error(msg["id"], "invalid_format", str(err))
+        return
     slot = int(msg["slot"]) + int(lock.slot_offset)
-    code = msg["code"]
-    label = msg.get("label", "")
-
-    # Write to the lock through ZHA
-    await hass.services.async_call(
-        "zha",
-        "set_lock_user_code",
-        {"code_slot": slot, "user_code": code},
-        target={"entity_id": lock.entity_id},
-        blocking=True,
-    )
-
-    # Persist locally
-    store.set_code(lock, slot, code, label=label, enabled=True)
-    await store.async_save()
+    store.set_label(lock, slot, msg["label"])
     connection.send_result(msg["id"], _lock_to_dict(lock))
 
 
+WEEKLY_WINDOW_SCHEMA = vol.Schema(
+    {
+        vol.Required("days"): vol.All(cv.ensure_list, [vol.In(WEEKDAYS)], vol.Length(min=1)),
+        vol.Required("start"): cv.time,
+        vol.Required("end"): cv.time,
+    }
+)
+
+SCHEDULE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("start"): cv.datetime,
+        vol.Optional("end"): cv.datetime,
+        vol.Optional("weekly", default=[]): [WEEKLY_WINDOW_SCHEMA],
+        vol.Optional("on_end", default=SCHEDULE_END_DISABLE): vol.In(
+            [SCHEDULE_END_DISABLE, SCHEDULE_END_CLEAR]
+        ),
+    }
+)
+
+
 @websocket_api.websocket_command(
-    {vol.Required("type"): WS_ENABLE_CODE, vol.Required("device_ieee"): str, vol.Required("slot"): int}
+    {
+        vol.Required("type"): WS_SET_SCHEDULE,
+        vol.Required("device_ieee"): str,
+        vol.Required("slot"): int,
+        vol.Required("schedule"): vol.Any(None, SCHEDULE_SCHEMA),
+    }
 )
 @websocket_api.async_response
-async def ws_enable_code(hass, connection, msg):
+@timed_ws
+async def ws_set_schedule(hass, connection, msg):
+    """Set or drop (schedule None) the validity window of a slot.
+
+    The scheduler picks the change up from the store delta and enables,
+    disables or clears the code on the lock as the window requires.
+    """
     store = _require_store(hass)
-    lock = store.get_lock(msg["device_ieee"])
+    lock = await store.async_get_lock(msg["device_ieee"])
     if not lock:
         connection.send_error(msg["id"], "not_found", "Unknown lock")
         return
-
+    schedule = None
+    try:
+        validate_slot(lock, msg["slot"])
+        if msg["schedule"] is not None:
+            schedule = normalize_schedule(msg["schedule"])
+    except ValueError as err:
+        connection.send_error(msg["id"], "invalid_format", str(err))
+        return
     slot = int(msg["slot"]) + int(lock.slot_offset)
-
-    await hass.services.async_call(
-        "zha",
-        "enable_lock_user_code",
-        {"code_slot": slot},
-        target={"entity_id": lock.entity_id},
-        blocking=True,
-    )
-
-    s = store.ensure_slot(lock, slot)
-    s.enabled = True
-    await store.async_save()
+    store.set_schedule(lock, slot, schedule)
     connection.send_result(msg["id"], _lock_to_dict(lock))
 
 
 @websocket_api.websocket_command(
-    {vol.Required("type"): WS_DISABLE_CODE, vol.Required("device_ieee"): str, vol.Required("slot"): int}
+    {
+        vol.Required("type"): WS_SAVE_LOCK_META,
+        vol.Required("device_ieee"): str,
+        vol.Optional("name"): str,
+        vol.Optional("max_slots"): int,
+        vol.Optional("slot_offset"): int,
+    }
 )
 @websocket_api.async_response
-async def ws_disable_code(hass, connection, msg):
+@timed_ws
+async def ws_save_lock_meta(hass, connection, msg):
     store = _require_store(hass)
-    lock = store.get_lock(msg["device_ieee"])
+    lock = await store.async_get_lock(msg["device_ieee"])
     if not lock:
         connection.send_error(msg["id"], "not_found", "Unknown lock")
         return
+    pin_users = lock_capacity(lock)["pin_users"]
+    slot_offset = msg.get("slot_offset", lock.slot_offset)
+    if pin_users and msg.get("max_slots", 0) > pin_users - slot_offset:
+        connection.send_error(
+            msg["id"], "invalid_format", f"The lock supports {pin_users} PIN users"
+        )
+        return
+    store.update_lock_meta(
+        lock,
+        name=msg.get("name"),
+        max_slots=msg.get("max_slots"),
+        slot_offset=msg.get("slot_offset"),
+    )
+    connection.send_result(msg["id"], _lock_to_dict(lock))
 
-    slot = int(msg["slot"]) + int(lock.slot_offset)
 
-    await hass.services.async_call(
-        "zha",
-        "disable_lock_user_code",
-        {"code_slot": slot},
-        target={"entity_id": lock.entity_id},
-        blocking=True,
+BULK_OPERATION_SCHEMA = vol.Schema(
+    {
+        vol.Required("device_ieee"): str,
+        vol.Required("slot"): int,
+        vol.Required("action"): vol.In(BULK_ACTIONS),
+        vol.Optional("code"): str,
+        vol.Optional("label", default=""): str,
+    }
+)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): WS_BULK_APPLY,
+        vol.Required("operations"): vol.All(cv.ensure_list, [BULK_OPERATION_SCHEMA]),
+    }
+)
+@websocket_api.async_response
+@timed_ws
+async def ws_bulk_apply(hass, connection, msg):
+    """Apply many slot actions across locks and stream one event per operation.
+
+    Operations go through the per-lock command queues, so the same lock runs them
+    serially in the given order while different locks run concurrently (bounded
+    per coordinator). The store is saved once at the end.
+    """
+    store = _require_store(hass)
+    operations: list[dict[str, Any]] = msg["operations"]
+
+    for op in operations:
+        if op["action"] == ACTION_SET and not op.get("code"):
+            connection.send_error(msg["id"], "invalid_format", "set requires a code")
+            return
+
+    # Acknowledge, results follow as events on the same message id
+    connection.send_result(msg["id"], {"total": len(operations)})
+
+    def _send(index: int, op: dict[str, Any], error: str | None) -> None:
+        connection.send_message(
+            websocket_api.event_message(
+                msg["id"],
+                {
+                    "index": index,
+                    "device_ieee": op["device_ieee"],
+                    "slot": op["slot"],
+                    "action": op["action"],
+                    "success": error is None,
+                    "error": error,
+                },
+            )
+        )
+
+    # Submission order is kept per lock by its queue, locks run concurrently
+    queues = _require_queues(hass)
+    failed = 0
+
+    # Encrypt all new codes in one go, off the event loop
+    set_indexes = [i for i, op in enumerate(operations) if op["action"] == ACTION_SET]
+    tokens = dict(
+        zip(
+            set_indexes,
+            await store.async_encrypt_many([operations[i]["code"] for i in set_indexes]),
+        )
+    )
+
+    async def _run(index: int, op: dict[str, Any]) -> None:
+        nonlocal failed
+        lock = await store.async_get_lock(op["device_ieee"])
+        if not lock:
+            failed += 1
+            _send(index, op, "Unknown lock")
+            return
+        try:
+            validate_slot(lock, op["slot"], op.get("code"))
+        except ValueError as err:
+            failed += 1
+            _send(index, op, str(err))
+            return
+        job = queues.async_enqueue(
+            lock,
+            op["action"],
+            int(op["slot"]) + int(lock.slot_offset),
+            code=op.get("code"),
+            label=op.get("label", ""),
+            flush=False,
+            token=tokens.get(index),
+        )
+        await job.future
+        if job.status == JOB_FAILED:
+            failed += 1
+            _send(index, op, job.error or "Write failed")
+        else:
+            _send(index, op, None)
+
+    await asyncio.gather(*(_run(index, op) for index, op in enumerate(operations)))
+
+    await store.async_flush()
+    connection.send_message(
+        websocket_api.event_message(
+            msg["id"],
+            {"done": True, "succeeded": len(operations) - failed, "failed": failed},
+        )
     )
 
-    s = store.ensure_slot(lock, slot)
-    s.enabled = False
-    await store.async_save()
-    connection.send_result(msg["id"], _lock_to_dict(lock))
+
+@websocket_api.websocket_command({vol.Required("type"): WS_SUBSCRIBE})
+@callback
+def ws_subscribe(hass, connection, msg):
+    """Push slot and lock deltas and job updates as they happen.
+
+    Delta events carry `revision`, `device_ieee`, `slot` (None for lock level
+    changes) and `changes`. A client that sees a revision gap should re-fetch,
+    this also covers events missed while the entry reloaded. Job events carry a
+    single `job` key with the job status, user events a single `user` key
+    (`{"user_id", "removed": True}` once a deleted user is gone).
+    """
+    store = _require_store(hass)
+
+    @callback
+    def _forward(delta: dict[str, Any]) -> None:
+        connection.send_message(websocket_api.event_message(msg["id"], delta))
+
+    @callback
+    def _forward_job(job: dict[str, Any]) -> None:
+        connection.send_message(websocket_api.event_message(msg["id"], {"job": job}))
+
+    @callback
+    def _forward_user(user_id: str) -> None:
+        # The store is replaced when the entry reloads, this subscription is not
+        if (current := hass.data.get(DOMAIN, {}).get("store")) is None:
+            return
+        user = current.users.get(user_id)
+        payload = user_to_dict(user) if user else {"user_id": user_id, "removed": True}
+        connection.send_message(websocket_api.event_message(msg["id"], {"user": payload}))
+
+    unsubs = [
+        async_dispatcher_connect(hass, SIGNAL_STORE_DELTA, _forward),
+        async_dispatcher_connect(hass, SIGNAL_JOB_UPDATE, _forward_job),
+        async_dispatcher_connect(hass, SIGNAL_USER_UPDATE, _forward_user),
+    ]
+
+    @callback
+    def _unsubscribe() -> None:
+        for unsub in unsubs:
+            unsub()
+
+    connection.subscriptions[msg["id"]] = _unsubscribe
+    connection.send_result(msg["id"], {"revision": store.revision})
 
 
 @websocket_api.websocket_command(
-    {vol.Required("type"): WS_CLEAR_CODE, vol.Required("device_ieee"): str, vol.Required("slot"): int}
+    {
+        vol.Required("type"): WS_RECONCILE,
+        vol.Optional("device_ieee"): str,
+        vol.Optional("full", default=False): bool,
+        vol.Optional("repair", default=False): bool,
+    }
 )
 @websocket_api.async_response
-async def ws_clear_code(hass, connection, msg):
+@timed_ws
+async def ws_reconcile(hass, connection, msg):
+    """Read codes back from one lock (or all) and report drift against the store."""
     store = _require_store(hass)
-    lock = store.get_lock(msg["device_ieee"])
-    if not lock:
-        connection.send_error(msg["id"], "not_found", "Unknown lock")
-        return
+    if "device_ieee" in msg:
+        lock = await store.async_get_lock(msg["device_ieee"])
+        if not lock:
+            connection.send_error(msg["id"], "not_found", "Unknown lock")
+            return
+        locks = [lock]
+    else:
+        await store.async_load_locks()
+        locks = list(store.locks.values())
+
+    queues = _require_queues(hass)
+    results = await asyncio.gather(
+        *(
+            async_reconcile_lock(
+                hass, store, queues, lock, full=msg["full"], repair=msg["repair"]
+            )
+            for lock in locks
+        )
+    )
+    connection.send_result(msg["id"], results)
 
-    slot = int(msg["slot"]) + int(lock.slot_offset)
 
-    await hass.services.async_call(
-        "zha",
-        "clear_lock_user_code",
-        {"code_slot": slot},
-        target={"entity_id": lock.entity_id},
-        blocking=True,
+@websocket_api.websocket_command({vol.Required("type"): WS_ROTATE_KEY})
+@websocket_api.require_admin
+@websocket_api.async_response
+@timed_ws
+async def ws_rotate_key(hass, connection, msg):
+    """Start (or resume) a key rotation, progress is reported by key_rotation_status."""
+    store = _require_store(hass)
+    connection.send_result(msg["id"], await store.async_start_key_rotation())
+
+
+@websocket_api.websocket_command({vol.Required("type"): WS_KEY_ROTATION_STATUS})
+@websocket_api.async_response
+@timed_ws
+async def ws_key_rotation_status(hass, connection, msg):
+    store = _require_store(hass)
+    connection.send_result(msg["id"], store.key_rotation_status())
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): WS_EXPORT,
+        vol.Required("passphrase"): vol.All(str, vol.Length(min=MIN_PASSPHRASE_LENGTH)),
+    }
+)
+@websocket_api.require_admin
+@websocket_api.async_response
+@timed_ws
+async def ws_export(hass, connection, msg):
+    """Stream an encrypted archive, one event per line, then a done event."""
+    store = _require_store(hass)
+    connection.send_result(msg["id"])
+    count = 0
+    async for line in async_export_lines(hass, store, msg["passphrase"]):
+        connection.send_message(
+            websocket_api.event_message(msg["id"], {"index": count, "line": line})
+        )
+        count += 1
+    connection.send_message(websocket_api.event_message(msg["id"], {"done": True, "lines": count}))
+
+
+@callback
+def async_close_import(hass: HomeAssistant, session: str) -> None:
+    """Drop an import session with its key and its idle timer."""
+    domain_data = hass.data.get(DOMAIN, {})
+    domain_data.get("imports", {}).pop(session, None)
+    if (cancel := domain_data.get("import_timers", {}).pop(session, None)) is not None:
+        cancel()
+
+
+@callback
+def async_close_imports(hass: HomeAssistant) -> None:
+    """Drop all import sessions, e.g. when the entry unloads."""
+    for session in list(hass.data.get(DOMAIN, {}).get("imports", {})):
+        async_close_import(hass, session)
+
+
+@callback
+def _async_touch_import(hass: HomeAssistant, session: str) -> None:
+    """Restart the idle timeout of an import session."""
+    timers = hass.data[DOMAIN].setdefault("import_timers", {})
+    if (cancel := timers.pop(session, None)) is not None:
+        cancel()
+
+    @callback
+    def _expire(_now: Any) -> None:
+        timers.pop(session, None)
+        async_close_import(hass, session)
+
+    timers[session] = async_call_later(hass, IMPORT_SESSION_TIMEOUT, _expire)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): WS_IMPORT,
+        vol.Optional("session"): str,
+        vol.Optional("passphrase"): str,
+        vol.Optional("push", default=False): bool,
+        vol.Required("lines"): [str],
+        vol.Optional("final", default=False): bool,
+    }
+)
+@websocket_api.require_admin
+@websocket_api.async_response
+@timed_ws
+async def ws_import(hass, connection, msg):
+    """Feed archive lines in batches.
+
+    The first call passes `passphrase` (and `push` to also write the codes to the
+    locks) and gets a `session` back, later calls pass that session. The call
+    with `final` checks the archive is complete and closes the session. A session
+    that gets no batch for IMPORT_SESSION_TIMEOUT is dropped.
+    """
+    store = _require_store(hass)
+    sessions: dict[str, BackupImporter] = hass.data[DOMAIN].setdefault("imports", {})
+    if "session" in msg:
+        session = msg["session"]
+        importer = sessions.get(session)
+        if importer is None:
+            connection.send_error(msg["id"], "not_found", "Unknown import session")
+            return
+    elif "passphrase" in msg:
+        session = uuid.uuid4().hex
+        queues = _require_queues(hass) if msg["push"] else None
+        importer = sessions[session] = BackupImporter(hass, store, queues, msg["passphrase"])
+    else:
+        connection.send_error(msg["id"], "invalid_format", "passphrase or session required")
+        return
+    _async_touch_import(hass, session)
+
+    try:
+        for line in msg["lines"]:
+            await importer.async_feed(line)
+        if msg["final"] and not importer.finished:
+            raise BackupError("Archive is incomplete")
+    except BackupError as err:
+        async_close_import(hass, session)
+        await store.async_flush()
+        connection.send_error(msg["id"], "invalid_format", str(err))
+        return
+
+    if msg["final"]:
+        async_close_import(hass, session)
+        await store.async_flush()
+    connection.send_result(
+        msg["id"], {"session": session, "finished": importer.finished, **importer.stats}
     )
 
-    store.clear_code(lock, slot)
-    await store.async_save()
-    connection.send_result(msg["id"], _lock_to_dict(lock))
+
+@websocket_api.websocket_command({vol.Required("type"): WS_GET_ALARM_RULES})
+@websocket_api.async_response
+@timed_ws
+async def ws_get_alarm_rules(hass, connection, msg):
+    """Alarm routing rules per lock, with the global defaults from the options."""
+    store = _require_store(hass)
+    entry = hass.data[DOMAIN]["entry"]
+    connection.send_result(
+        msg["id"],
+        {
+            "enabled": bool(entry.options.get(CONF_ALARMO_ENABLED, False)),
+            "default_entity_id": entry.options.get(CONF_ALARMO_ENTITY_ID) or "",
+            "arm_states": list(ALARM_ARM_STATES),
+            "locks": store.alarm_rules,
+        },
+    )
 
 
 @websocket_api.websocket_command(
     {
-        vol.Required("type"): WS_RENAME_CODE,
+        vol.Required("type"): WS_SAVE_ALARM_RULE,
         vol.Required("device_ieee"): str,
-        vol.Required("slot"): int,
-        vol.Required("label"): str,
+        vol.Required("rule"): vol.Any(
+            None,
+            {
+                vol.Optional("disarm", default=True): bool,
+                vol.Optional("entity_id", default=""): vol.Any(
+                    "", cv.entity_domain("alarm_control_panel")
+                ),
+                vol.Optional("arm_states", default=[]): [vol.In(ALARM_ARM_STATES)],
+                vol.Optional("never_disarm", default=[]): [vol.All(int, vol.Range(min=1))],
+            },
+        ),
     }
 )
 @websocket_api.async_response
-async def ws_rename_code(hass, connection, msg):
+@timed_ws
+async def ws_save_alarm_rule(hass, connection, msg):
+    """Replace the alarm rule of one lock, rule None goes back to the defaults."""
     store = _require_store(hass)
     lock = store.get_lock(msg["device_ieee"])
     if not lock:
         connection.send_error(msg["id"], "not_found", "Unknown lock")
         return
-    slot = int(msg["slot"]) + int(lock.slot_offset)
-    s = store.ensure_slot(lock, slot)
-    s.label = msg["label"]
-    await store.async_save()
-    connection.send_result(msg["id"], _lock_to_dict(lock))
+    rule = normalize_rule(msg["rule"]) if msg["rule"] is not None else None
+    store.set_alarm_rule(lock, rule)
+    connection.send_result(msg["id"], {"device_ieee": lock.device_ieee, "rule": rule})
+
+
+@websocket_api.websocket_command({vol.Required("type"): WS_LIST_USERS})
+@websocket_api.async_response
+@timed_ws
+async def ws_list_users(hass, connection, msg):
+    """Users with their per-lock sync status, deleted ones until fully cleared."""
+    store = _require_store(hass)
+    connection.send_result(msg["id"], [user_to_dict(user) for user in store.users.values()])
 
 
 @websocket_api.websocket_command(
     {
-        vol.Required("type"): WS_SAVE_LOCK_META,
-        vol.Required("device_ieee"): str,
-        vol.Optional("name"): str,
-        vol.Optional("max_slots"): int,
-        vol.Optional("slot_offset"): int,
+        vol.Required("type"): WS_SAVE_USER,
+        vol.Optional("user_id"): str,
+        vol.Required("name"): str,
+        vol.Optional("code"): str,
+        vol.Optional("enabled", default=True): bool,
+        vol.Optional("assignments", default=[]): [
+            {vol.Required("device_ieee"): str, vol.Required("slot"): int}
+        ],
     }
 )
 @websocket_api.async_response
-async def ws_save_lock_meta(hass, connection, msg):
+@timed_ws
+async def ws_save_user(hass, connection, msg):
+    """Create or update a user, replies once every affected lock was tried.
+
+    A slot that already holds a code this user did not put there is refused,
+    whether the code was set by hand or belongs to another user.
+    """
     store = _require_store(hass)
-    lock = store.get_lock(msg["device_ieee"])
-    if not lock:
-        connection.send_error(msg["id"], "not_found", "Unknown lock")
+    users = _require_users(hass)
+    user_id = msg.get("user_id")
+    existing = store.users.get(user_id) if user_id else None
+    assignments: dict[str, int] = {}
+    for item in msg["assignments"]:
+        lock = await store.async_get_lock(item["device_ieee"])
+        if not lock:
+            connection.send_error(msg["id"], "not_found", "Unknown lock")
+            return
+        try:
+            validate_slot(lock, item["slot"], msg.get("code"))
+        except ValueError as err:
+            connection.send_error(msg["id"], "invalid_format", str(err))
+            return
+        ieee, slot = lock.device_ieee, item["slot"]
+        owned = existing is not None and (
+            existing.assignments.get(ieee, {}).get("slot") == slot
+            or f"{ieee}/{slot}" in existing.revoking
+        )
+        s = lock.slots.get(slot + int(lock.slot_offset))
+        taken = (s is not None and bool(s.code_encrypted)) or any(
+            other.assignments.get(ieee, {}).get("slot") == slot
+            for other in store.users.values()
+            if other is not existing
+        )
+        if taken and not owned:
+            connection.send_error(msg["id"], "invalid_format", f"Slot {slot} already holds a code")
+            return
+        assignments[lock.device_ieee] = item["slot"]
+    try:
+        user = await users.async_save_user(
+            msg.get("user_id"), msg["name"], msg.get("code"), msg["enabled"], assignments
+        )
+    except ValueError as err:
+        connection.send_error(msg["id"], "invalid_format", str(err))
         return
-    if "name" in msg:
-        lock.name = msg["name"]
-    if "max_slots" in msg:
-        lock.max_slots = int(msg["max_slots"])
-    if "slot_offset" in msg:
-        lock.slot_offset = int(msg["slot_offset"])
-    await store.async_save()
-    connection.send_result(msg["id"], _lock_to_dict(lock))
+    connection.send_result(msg["id"], user_to_dict(user))
+
+
+@websocket_api.websocket_command(
+    {vol.Required("type"): WS_DELETE_USER, vol.Required("user_id"): str}
+)
+@websocket_api.async_response
+@timed_ws
+async def ws_delete_user(hass, connection, msg):
+    """Clear the user's code on all locks, the user is dropped once all are cleared."""
+    users = _require_users(hass)
+    user = await users.async_delete_user(msg["user_id"])
+    if user is None:
+        connection.send_error(msg["id"], "not_found", "Unknown user")
+        return
+    connection.send_result(msg["id"], user_to_dict(user))
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): WS_QUERY_LOG,
+        vol.Optional("device_ieee"): str,
+        vol.Optional("slot"): int,
+        vol.Optional("start"): cv.datetime,
+        vol.Optional("end"): cv.datetime,
+        vol.Optional("limit", default=100): vol.All(int, vol.Range(min=1, max=1000)),
+    }
+)
+@websocket_api.async_response
+@timed_ws
+async def ws_query_log(hass, connection, msg):
+    """Lock operation events, newest first. `start` is inclusive, `end` exclusive.
+
+    Only the in-memory part of the log is searched, older entries are in the
+    rotated files under the config directory.
+    """
+    access_log: ZLMAccessLog | None = hass.data.get(DOMAIN, {}).get("access_log")
+    if access_log is None:
+        raise websocket_api.ActiveConnectionError("Lock manager access log is not running")
+
+    def _ts(key: str) -> float | None:
+        value = msg.get(key)
+        if value is None:
+            return None
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=dt_util.get_default_time_zone())
+        return value.timestamp()
+
+    entries = access_log.query(
+        msg.get("device_ieee"), msg.get("slot"), _ts("start"), _ts("end"), msg["limit"]
+    )
+    connection.send_result(msg["id"], {"entries": [entry.as_dict() for entry in entries]})
+
+
+@websocket_api.websocket_command({vol.Required("type"): WS_GET_STATS})
+@websocket_api.async_response
+@timed_ws
+async def ws_get_stats(hass, connection, msg):
+    """Return runtime counters, useful for tuning on large meshes."""
+    domain_data = hass.data.get(DOMAIN, {})
+    stats: dict[str, Any] = {}
+    if (listener := domain_data.get("events")) is not None:
+        stats["events"] = listener.stats()
+    if (queues := domain_data.get("queues")) is not None:
+        stats["queues"] = queues.stats()
+    if (metrics := domain_data.get("metrics")) is not None:
+        stats["metrics"] = metrics.as_dict()
+    if (scheduler := domain_data.get("scheduler")) is not None:
+        stats["scheduled_transitions"] = scheduler.pending()
+    if (access_log := domain_data.get("access_log")) is not None:
+        stats["access_log"] = access_log.stats()
+    if (discovery := domain_data.get("discovery")) is not None:
+        stats["discovery"] = discovery.stats()
+    stats["rate_limit"] = rate_limit_stats(hass)
+    connection.send_result(msg["id"], stats)
 
 
 def register_ws_handlers(hass: HomeAssistant) -> None:
@@ -245,3 +931,19 @@ def register_ws_handlers(hass: HomeAssistant) -> None:
     websocket_api.async_register_command(hass, ws_clear_code)
     websocket_api.async_register_command(hass, ws_rename_code)
     websocket_api.async_register_command(hass, ws_save_lock_meta)
+    websocket_api.async_register_command(hass, ws_bulk_apply)
+    websocket_api.async_register_command(hass, ws_get_stats)
+    websocket_api.async_register_command(hass, ws_subscribe)
+    websocket_api.async_register_command(hass, ws_reconcile)
+    websocket_api.async_register_command(hass, ws_get_job)
+    websocket_api.async_register_command(hass, ws_rotate_key)
+    websocket_api.async_register_command(hass, ws_key_rotation_status)
+    websocket_api.async_register_command(hass, ws_export)
+    websocket_api.async_register_command(hass, ws_import)
+    websocket_api.async_register_command(hass, ws_set_schedule)
+    websocket_api.async_register_command(hass, ws_get_alarm_rules)
+    websocket_api.async_register_command(hass, ws_save_alarm_rule)
+    websocket_api.async_register_command(hass, ws_query_log)
+    websocket_api.async_register_command(hass, ws_list_users)
+    websocket_api.async_register_command(hass, ws_save_user)
+    websocket_api.async_register_command(hass, ws_delete_user)
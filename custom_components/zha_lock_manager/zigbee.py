@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import device_registry as dr
+
+from .const import (
+    DOMAIN,
+    ZHA_DOMAIN,
+    DEFAULT_COORDINATOR_CONCURRENCY,
+    DEFAULT_ZIGBEE_RATE,
+    DEFAULT_ZIGBEE_BURST,
+    CAPACITY_ATTRIBUTES,
+    DOOR_LOCK_CLUSTER_ID,
+    QUEUE_CALL_TIMEOUT,
+    USER_STATUS_AVAILABLE,
+)
+from .rate_limit import ZigbeeRateLimiter
+from .storage import Lock
+
+
+def _coordinator_key(hass: HomeAssistant, device_ieee: str) -> str:
+    """Return a key identifying the Zigbee coordinator that owns a lock.
+
+    Each ZHA config entry drives exactly one coordinator, so the entry id is a
+    good enough key. Unknown devices share a single fallback bucket.
+    """
+    dev_reg = dr.async_get(hass)
+    device = dev_reg.async_get_device(identifiers={(ZHA_DOMAIN, device_ieee)})
+    if device is None:
+        return "unknown"
+    return device.primary_config_entry or next(iter(device.config_entries), "unknown")
+
+
+def _coordinator_semaphore(hass: HomeAssistant, device_ieee: str) -> asyncio.Semaphore:
+    semaphores: dict[str, asyncio.Semaphore] = hass.data.setdefault(DOMAIN, {}).setdefault(
+        "coordinator_semaphores", {}
+    )
+    key = _coordinator_key(hass, device_ieee)
+    if key not in semaphores:
+        semaphores[key] = asyncio.Semaphore(DEFAULT_COORDINATOR_CONCURRENCY)
+    return semaphores[key]
+
+
+def _rate_limiter(hass: HomeAssistant, device_ieee: str) -> ZigbeeRateLimiter:
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    limiters: dict[str, ZigbeeRateLimiter] = domain_data.setdefault("rate_limiters", {})
+    key = _coordinator_key(hass, device_ieee)
+    if key not in limiters:
+        rate, burst = domain_data.get("rate_limit", (DEFAULT_ZIGBEE_RATE, DEFAULT_ZIGBEE_BURST))
+        limiters[key] = ZigbeeRateLimiter(rate, burst)
+    return limiters[key]
+
+
+def configure_rate_limit(hass: HomeAssistant, rate: float, burst: int) -> None:
+    """Set the rate limit from the options. Buckets outlive reloads, only their limits change."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    domain_data["rate_limit"] = (rate, burst)
+    for limiter in domain_data.get("rate_limiters", {}).values():
+        limiter.configure(rate, burst)
+
+
+def rate_limit_stats(hass: HomeAssistant) -> dict[str, Any]:
+    """Token bucket stats per coordinator key."""
+    limiters = hass.data.get(DOMAIN, {}).get("rate_limiters", {})
+    return {key: limiter.stats() for key, limiter in limiters.items()}
+
+
+async def async_call_lock_service(
+    hass: HomeAssistant,
+    lock: Lock,
+    service: str,
+    data: dict[str, Any],
+    interactive: bool = False,
+) -> None:
+    """Call a zha.*_lock_user_code service, rate limited and bounded per coordinator.
+
+    The wait for a rate limit token is not part of the call timeout, so a long
+    background batch does not make queued commands time out.
+    """
+    await _rate_limiter(hass, lock.device_ieee).async_acquire(interactive)
+    async with asyncio.timeout(QUEUE_CALL_TIMEOUT):
+        async with _coordinator_semaphore(hass, lock.device_ieee):
+            await hass.services.async_call(
+                ZHA_DOMAIN,
+                service,
+                data,
+                target={"entity_id": lock.entity_id},
+                blocking=True,
+            )
+
+
+def _door_lock_cluster(hass: HomeAssistant, device_ieee: str) -> Any:
+    """Return the zigpy DoorLock cluster of a ZHA device.
+
+    This reaches into the ZHA gateway because the zha services cannot return data.
+    """
+    from homeassistant.components.zha.helpers import get_zha_gateway
+    from zigpy.types import EUI64
+
+    try:
+        gateway = get_zha_gateway(hass)
+    except ValueError as err:
+        raise HomeAssistantError("ZHA is not loaded") from err
+
+    device = gateway.get_device(EUI64.convert(device_ieee))
+    if device is None:
+        raise HomeAssistantError(f"ZHA device {device_ieee} not found")
+
+    for endpoint_id, endpoint in device.device.endpoints.items():
+        if endpoint_id == 0:  # ZDO
+            continue
+        cluster = endpoint.in_clusters.get(DOOR_LOCK_CLUSTER_ID)
+        if cluster is not None:
+            return cluster
+    raise HomeAssistantError(f"ZHA device {device_ieee} has no DoorLock cluster")
+
+
+async def async_read_user_code(
+    hass: HomeAssistant, device_ieee: str, slot: int
+) -> tuple[int, str | None]:
+    """Read one PIN slot back from the lock.
+
+    `slot` is numbered like the zha services (offset applied, first slot is 1),
+    the DoorLock cluster itself counts users from 0. Returns the user status
+    (see USER_STATUS_*) and the code when the lock reports it.
+    """
+    cluster = _door_lock_cluster(hass, device_ieee)
+    await _rate_limiter(hass, device_ieee).async_acquire()
+    try:
+        async with asyncio.timeout(QUEUE_CALL_TIMEOUT):
+            async with _coordinator_semaphore(hass, device_ieee):
+                rsp = await cluster.get_pin_code(slot - 1)
+    except Exception as err:  # timeouts and zigpy delivery errors
+        raise HomeAssistantError(
+            f"Reading slot {slot} failed: {str(err) or type(err).__name__}"
+        ) from err
+
+    status = int(getattr(rsp, "user_status", USER_STATUS_AVAILABLE))
+    raw = getattr(rsp, "code", None)
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode("ascii", errors="ignore")
+    return status, (str(raw) if raw else None)
+
+
+async def async_read_lock_capacity(hass: HomeAssistant, device_ieee: str) -> dict[str, Optional[int]]:
+    """Read how many PIN users the lock holds and the PIN lengths it accepts.
+
+    Returns the CAPACITY_ATTRIBUTES fields, None for attributes the lock does
+    not support or reports as 0.
+    """
+    cluster = _door_lock_cluster(hass, device_ieee)
+    await _rate_limiter(hass, device_ieee).async_acquire()
+    try:
+        # A sleeping lock must not hold a coordinator slot for long
+        async with asyncio.timeout(QUEUE_CALL_TIMEOUT):
+            async with _coordinator_semaphore(hass, device_ieee):
+                values, _unsupported = await cluster.read_attributes(
+                    list(CAPACITY_ATTRIBUTES.values()), allow_cache=False
+                )
+    except Exception as err:  # timeouts and zigpy delivery errors
+        raise HomeAssistantError(
+            f"Reading capacity failed: {str(err) or type(err).__name__}"
+        ) from err
+
+    capacity: dict[str, Optional[int]] = {}
+    for field, attr_id in CAPACITY_ATTRIBUTES.items():
+        try:
+            value = int(values.get(attr_id) or 0)
+        except (TypeError, ValueError):
+            value = 0
+        capacity[field] = value or None
+    return capacity
@@ -0,0 +1 @@
+"""Tests for the ZHA Lock Manager integration."""
@@ -0,0 +1,44 @@
+"""Collects benchmark results and writes them as one JSON report."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import json
+import platform
+import time
+from typing import Any
+
+import pytest
+
+_RESULTS: list[dict[str, Any]] = []
+
+
+@pytest.fixture
+def bench_record(request: pytest.FixtureRequest) -> Callable[..., None]:
+    """Record one measurement: bench_record("name", params={...}, metric=value, ...)."""
+
+    def _record(name: str, params: dict[str, Any] | None = None, **metrics: Any) -> None:
+        _RESULTS.append(
+            {
+                "benchmark": name,
+                "test": request.node.nodeid,
+                "params": params or {},
+                "metrics": metrics,
+            }
+        )
+
+    return _record
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    if not _RESULTS:
+        return
+    report = {
+        "generated": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": _RESULTS,
+    }
+    with open(session.config.getoption("--bench-report"), "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+        file.write("\n")
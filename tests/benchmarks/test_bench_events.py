@@ -0,0 +1,45 @@
+"""zha_event throughput through the bus filter and the keypad unlock handler."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from custom_components.zha_lock_manager.const import DOMAIN, EVENT_ZHA
+
+from ..common import async_seed_codes, unlock_event
+from ..fake_zha import lock_ieee
+
+pytestmark = pytest.mark.benchmark
+
+EVENTS = 5000
+NOISE_EVERY = 5  # every 5th event comes from a device that is not a managed lock
+
+
+@pytest.mark.parametrize("devices", [1, 10, 50])
+async def test_event_throughput(hass, setup_integration, disarm_calls, bench_record, devices):
+    await setup_integration(count=devices)
+    await async_seed_codes(hass, 10)
+    events = [
+        unlock_event(lock_ieee(1000 + i) if i % NOISE_EVERY == 0 else lock_ieee(i % devices), i % 10 + 1)
+        for i in range(EVENTS)
+    ]
+
+    start = time.perf_counter()
+    for data in events:
+        hass.bus.async_fire(EVENT_ZHA, data)
+    await hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+
+    stats = hass.data[DOMAIN]["events"].stats()
+    assert stats["handled"] == len(disarm_calls)
+    bench_record(
+        "event_throughput",
+        params={"devices": devices, "events": EVENTS},
+        seconds=elapsed,
+        events_per_sec=EVENTS / elapsed,
+        handled=stats["handled"],
+        filtered=stats["filtered"],
+        disarms=len(disarm_calls),
+    )
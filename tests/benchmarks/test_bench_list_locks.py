@@ -0,0 +1,58 @@
+"""zlm/list_locks payload size and latency against the number of slots."""
+
+from __future__ import annotations
+
+import json
+import statistics
+import time
+
+import pytest
+
+from custom_components.zha_lock_manager.const import DOMAIN
+
+from ..common import async_seed_codes
+from ..fake_zha import lock_ieee
+
+pytestmark = pytest.mark.benchmark
+
+LOCKS = 10
+REPEATS = 20
+
+
+async def _timed_call(client, payload: dict) -> tuple[float, dict]:
+    start = time.perf_counter()
+    await client.send_json_auto_id(payload)
+    msg = await client.receive_json()
+    return time.perf_counter() - start, msg
+
+
+@pytest.mark.parametrize("slots", [10, 50, 250])
+async def test_list_locks(hass, hass_ws_client, setup_integration, bench_record, slots):
+    await setup_integration(count=LOCKS, max_slots=slots)
+    await async_seed_codes(hass, slots)
+    client = await hass_ws_client(hass)
+    request = {"type": "zlm/list_locks"}
+
+    # First call serializes every lock, later calls reuse the cached dicts
+    cold, msg = await _timed_call(client, request)
+    warm = [(await _timed_call(client, request))[0] for _ in range(REPEATS)]
+    payload = len(json.dumps(msg["result"]).encode())
+
+    # One changed slot, the reply only carries that lock
+    revision = hass.data[DOMAIN]["store"].revision
+    await client.send_json_auto_id(
+        {"type": "zlm/rename_code", "device_ieee": lock_ieee(0), "slot": 1, "label": "x"}
+    )
+    await client.receive_json()
+    delta_time, delta = await _timed_call(client, {**request, "since_revision": revision})
+
+    bench_record(
+        "list_locks",
+        params={"locks": LOCKS, "slots": slots},
+        payload_bytes=payload,
+        cold_ms=cold * 1000,
+        warm_median_ms=statistics.median(warm) * 1000,
+        warm_max_ms=max(warm) * 1000,
+        delta_ms=delta_time * 1000,
+        delta_payload_bytes=len(json.dumps(delta["result"]).encode()),
+    )
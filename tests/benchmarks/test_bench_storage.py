@@ -0,0 +1,120 @@
+"""How often the store hits disk and how many bytes each mutation costs."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.helpers.json import json_bytes
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.zha_lock_manager.const import (
+    DOMAIN,
+    STORAGE_KEY,
+    LOCK_STORAGE_PREFIX,
+    DEFAULT_SAVE_DELAY,
+)
+
+from ..common import async_seed_codes
+from ..fake_zha import lock_ieee
+
+pytestmark = pytest.mark.benchmark
+
+LOCKS = 10
+SEEDED_SLOTS = 30
+MUTATIONS = 50
+
+
+class WriteCounter:
+    """Counts writes of the index and lock files and the bytes they would put on disk."""
+
+    def __init__(self) -> None:
+        self.writes = 0
+        self.bytes = 0
+
+    def reset(self) -> None:
+        self.writes = self.bytes = 0
+
+
+@pytest.fixture
+def write_counter():
+    counter = WriteCounter()
+    original = Store._async_write_data
+
+    async def _counting(store: Store, path: str, data: dict) -> None:
+        if store.key == STORAGE_KEY or store.key.startswith(LOCK_STORAGE_PREFIX):
+            counter.writes += 1
+            counter.bytes += len(json_bytes(data))
+        await original(store, path, data)
+
+    with patch.object(Store, "_async_write_data", _counting):
+        yield counter
+
+
+async def _settle(hass) -> None:
+    """Let the delayed save fire."""
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=DEFAULT_SAVE_DELAY + 1))
+    await hass.async_block_till_done()
+
+
+def _record(bench_record, name: str, counter: WriteCounter) -> None:
+    bench_record(
+        "store_writes",
+        params={"mutation": name, "mutations": MUTATIONS, "locks": LOCKS, "slots": SEEDED_SLOTS},
+        writes=counter.writes,
+        bytes_written=counter.bytes,
+        writes_per_mutation=counter.writes / MUTATIONS,
+        bytes_per_mutation=counter.bytes / MUTATIONS,
+    )
+
+
+async def test_store_writes(hass, hass_ws_client, setup_integration, bench_record, write_counter):
+    await setup_integration(count=LOCKS)
+    await async_seed_codes(hass, SEEDED_SLOTS)
+    await _settle(hass)
+    client = await hass_ws_client(hass)
+
+    # Label changes are coalesced by the delayed save
+    write_counter.reset()
+    for i in range(MUTATIONS):
+        await client.send_json_auto_id(
+            {"type": "zlm/rename_code", "device_ieee": lock_ieee(i % LOCKS), "slot": 1, "label": f"L{i}"}
+        )
+        await client.receive_json()
+    await _settle(hass)
+    _record(bench_record, "rename_code", write_counter)
+
+    # Each code change is flushed before the reply
+    write_counter.reset()
+    for i in range(MUTATIONS):
+        await client.send_json_auto_id(
+            {
+                "type": "zlm/set_code",
+                "device_ieee": lock_ieee(i % LOCKS),
+                "slot": i // LOCKS + 1,
+                "code": f"{i:06d}",
+                "wait": True,
+            }
+        )
+        await client.receive_json()
+    await _settle(hass)
+    _record(bench_record, "set_code", write_counter)
+
+    # A bulk apply flushes once at the end
+    write_counter.reset()
+    operations = [
+        {"device_ieee": lock_ieee(i % LOCKS), "slot": i // LOCKS + 1, "action": "set", "code": f"9{i:05d}"}
+        for i in range(MUTATIONS)
+    ]
+    await client.send_json_auto_id({"type": "zlm/bulk_apply", "operations": operations})
+    for _ in range(MUTATIONS + 2):
+        await client.receive_json()
+    await _settle(hass)
+    _record(bench_record, "bulk_apply", write_counter)
+
+    store = hass.data[DOMAIN]["store"]
+    assert store.get_plain_code(store.get_lock(lock_ieee(0)), 1) == "900000"
@@ -0,0 +1,29 @@
+"""Helpers for tests and benchmarks."""
+
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.zha_lock_manager.const import DOMAIN, ZHA_COMMAND_OPERATION_EVENT
+
+ALARMO_ENTITY = "alarm_control_panel.alarmo"
+
+
+async def async_seed_codes(hass: HomeAssistant, slots_per_lock: int) -> None:
+    """Fill slots 1..slots_per_lock of every lock straight into the store."""
+    store = hass.data[DOMAIN]["store"]
+    await store.async_load_locks()
+    for lock in store.locks.values():
+        codes = [f"{slot:06d}" for slot in range(1, slots_per_lock + 1)]
+        tokens = await store.async_encrypt_many(codes)
+        for slot, (code, token) in enumerate(zip(codes, tokens), start=1):
+            store.set_code(lock, slot, code, label=f"User {slot}", enabled=True, token=token)
+    await store.async_flush()
+
+
+def unlock_event(ieee: str, code_slot: int, source: str = "Keypad") -> dict:
+    return {
+        "device_ieee": ieee,
+        "command": ZHA_COMMAND_OPERATION_EVENT,
+        "args": {"operation": "Unlock", "source": source, "code_slot": code_slot},
+    }
@@ -0,0 +1,113 @@
+"""Fixtures shared by the tests and benchmarks."""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.zha_lock_manager.const import (
+    DOMAIN,
+    CONF_LOCKS,
+    CONF_ALARMO_ENABLED,
+    CONF_ALARMO_ENTITY_ID,
+    CONF_ZIGBEE_RATE,
+)
+
+from .common import ALARMO_ENTITY
+from .fake_zha import FakeZha, lock_configs
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption("--bench", action="store_true", help="run the benchmarks")
+    parser.addoption(
+        "--bench-report",
+        default="bench_output.txt",
+        help="where the benchmarks write their JSON report",
+    )
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    if config.getoption("--bench"):
+        return
+    skip = pytest.mark.skip(reason="benchmark, pass --bench to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    yield
+
+
+@pytest.fixture
+def fake_zha(hass: HomeAssistant):
+    """Fake zha services plus DoorLock read-back, with fast retries."""
+    zha = FakeZha(hass)
+    zha.async_register()
+    hass.config.components.add("zha")
+    with (
+        patch(
+            "custom_components.zha_lock_manager.zigbee._door_lock_cluster",
+            side_effect=lambda hass, ieee: zha.cluster(ieee),
+        ),
+        patch("custom_components.zha_lock_manager.command_queue.QUEUE_BACKOFF_BASE", 0.01),
+        patch("custom_components.zha_lock_manager.command_queue.QUEUE_BACKOFF_MAX", 0.05),
+        patch("custom_components.zha_lock_manager.reconcile.RECONCILE_BATCH_DELAY", 0),
+    ):
+        yield zha
+
+
+@pytest.fixture
+def disarm_calls(hass: HomeAssistant) -> list[ServiceCall]:
+    """Record alarm_disarm calls instead of needing Alarmo."""
+    calls: list[ServiceCall] = []
+
+    async def _disarm(call: ServiceCall) -> None:
+        calls.append(call)
+
+    hass.services.async_register("alarm_control_panel", "alarm_disarm", _disarm)
+    return calls
+
+
+@pytest.fixture
+def setup_integration(
+    hass: HomeAssistant, fake_zha: FakeZha
+) -> Callable[..., Awaitable[MockConfigEntry]]:
+    """Return a coroutine that sets the integration up with `count` fake locks."""
+
+    async def _setup(
+        count: int = 3, max_slots: int = 30, alarmo: bool = True, **options: Any
+    ) -> MockConfigEntry:
+        configs = lock_configs(count, max_slots)
+        fake_zha.add_locks(configs)
+        assert await async_setup_component(hass, "websocket_api", {})
+        hass.config.components.add("frontend")
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={CONF_LOCKS: configs},
+            options={
+                CONF_ALARMO_ENABLED: alarmo,
+                CONF_ALARMO_ENTITY_ID: ALARMO_ENTITY if alarmo else "",
+                # Unthrottled unless a test is about the rate limit
+                CONF_ZIGBEE_RATE: 0,
+                **options,
+            },
+        )
+        entry.add_to_hass(hass)
+        # The panel needs the real frontend, which the tests do not load
+        with patch("custom_components.zha_lock_manager.async_register_panel"):
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            # The store loads in a background task
+            await hass.async_block_till_done(wait_background_tasks=True)
+        return entry
+
+    return _setup
+
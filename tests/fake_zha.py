@@ -0,0 +1,190 @@
+"""Stand-in for the parts of ZHA the integration talks to.
+
+Registers the zha.*_lock_user_code services and hands out DoorLock cluster
+objects for read-back. Every call can be delayed, time out or fail, driven by a
+seeded random generator so runs are repeatable.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import random
+from types import SimpleNamespace
+from typing import Any
+
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.zha_lock_manager.const import (
+    ACTION_SERVICES,
+    ACTION_SET,
+    ACTION_ENABLE,
+    ACTION_DISABLE,
+    ZHA_DOMAIN,
+    USER_STATUS_AVAILABLE,
+    USER_STATUS_ENABLED,
+    USER_STATUS_DISABLED,
+)
+
+_SERVICE_ACTIONS = {service: action for action, service in ACTION_SERVICES.items()}
+
+
+def lock_ieee(index: int) -> str:
+    return ":".join(f"{b:02x}" for b in (0x00, 0x0D, 0x6F, 0xFF, 0xFE, 0x00, index >> 8, index & 0xFF))
+
+
+def lock_configs(count: int, max_slots: int = 30) -> list[dict[str, Any]]:
+    """Lock descriptors as the config flow stores them in entry.data."""
+    return [
+        {
+            "name": f"Lock {index}",
+            "entity_id": f"lock.fake_{index}",
+            "device_ieee": lock_ieee(index),
+            "max_slots": max_slots,
+            "slot_offset": 0,
+        }
+        for index in range(count)
+    ]
+
+
+@dataclass
+class FakeZhaCall:
+    service: str
+    entity_id: str
+    data: dict[str, Any]
+    outcome: str  # "ok", "timeout" or "failure"
+
+
+class FakeDoorLockCluster:
+    """Answers get_pin_code from the codes the fake services wrote, and attribute reads."""
+
+    def __init__(self, zha: FakeZha, entity_id: str) -> None:
+        self._zha = zha
+        self._entity_id = entity_id
+
+    async def get_pin_code(self, user_id: int) -> SimpleNamespace:
+        await self._zha.async_simulate_call()
+        status, code = self._zha.pins.get(self._entity_id, {}).get(
+            user_id + 1, (USER_STATUS_AVAILABLE, None)
+        )
+        return SimpleNamespace(user_status=status, code=code)
+
+    async def read_attributes(
+        self, attributes: list[int], allow_cache: bool = True
+    ) -> tuple[dict[int, Any], dict[int, int]]:
+        await self._zha.async_simulate_call()
+        values = self._zha.attributes
+        found = {attr: values[attr] for attr in attributes if attr in values}
+        unsupported = {attr: 0x86 for attr in attributes if attr not in values}
+        return found, unsupported
+
+
+class FakeZha:
+    """Fake zha lock services with configurable latency, timeouts and failures."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout_after: float = 0.01,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.hass = hass
+        self.latency = latency
+        self.jitter = jitter
+        self.timeout_rate = timeout_rate
+        self.timeout_after = timeout_after
+        self.failure_rate = failure_rate
+        # DoorLock attribute id -> value every lock reports, the rest are unsupported
+        self.attributes: dict[int, Any] = {}
+        self.calls: list[FakeZhaCall] = []
+        # entity_id -> {code_slot: (user status, code)}, what the locks hold
+        self.pins: dict[str, dict[int, tuple[int, str | None]]] = {}
+        self._entities_by_ieee: dict[str, str] = {}
+        self._scripted: deque[str] = deque()
+        self._random = random.Random(seed)
+
+    def configure(self, **options: Any) -> None:
+        """Change latency, jitter, timeout_rate, timeout_after, failure_rate or attributes."""
+        for name, value in options.items():
+            if not hasattr(self, name):
+                raise AttributeError(name)
+            setattr(self, name, value)
+
+    def script(self, *outcomes: str) -> None:
+        """Force the outcome ("ok", "timeout", "failure") of the next calls."""
+        self._scripted.extend(outcomes)
+
+    def add_locks(self, configs: list[dict[str, Any]]) -> None:
+        for config in configs:
+            self._entities_by_ieee[config["device_ieee"]] = config["entity_id"]
+            self.pins.setdefault(config["entity_id"], {})
+
+    @callback
+    def async_register(self) -> None:
+        for service in ACTION_SERVICES.values():
+            self.hass.services.async_register(ZHA_DOMAIN, service, self._async_handle)
+
+    def cluster(self, device_ieee: str) -> FakeDoorLockCluster:
+        entity_id = self._entities_by_ieee.get(device_ieee)
+        if entity_id is None:
+            raise HomeAssistantError(f"ZHA device {device_ieee} not found")
+        return FakeDoorLockCluster(self, entity_id)
+
+    def _roll(self) -> str:
+        roll = self._random.random()
+        if roll < self.timeout_rate:
+            return "timeout"
+        if roll < self.timeout_rate + self.failure_rate:
+            return "failure"
+        return "ok"
+
+    async def async_simulate_call(self) -> str:
+        """Wait the configured latency, then time out or fail at the configured rates."""
+        outcome = self._scripted.popleft() if self._scripted else self._roll()
+        if outcome == "timeout":
+            await asyncio.sleep(self.timeout_after)
+            raise asyncio.TimeoutError
+        if outcome == "failure":
+            raise HomeAssistantError("Fake ZHA delivery failure")
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        return "ok"
+
+    async def _async_handle(self, call: ServiceCall) -> None:
+        entity_ids = call.data["entity_id"]
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+        data = {k: v for k, v in call.data.items() if k != "entity_id"}
+        for entity_id in entity_ids:
+            record = FakeZhaCall(call.service, entity_id, data, "ok")
+            self.calls.append(record)
+            try:
+                await self.async_simulate_call()
+            except asyncio.TimeoutError:
+                record.outcome = "timeout"
+                raise
+            except HomeAssistantError:
+                record.outcome = "failure"
+                raise
+            self._apply(entity_id, _SERVICE_ACTIONS[call.service], data)
+
+    def _apply(self, entity_id: str, action: str, data: dict[str, Any]) -> None:
+        pins = self.pins.setdefault(entity_id, {})
+        slot = int(data["code_slot"])
+        status, code = pins.get(slot, (USER_STATUS_AVAILABLE, None))
+        if action == ACTION_SET:
+            pins[slot] = (USER_STATUS_ENABLED, str(data["user_code"]))
+        elif action == ACTION_ENABLE and code:
+            pins[slot] = (USER_STATUS_ENABLED, code)
+        elif action == ACTION_DISABLE and code:
+            pins[slot] = (USER_STATUS_DISABLED, code)
+        else:
+            pins.pop(slot, None)
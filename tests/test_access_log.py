@@ -0,0 +1,78 @@
+"""Access log ring buffer, file flushes and zlm/query_log."""
+
+from __future__ import annotations
+
+import os
+from unittest.mock import patch
+
+from custom_components.zha_lock_manager.access_log import ZLMAccessLog, _read_tail
+from custom_components.zha_lock_manager.const import DOMAIN, EVENT_ZHA
+
+from .common import unlock_event
+from .fake_zha import lock_ieee
+
+
+async def test_ring_stays_bounded(hass):
+    with patch("custom_components.zha_lock_manager.access_log.ACCESS_LOG_SIZE", 10):
+        log = ZLMAccessLog(hass)
+    for i in range(25):
+        log.async_record(1000.0 + i, lock_ieee(i % 2), i, "unlock", "keypad")
+
+    assert log.stats()["entries"] == 10
+    assert sum(len(entries) for entries in log._by_lock.values()) == 10
+    # Newest first, per lock, within [start, end)
+    assert [e.slot for e in log.query(lock_ieee(1), limit=3)] == [23, 21, 19]
+    assert [e.slot for e in log.query(start=1020.0, end=1022.0)] == [21, 20]
+    assert [e.slot for e in log.query(lock_ieee(0), slot=18)] == [18]
+    assert log.query(lock_ieee(0), slot=2) == []
+
+
+async def test_late_entries_keep_time_order(hass):
+    log = ZLMAccessLog(hass)
+    for i in (0, 1, 3, 4):
+        log.async_record(1000.0 + i, lock_ieee(0), i, "unlock", "keypad")
+    # Deferred while the store loaded, recorded after newer events
+    log.async_record(1002.0, lock_ieee(0), 2, "unlock", "keypad")
+
+    assert [e.slot for e in log.query(start=1002.0, end=1003.0)] == [2]
+    assert [e.slot for e in log.query(lock_ieee(0), start=1001.5)] == [4, 3, 2]
+    assert [e.slot for e in log.query()] == [4, 3, 2, 1, 0]
+
+
+async def test_events_are_logged_and_flushed(hass, hass_ws_client, setup_integration):
+    await setup_integration(count=2)
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(0), 4))
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(0), 5, source="RF"))
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(1), 4))
+    await hass.async_block_till_done()
+
+    client = await hass_ws_client(hass)
+    await client.send_json_auto_id(
+        {"type": "zlm/query_log", "device_ieee": lock_ieee(0), "limit": 10}
+    )
+    entries = (await client.receive_json())["result"]["entries"]
+    assert [(e["slot"], e["source"]) for e in entries] == [(5, "rf"), (4, "keypad")]
+
+    access_log = hass.data[DOMAIN]["access_log"]
+    await access_log.async_flush()
+    tail = await hass.async_add_executor_job(_read_tail, access_log.path)
+    assert [(e.device_ieee, e.slot) for e in tail] == [
+        (lock_ieee(0), 4),
+        (lock_ieee(0), 5),
+        (lock_ieee(1), 4),
+    ]
+    assert access_log.stats()["pending"] == 0
+
+
+async def test_removing_the_entry_deletes_the_log(hass, setup_integration):
+    entry = await setup_integration(count=1)
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(0), 4))
+    await hass.async_block_till_done()
+    access_log = hass.data[DOMAIN]["access_log"]
+    await access_log.async_flush()
+    path = access_log.path
+    assert await hass.async_add_executor_job(os.path.exists, path)
+
+    assert await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+    assert not await hass.async_add_executor_job(os.path.exists, path)
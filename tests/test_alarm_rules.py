@@ -0,0 +1,70 @@
+"""Per-lock and per-slot alarm routing rules."""
+
+from __future__ import annotations
+
+from custom_components.zha_lock_manager.const import DOMAIN, EVENT_ZHA
+
+from .common import ALARMO_ENTITY, async_seed_codes, unlock_event
+from .fake_zha import lock_ieee
+
+OTHER_PANEL = "alarm_control_panel.garage"
+
+
+async def _save_rule(client, ieee: str, rule: dict | None) -> dict:
+    await client.send_json_auto_id(
+        {"type": "zlm/save_alarm_rule", "device_ieee": ieee, "rule": rule}
+    )
+    msg = await client.receive_json()
+    assert msg["success"], msg
+    return msg["result"]
+
+
+async def test_rules_route_and_exclude(hass, hass_ws_client, setup_integration, disarm_calls):
+    await setup_integration(count=2)
+    await async_seed_codes(hass, 3)
+    client = await hass_ws_client(hass)
+
+    await _save_rule(client, lock_ieee(0), {"entity_id": OTHER_PANEL, "never_disarm": [2]})
+    await _save_rule(client, lock_ieee(1), {"disarm": False})
+
+    for ieee, slot in ((lock_ieee(0), 1), (lock_ieee(0), 2), (lock_ieee(1), 1)):
+        hass.bus.async_fire(EVENT_ZHA, unlock_event(ieee, slot))
+    await hass.async_block_till_done()
+
+    assert [call.data for call in disarm_calls] == [{"entity_id": OTHER_PANEL, "code": "000001"}]
+    assert hass.data[DOMAIN]["events"].stats()["not_routed"] == 2
+
+    # Back to the defaults
+    await _save_rule(client, lock_ieee(1), None)
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(1), 3))
+    await hass.async_block_till_done()
+    assert disarm_calls[-1].data == {"entity_id": ALARMO_ENTITY, "code": "000003"}
+
+
+async def test_arm_state_condition(hass, hass_ws_client, setup_integration, disarm_calls):
+    await setup_integration(count=1)
+    await async_seed_codes(hass, 2)
+    client = await hass_ws_client(hass)
+    await _save_rule(client, lock_ieee(0), {"arm_states": ["armed_away"]})
+
+    hass.states.async_set(ALARMO_ENTITY, "armed_home")
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(0), 1))
+    await hass.async_block_till_done()
+    assert disarm_calls == []
+
+    hass.states.async_set(ALARMO_ENTITY, "armed_away")
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(0), 2))
+    await hass.async_block_till_done()
+    assert len(disarm_calls) == 1
+
+
+async def test_get_rules(hass, hass_ws_client, setup_integration):
+    await setup_integration(count=1)
+    client = await hass_ws_client(hass)
+    await _save_rule(client, lock_ieee(0), {"never_disarm": [4, 4, 1]})
+
+    await client.send_json_auto_id({"type": "zlm/get_alarm_rules"})
+    result = (await client.receive_json())["result"]
+    assert result["enabled"]
+    assert result["default_entity_id"] == ALARMO_ENTITY
+    assert result["locks"][lock_ieee(0)]["never_disarm"] == [1, 4]
@@ -0,0 +1,74 @@
+"""Encrypted export and import over the WebSocket API."""
+
+from __future__ import annotations
+
+import json
+
+from custom_components.zha_lock_manager.const import DOMAIN
+
+from .common import async_seed_codes
+from .fake_zha import lock_ieee
+
+PASSPHRASE = "correct horse battery"
+
+
+async def _async_export(client) -> list[str]:
+    await client.send_json_auto_id({"type": "zlm/export", "passphrase": PASSPHRASE})
+    assert (await client.receive_json())["success"]
+    lines = []
+    while "line" in (event := (await client.receive_json())["event"]):
+        lines.append(event["line"])
+    assert event == {"done": True, "lines": len(lines)}
+    return lines
+
+
+async def _async_import(client, lines: list[str], passphrase: str = PASSPHRASE) -> dict:
+    await client.send_json_auto_id(
+        {"type": "zlm/import", "passphrase": passphrase, "lines": lines, "final": True}
+    )
+    return await client.receive_json()
+
+
+async def test_export_import_roundtrip(hass, hass_ws_client, setup_integration):
+    await setup_integration(count=2)
+    await async_seed_codes(hass, 3)
+    client = await hass_ws_client(hass)
+    lines = await _async_export(client)
+
+    store = hass.data[DOMAIN]["store"]
+    lock = store.get_lock(lock_ieee(0))
+    store.clear_code(lock, 2)
+    store.set_label(lock, 1, "Renamed")
+
+    result = (await _async_import(client, lines))["result"]
+    assert result["finished"]
+    assert result["changed"] == 2
+    assert store.get_plain_code(lock, 2) == "000002"
+    assert lock.slots[1].label == "User 1"
+
+    # Importing the same archive again changes nothing
+    result = (await _async_import(client, lines))["result"]
+    assert result["changed"] == 0
+    assert hass.data[DOMAIN]["imports"] == {}
+
+
+async def test_wrong_passphrase_and_bad_header(hass, hass_ws_client, setup_integration):
+    await setup_integration(count=1)
+    await async_seed_codes(hass, 1)
+    client = await hass_ws_client(hass)
+    lines = await _async_export(client)
+
+    msg = await _async_import(client, lines, "not the passphrase")
+    assert msg["error"]["code"] == "invalid_format"
+
+    header = json.loads(lines[0])
+    for broken in (
+        {k: v for k, v in header.items() if k != "salt"},
+        {**header, "salt": "not base64!"},
+        {**header, "n": "many"},
+        # Far more memory than our own settings, refused before deriving the key
+        {**header, "n": 2**24},
+    ):
+        msg = await _async_import(client, [json.dumps(broken), *lines[1:]])
+        assert msg["error"]["code"] == "invalid_format"
+    assert hass.data[DOMAIN]["imports"] == {}
@@ -0,0 +1,33 @@
+"""Diagnostics dump and hot path metrics."""
+
+from __future__ import annotations
+
+from custom_components.zha_lock_manager.const import EVENT_ZHA
+from custom_components.zha_lock_manager.diagnostics import async_get_config_entry_diagnostics
+
+from .common import async_seed_codes, unlock_event
+from .fake_zha import lock_ieee
+
+
+async def test_diagnostics_report_metrics_without_codes(
+    hass, hass_ws_client, setup_integration, disarm_calls
+):
+    entry = await setup_integration(count=1)
+    await async_seed_codes(hass, 2)
+    client = await hass_ws_client(hass)
+    ieee = lock_ieee(0)
+    await client.send_json_auto_id(
+        {"type": "zlm/set_code", "device_ieee": ieee, "slot": 5, "code": "55555", "wait": True}
+    )
+    await client.receive_json()
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(ieee, 1))
+    await hass.async_block_till_done()
+
+    diag = await async_get_config_entry_diagnostics(hass, entry)
+
+    assert diag["locks"][ieee]["codes"] == 3
+    metrics = diag["metrics"]
+    assert metrics["writes"][ieee]["ok"] == 1
+    assert metrics["disarms"][ieee]["ok"] == 1
+    assert metrics["ws"]["zlm/set_code"]["ok"] == 1
+    assert "55555" not in str(diag) and "000001" not in str(diag)
@@ -0,0 +1,71 @@
+"""Slot capacity read from the DoorLock cluster and the checks built on it."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.zha_lock_manager.const import (
+    CAPACITY_ATTRIBUTES,
+    CAPACITY_CHECK_INTERVAL,
+    DOMAIN,
+)
+
+from .fake_zha import lock_ieee
+
+
+def _attributes(pin_users: int, min_length: int | None = None, max_length: int | None = None) -> dict:
+    values = {CAPACITY_ATTRIBUTES["pin_users"]: pin_users}
+    if min_length:
+        values[CAPACITY_ATTRIBUTES["min_pin_length"]] = min_length
+    if max_length:
+        values[CAPACITY_ATTRIBUTES["max_pin_length"]] = max_length
+    return values
+
+
+async def test_capacity_limits_slots_and_codes(hass, hass_ws_client, setup_integration, fake_zha):
+    fake_zha.configure(attributes=_attributes(20, 4, 6))
+    await setup_integration(count=1)
+    ieee = lock_ieee(0)
+    client = await hass_ws_client(hass)
+
+    await client.send_json_auto_id({"type": "zlm/get_lock", "device_ieee": ieee})
+    result = (await client.receive_json())["result"]
+    assert result["capacity"] == {"pin_users": 20, "max_pin_length": 6, "min_pin_length": 4}
+    # Still the default, so it follows the lock
+    assert result["max_slots"] == 20
+
+    for slot, code in ((21, "1234"), (3, "123"), (3, "1234567")):
+        await client.send_json_auto_id(
+            {"type": "zlm/set_code", "device_ieee": ieee, "slot": slot, "code": code}
+        )
+        assert (await client.receive_json())["error"]["code"] == "invalid_format"
+
+    await client.send_json_auto_id(
+        {"type": "zlm/save_lock_meta", "device_ieee": ieee, "max_slots": 25}
+    )
+    assert (await client.receive_json())["error"]["code"] == "invalid_format"
+
+    await client.send_json_auto_id(
+        {"type": "zlm/set_code", "device_ieee": ieee, "slot": 20, "code": "123456", "wait": True}
+    )
+    assert (await client.receive_json())["success"]
+
+
+async def test_failed_read_is_retried(hass, setup_integration, fake_zha):
+    fake_zha.script("failure")
+    await setup_integration(count=1)
+    discovery = hass.data[DOMAIN]["discovery"]
+    lock = hass.data[DOMAIN]["store"].get_lock(lock_ieee(0))
+    assert lock.capacity is None
+    assert discovery.stats()["failures"] == 1
+
+    fake_zha.configure(attributes=_attributes(10))
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=CAPACITY_CHECK_INTERVAL + 1))
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert lock.capacity["pin_users"] == 10
+    assert lock.max_slots == 10
+    assert discovery.stats()["unknown"] == 0
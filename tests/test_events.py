@@ -0,0 +1,62 @@
+"""Keypad unlock events and the Alarmo disarm path."""
+
+from __future__ import annotations
+
+from custom_components.zha_lock_manager.const import DOMAIN, EVENT_ZHA
+
+from .common import ALARMO_ENTITY, async_seed_codes, unlock_event
+from .fake_zha import lock_ieee
+
+
+async def test_keypad_unlock_disarms(hass, setup_integration, disarm_calls):
+    await setup_integration(count=2)
+    await async_seed_codes(hass, 3)
+
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(1), 2))
+    await hass.async_block_till_done()
+
+    assert len(disarm_calls) == 1
+    assert disarm_calls[0].data == {"entity_id": ALARMO_ENTITY, "code": "000002"}
+
+
+async def test_other_events_are_filtered(hass, setup_integration, disarm_calls):
+    await setup_integration(count=1)
+    await async_seed_codes(hass, 1)
+
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(9), 1))  # not managed
+    hass.bus.async_fire(EVENT_ZHA, {"device_ieee": lock_ieee(0), "command": "on"})
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(0), 1, source="RF"))
+    await hass.async_block_till_done()
+
+    assert disarm_calls == []
+    assert hass.data[DOMAIN]["events"].stats() == {
+        "filtered": 2,
+        "handled": 1,
+        "deferred": 0,
+        "duplicates": 0,
+        "not_routed": 0,
+    }
+
+
+async def test_repeated_unlock_is_collapsed(hass, setup_integration, disarm_calls):
+    await setup_integration(count=1)
+    await async_seed_codes(hass, 2)
+
+    for _ in range(3):
+        hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(0), 1))
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(0), 2))  # other slot
+    await hass.async_block_till_done()
+
+    assert [call.data["code"] for call in disarm_calls] == ["000001", "000002"]
+    assert hass.data[DOMAIN]["events"].stats()["duplicates"] == 2
+
+
+async def test_dedup_window_can_be_turned_off(hass, setup_integration, disarm_calls):
+    await setup_integration(count=1, event_dedup_window=0)
+    await async_seed_codes(hass, 1)
+
+    for _ in range(2):
+        hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(0), 1))
+    await hass.async_block_till_done()
+
+    assert len(disarm_calls) == 2
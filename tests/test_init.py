@@ -0,0 +1,77 @@
+"""Entry setup: background store load and the keypad hook that comes up first."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+from custom_components.zha_lock_manager.const import DOMAIN, EVENT_ZHA
+from custom_components.zha_lock_manager.storage import ZLMLocalStore
+
+from .common import async_seed_codes, unlock_event
+from .fake_zha import lock_ieee
+
+
+async def _async_reload(hass, entry) -> None:
+    with patch("custom_components.zha_lock_manager.async_register_panel"):
+        assert await hass.config_entries.async_reload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+async def test_unchanged_store_is_not_saved(hass, setup_integration):
+    entry = await setup_integration(count=2)
+    # Unloading flushes the store, only the load that follows must not save
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    with (
+        patch.object(ZLMLocalStore, "async_save") as save,
+        patch("custom_components.zha_lock_manager.async_register_panel"),
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done(wait_background_tasks=True)
+    save.assert_not_called()
+    assert len(hass.data[DOMAIN]["store"].locks) == 2
+
+
+async def test_unlock_while_loading_waits_for_store(hass, setup_integration, disarm_calls):
+    entry = await setup_integration(count=1)
+    await async_seed_codes(hass, 2)
+
+    gate = asyncio.Event()
+    original_load = ZLMLocalStore.async_load
+
+    async def _slow_load(self):
+        await gate.wait()
+        await original_load(self)
+
+    with patch.object(ZLMLocalStore, "async_load", _slow_load):
+        await _async_reload(hass, entry)
+        assert "store" not in hass.data[DOMAIN]
+
+        hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(0), 2))
+        await hass.async_block_till_done()
+        assert disarm_calls == []
+        assert hass.data[DOMAIN]["events"].stats()["deferred"] == 1
+
+        gate.set()
+        await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert len(disarm_calls) == 1
+    assert disarm_calls[0].data["code"] == "000002"
+
+
+async def test_failed_load_releases_deferred_events(hass, setup_integration, disarm_calls):
+    entry = await setup_integration(count=1)
+
+    with patch.object(ZLMLocalStore, "async_load", side_effect=OSError("corrupt")):
+        await _async_reload(hass, entry)
+        await hass.async_block_till_done(wait_background_tasks=True)
+    assert "store" not in hass.data[DOMAIN]
+
+    hass.bus.async_fire(EVENT_ZHA, unlock_event(lock_ieee(0), 2))
+    await hass.async_block_till_done(wait_background_tasks=True)
+
+    assert disarm_calls == []
+    stats = hass.data[DOMAIN]["events"].stats()
+    assert stats["deferred"] == 1
+    assert stats["dropped"] == 1
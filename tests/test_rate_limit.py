@@ -0,0 +1,68 @@
+"""Token bucket in front of the Zigbee commands."""
+
+from __future__ import annotations
+
+import asyncio
+
+from custom_components.zha_lock_manager.rate_limit import ZigbeeRateLimiter
+
+from .fake_zha import lock_ieee
+
+
+async def test_interactive_goes_first(hass):
+    limiter = ZigbeeRateLimiter(rate=20, burst=2)
+    assert await limiter.async_acquire() == 0
+    assert await limiter.async_acquire(interactive=True) == 0
+
+    order: list[str] = []
+
+    async def _acquire(name: str, interactive: bool) -> None:
+        await limiter.async_acquire(interactive)
+        order.append(name)
+
+    tasks = [
+        asyncio.create_task(_acquire("background 1", False)),
+        asyncio.create_task(_acquire("background 2", False)),
+    ]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(_acquire("panel", True)))
+    await asyncio.gather(*tasks)
+
+    assert order == ["panel", "background 1", "background 2"]
+    stats = limiter.stats()
+    assert stats["granted_interactive"] == 2
+    assert stats["granted_background"] == 3
+    assert stats["delayed"] == 3
+    assert stats["waiting_background"] == 0
+
+
+async def test_cancelled_waiter_leaves_queue(hass):
+    limiter = ZigbeeRateLimiter(rate=1, burst=1)
+    await limiter.async_acquire()
+    task = asyncio.create_task(limiter.async_acquire())
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert limiter.stats()["waiting_background"] == 0
+
+    # Rate 0 turns limiting off
+    limiter.configure(0, 1)
+    assert await limiter.async_acquire() == 0
+
+
+async def test_panel_writes_are_interactive(hass, hass_ws_client, setup_integration):
+    await setup_integration(count=1, zigbee_rate=10, zigbee_burst=4)
+    client = await hass_ws_client(hass)
+    await client.send_json_auto_id(
+        {"type": "zlm/set_code", "device_ieee": lock_ieee(0), "slot": 1, "code": "1234", "wait": True}
+    )
+    assert (await client.receive_json())["success"]
+
+    await client.send_json_auto_id({"type": "zlm/get_stats"})
+    buckets = (await client.receive_json())["result"]["rate_limit"]
+    (bucket,) = buckets.values()
+    assert bucket["rate"] == 10
+    assert bucket["burst"] == 4
+    assert bucket["granted_interactive"] == 1
+    # The capacity read at setup
+    assert bucket["granted_background"] == 1
@@ -0,0 +1,81 @@
+"""Slot schedules and the single timer scheduler."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.zha_lock_manager.const import DOMAIN
+from custom_components.zha_lock_manager.schedule import (
+    desired_action,
+    is_active,
+    next_transition,
+)
+
+from .fake_zha import lock_ieee
+
+
+def _utc(*args: int) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+async def test_weekly_window_past_midnight(hass):
+    await hass.config.async_set_time_zone("UTC")
+    schedule = {"weekly": [{"days": ["fri"], "start": "22:00", "end": "02:00"}], "on_end": "disable"}
+
+    # 2024-03-01 is a Friday
+    assert not is_active(schedule, _utc(2024, 3, 1, 21, 59))
+    assert is_active(schedule, _utc(2024, 3, 1, 23, 0))
+    assert is_active(schedule, _utc(2024, 3, 2, 1, 59))
+    assert not is_active(schedule, _utc(2024, 3, 2, 2, 0))
+    assert next_transition(schedule, _utc(2024, 3, 2, 1, 0)) == _utc(2024, 3, 2, 2, 0)
+    assert next_transition(schedule, _utc(2024, 3, 2, 3, 0)) == _utc(2024, 3, 8, 22, 0)
+
+
+async def test_end_clears_or_disables(hass):
+    schedule = {"end": "2024-03-01T12:00:00+00:00", "on_end": "clear"}
+    assert desired_action(schedule, _utc(2024, 3, 1, 11)) == "enable"
+    assert desired_action(schedule, _utc(2024, 3, 1, 12)) == "clear"
+    assert desired_action({**schedule, "on_end": "disable"}, _utc(2024, 3, 1, 12)) == "disable"
+    assert next_transition(schedule, _utc(2024, 3, 1, 12)) is None
+
+
+async def test_scheduler_applies_transitions(hass, hass_ws_client, setup_integration, fake_zha):
+    await setup_integration(count=1)
+    client = await hass_ws_client(hass)
+    ieee = lock_ieee(0)
+    await client.send_json_auto_id(
+        {"type": "zlm/set_code", "device_ieee": ieee, "slot": 4, "code": "4444", "wait": True}
+    )
+    await client.receive_json()
+
+    now = dt_util.utcnow()
+    start, end = now + timedelta(hours=1), now + timedelta(hours=2)
+    await client.send_json_auto_id(
+        {
+            "type": "zlm/set_schedule",
+            "device_ieee": ieee,
+            "slot": 4,
+            "schedule": {"start": start.isoformat(), "end": end.isoformat(), "on_end": "clear"},
+        }
+    )
+    assert (await client.receive_json())["success"]
+    await hass.async_block_till_done()
+
+    # Not yet valid, disabled on the lock right away
+    assert fake_zha.pins["lock.fake_0"][4] == (3, "4444")
+    scheduler = hass.data[DOMAIN]["scheduler"]
+    assert scheduler.pending() == 1
+
+    async_fire_time_changed(hass, start + timedelta(seconds=1))
+    await hass.async_block_till_done()
+    assert fake_zha.pins["lock.fake_0"][4] == (1, "4444")
+
+    async_fire_time_changed(hass, end + timedelta(seconds=1))
+    await hass.async_block_till_done()
+    assert 4 not in fake_zha.pins["lock.fake_0"]
+    lock = hass.data[DOMAIN]["store"].get_lock(ieee)
+    assert not lock.slots[4].code_encrypted
+    assert scheduler.pending() == 0
@@ -0,0 +1,160 @@
+"""Index plus one file per lock: migration from version 1, lazy loading and key rotation."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+from cryptography.fernet import Fernet, InvalidToken
+import pytest
+
+from homeassistant.helpers.storage import Store
+
+from custom_components.zha_lock_manager.const import DOMAIN, STORAGE_KEY, STORAGE_VERSION
+from custom_components.zha_lock_manager.storage import ZLMLocalStore, lock_storage_key
+
+from .common import async_seed_codes
+from .fake_zha import lock_ieee
+
+
+async def test_migrate_from_single_file(hass, hass_storage, setup_integration):
+    ieee = lock_ieee(0)
+    hass_storage[STORAGE_KEY] = {
+        "version": 1,
+        "minor_version": 1,
+        "key": STORAGE_KEY,
+        "data": {
+            "revision": 7,
+            "locks": {
+                ieee: {
+                    "name": "Front",
+                    "entity_id": "lock.fake_0",
+                    "max_slots": 30,
+                    "slot_offset": 0,
+                    "revision": 7,
+                    "slots": {"2": {"label": "Guest", "enabled": False, "code_encrypted": None}},
+                }
+            },
+        },
+    }
+    await setup_integration(count=1)
+
+    store = hass.data[DOMAIN]["store"]
+    assert store.revision == 7
+    assert store.get_lock(ieee).slots[2].label == "Guest"
+    index = hass_storage[STORAGE_KEY]
+    assert index["version"] == STORAGE_VERSION
+    assert "slots" not in index["data"]["locks"][ieee]
+    assert hass_storage[lock_storage_key(ieee)]["data"]["slots"]["2"]["label"] == "Guest"
+
+
+async def test_lock_files_load_lazily(hass, hass_ws_client, setup_integration):
+    entry = await setup_integration(count=2)
+    await async_seed_codes(hass, 2)
+    with patch("custom_components.zha_lock_manager.async_register_panel"):
+        assert await hass.config_entries.async_reload(entry.entry_id)
+        await hass.async_block_till_done(wait_background_tasks=True)
+
+    store = hass.data[DOMAIN]["store"]
+    assert not store.lock_loaded(lock_ieee(0))
+    assert not store.lock_loaded(lock_ieee(1))
+
+    client = await hass_ws_client(hass)
+    await client.send_json_auto_id({"type": "zlm/get_lock", "device_ieee": lock_ieee(0)})
+    result = (await client.receive_json())["result"]
+    assert result["slots"]["2"]["has_code"]
+    assert not store.lock_loaded(lock_ieee(1))
+
+    # A change rewrites the index and that lock's file only
+    written = []
+    original = Store._async_write_data
+
+    async def _recording(self, path, data):
+        written.append(self.key)
+        await original(self, path, data)
+
+    with patch.object(Store, "_async_write_data", _recording):
+        store.set_label(store.get_lock(lock_ieee(0)), 1, "Kitchen")
+        await store.async_flush()
+        assert sorted(written) == sorted([STORAGE_KEY, lock_storage_key(lock_ieee(0))])
+
+        # Metadata of a lock not read yet lives in the index, its file is left alone
+        written.clear()
+        store.update_lock_meta(store.get_lock(lock_ieee(1)), name="Back")
+        await store.async_flush()
+        assert written == [STORAGE_KEY]
+
+    lock = await store.async_get_lock(lock_ieee(1))
+    assert lock.name == "Back"
+    assert lock.slots[2].label == "User 2"
+
+
+async def _async_until(check) -> None:
+    for _ in range(500):
+        if check():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+async def test_key_rotation_resumes_after_reload(hass, hass_ws_client, setup_integration):
+    entry = await setup_integration(count=3)
+    await async_seed_codes(hass, 2)
+    store = hass.data[DOMAIN]["store"]
+    old_key = store._key_data["key"]
+
+    # Hold the sweep after the first lock
+    gate = asyncio.Event()
+    original = ZLMLocalStore._async_rotate_lock
+
+    async def _gated(self, lock):
+        if self.key_rotation_status()["locks_done"]:
+            await gate.wait()
+        await original(self, lock)
+
+    client = await hass_ws_client(hass)
+    with patch.object(ZLMLocalStore, "_async_rotate_lock", _gated):
+        await client.send_json_auto_id({"type": "zlm/rotate_key"})
+        assert (await client.receive_json())["success"]
+        await _async_until(lambda: store.key_rotation_status()["locks_done"] == 1)
+        status = store.key_rotation_status()
+        assert status["active"] and status["old_keys"] == 1
+        new_key = store._key_data["key"]
+        assert new_key != old_key and store._key_data["old_keys"] == [old_key]
+        (first,) = store._key_data["rotation"]["done"]
+        new = Fernet(new_key.encode())
+        for slot, _, _, token in store.get_lock(first).slots.rows():
+            assert new.decrypt(token.encode()).decode() == f"{slot:06d}"
+
+        with patch("custom_components.zha_lock_manager.async_register_panel"):
+            assert await hass.config_entries.async_reload(entry.entry_id)
+            await hass.async_block_till_done()
+
+    store = hass.data[DOMAIN]["store"]
+    await _async_until(lambda: not store.rotating)
+    assert store.key_rotation_status()["old_keys"] == 0
+    assert store._key_data == {"key": new_key}
+
+    await store.async_load_locks()
+    old = Fernet(old_key.encode())
+    for lock in store.locks.values():
+        for slot, _, _, token in lock.slots.rows():
+            assert new.decrypt(token.encode()).decode() == f"{slot:06d}"
+            with pytest.raises(InvalidToken):
+                old.decrypt(token.encode())
+
+
+async def test_reload_of_empty_index_resets_state(hass, hass_storage, setup_integration):
+    await setup_integration(count=1)
+    await async_seed_codes(hass, 2)
+    store: ZLMLocalStore = hass.data[DOMAIN]["store"]
+    lock = await store.async_get_lock(lock_ieee(0))
+    store.mark_suspect(lock, 1)
+    await store.async_flush()
+    assert store.revision > 0
+
+    hass_storage.pop(STORAGE_KEY)
+    await store.async_load()
+    assert store.revision == 0
+    assert store.locks == {}
+    assert store._suspect == {}
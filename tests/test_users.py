@@ -0,0 +1,116 @@
+"""Users with one code on several locks."""
+
+from __future__ import annotations
+
+from custom_components.zha_lock_manager.const import DOMAIN
+
+from .common import async_seed_codes
+from .fake_zha import lock_ieee
+
+
+async def test_user_fans_out_and_clears(hass, hass_ws_client, setup_integration, fake_zha):
+    await setup_integration(count=2)
+    client = await hass_ws_client(hass)
+    await client.send_json_auto_id(
+        {
+            "type": "zlm/save_user",
+            "name": "Alice",
+            "code": "2468",
+            "assignments": [
+                {"device_ieee": lock_ieee(0), "slot": 3},
+                {"device_ieee": lock_ieee(1), "slot": 7},
+            ],
+        }
+    )
+    user = (await client.receive_json())["result"]
+    assert {a["status"] for a in user["assignments"]} == {"synced"}
+    assert fake_zha.pins["lock.fake_0"][3] == (1, "2468")
+    assert fake_zha.pins["lock.fake_1"][7] == (1, "2468")
+
+    # Disabling only toggles, moving an assignment clears the old slot
+    await client.send_json_auto_id(
+        {
+            "type": "zlm/save_user",
+            "user_id": user["user_id"],
+            "name": "Alice",
+            "enabled": False,
+            "assignments": [
+                {"device_ieee": lock_ieee(0), "slot": 3},
+                {"device_ieee": lock_ieee(1), "slot": 8},
+            ],
+        }
+    )
+    user = (await client.receive_json())["result"]
+    assert user["revoking"] == []
+    assert fake_zha.pins["lock.fake_0"][3] == (3, "2468")
+    assert 7 not in fake_zha.pins["lock.fake_1"]
+    assert fake_zha.pins["lock.fake_1"][8] == (3, "2468")
+
+    await client.send_json_auto_id({"type": "zlm/delete_user", "user_id": user["user_id"]})
+    assert (await client.receive_json())["success"]
+    assert fake_zha.pins["lock.fake_0"] == {}
+    assert fake_zha.pins["lock.fake_1"] == {}
+    assert hass.data[DOMAIN]["store"].users == {}
+
+
+async def test_failed_assignment_is_retried(hass, hass_ws_client, setup_integration, fake_zha):
+    await setup_integration(count=2)
+    client = await hass_ws_client(hass)
+    fake_zha.configure(failure_rate=1.0)
+    await client.send_json_auto_id(
+        {
+            "type": "zlm/save_user",
+            "name": "Bob",
+            "code": "1357",
+            "assignments": [
+                {"device_ieee": lock_ieee(0), "slot": 2},
+                {"device_ieee": lock_ieee(1), "slot": 2},
+            ],
+        }
+    )
+    user = (await client.receive_json())["result"]
+    assert {a["status"] for a in user["assignments"]} == {"failed"}
+    assert all(a["error"] for a in user["assignments"])
+
+    fake_zha.configure(failure_rate=0.0)
+    await hass.data[DOMAIN]["users"]._async_retry()
+    stored = hass.data[DOMAIN]["store"].users[user["user_id"]]
+    assert {s["status"] for s in stored.assignments.values()} == {"synced"}
+    assert fake_zha.pins["lock.fake_1"][2] == (1, "1357")
+
+
+async def test_new_user_needs_code(hass, hass_ws_client, setup_integration):
+    await setup_integration(count=1)
+    client = await hass_ws_client(hass)
+    await client.send_json_auto_id({"type": "zlm/save_user", "name": "Eve"})
+    msg = await client.receive_json()
+    assert not msg["success"]
+    assert msg["error"]["code"] == "invalid_format"
+
+
+async def test_taken_slot_is_refused_and_rename_only_relabels(
+    hass, hass_ws_client, setup_integration, fake_zha
+):
+    await setup_integration(count=1)
+    await async_seed_codes(hass, 2)
+    client = await hass_ws_client(hass)
+    save = {"type": "zlm/save_user", "name": "Bob", "code": "9999"}
+
+    await client.send_json_auto_id({**save, "assignments": [{"device_ieee": lock_ieee(0), "slot": 2}]})
+    assert (await client.receive_json())["error"]["code"] == "invalid_format"
+
+    await client.send_json_auto_id({**save, "assignments": [{"device_ieee": lock_ieee(0), "slot": 4}]})
+    user = (await client.receive_json())["result"]
+    calls = len(fake_zha.calls)
+
+    await client.send_json_auto_id(
+        {
+            "type": "zlm/save_user",
+            "user_id": user["user_id"],
+            "name": "Robert",
+            "assignments": [{"device_ieee": lock_ieee(0), "slot": 4}],
+        }
+    )
+    assert (await client.receive_json())["success"]
+    assert len(fake_zha.calls) == calls
+    assert hass.data[DOMAIN]["store"].get_lock(lock_ieee(0)).slots[4].label == "Robert"
@@ -0,0 +1,176 @@
+"""WebSocket API against the fake ZHA."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.zha_lock_manager.const import DOMAIN, IMPORT_SESSION_TIMEOUT
+from custom_components.zha_lock_manager.storage import ZLMLocalStore
+
+from .fake_zha import lock_ieee
+
+
+async def test_set_code_writes_lock_and_store(hass, hass_ws_client, setup_integration, fake_zha):
+    await setup_integration(count=2)
+    client = await hass_ws_client(hass)
+    ieee = lock_ieee(1)
+
+    await client.send_json_auto_id(
+        {"type": "zlm/set_code", "device_ieee": ieee, "slot": 3, "code": "4321", "label": "Ann", "wait": True}
+    )
+    msg = await client.receive_json()
+
+    assert msg["success"]
+    assert msg["result"]["status"] == "done"
+    assert fake_zha.pins["lock.fake_1"][3] == (1, "4321")
+    store = hass.data[DOMAIN]["store"]
+    assert store.get_plain_code(store.get_lock(ieee), 3) == "4321"
+
+
+async def test_set_code_retries_then_fails(hass, hass_ws_client, setup_integration, fake_zha):
+    await setup_integration(count=1)
+    fake_zha.configure(failure_rate=1.0)
+    client = await hass_ws_client(hass)
+
+    await client.send_json_auto_id(
+        {"type": "zlm/set_code", "device_ieee": lock_ieee(0), "slot": 1, "code": "1111", "wait": True}
+    )
+    msg = await client.receive_json()
+
+    assert not msg["success"]
+    assert msg["error"]["code"] == "zigbee_error"
+    assert [c.outcome for c in fake_zha.calls] == ["failure"] * 4
+    store = hass.data[DOMAIN]["store"]
+    assert 1 not in store.get_lock(lock_ieee(0)).slots
+
+
+async def test_timeouts_are_retried(hass, hass_ws_client, setup_integration, fake_zha):
+    await setup_integration(count=1)
+    fake_zha.script("timeout", "failure", "ok")
+    client = await hass_ws_client(hass)
+
+    await client.send_json_auto_id(
+        {"type": "zlm/set_code", "device_ieee": lock_ieee(0), "slot": 2, "code": "2222", "wait": True}
+    )
+    msg = await client.receive_json()
+
+    assert msg["success"]
+    assert msg["result"]["attempts"] == 3
+    assert [c.outcome for c in fake_zha.calls] == ["timeout", "failure", "ok"]
+
+
+async def test_bulk_apply_streams_results(hass, hass_ws_client, setup_integration, fake_zha):
+    await setup_integration(count=3)
+    client = await hass_ws_client(hass)
+    operations = [
+        {"device_ieee": lock_ieee(i), "slot": slot, "action": "set", "code": f"{i}{slot:03d}"}
+        for i in range(3)
+        for slot in range(1, 5)
+    ]
+
+    await client.send_json_auto_id({"type": "zlm/bulk_apply", "operations": operations})
+    ack = await client.receive_json()
+    assert ack["result"] == {"total": 12}
+
+    events = [(await client.receive_json())["event"] for _ in range(13)]
+    assert all(e["success"] for e in events[:-1])
+    assert events[-1] == {"done": True, "succeeded": 12, "failed": 0}
+    assert len(fake_zha.pins["lock.fake_2"]) == 4
+
+
+async def test_list_locks_not_modified(hass, hass_ws_client, setup_integration):
+    await setup_integration(count=2)
+    client = await hass_ws_client(hass)
+
+    await client.send_json_auto_id({"type": "zlm/list_locks", "since_revision": 0})
+    first = (await client.receive_json())["result"]
+    assert len(first["locks"]) == 2
+
+    await client.send_json_auto_id({"type": "zlm/list_locks", "since_revision": first["revision"]})
+    second = (await client.receive_json())["result"]
+    assert second == {"revision": first["revision"], "not_modified": True}
+
+
+async def test_reconcile_finds_and_repairs_drift(hass, hass_ws_client, setup_integration, fake_zha):
+    await setup_integration(count=1)
+    client = await hass_ws_client(hass)
+    ieee = lock_ieee(0)
+    await client.send_json_auto_id(
+        {"type": "zlm/set_code", "device_ieee": ieee, "slot": 1, "code": "9999", "wait": True}
+    )
+    await client.receive_json()
+    fake_zha.pins["lock.fake_0"].clear()
+
+    await client.send_json_auto_id({"type": "zlm/reconcile", "device_ieee": ieee, "repair": True})
+    result = (await client.receive_json())["result"][0]
+
+    assert result["mismatches"] == [
+        {"slot": 1, "kind": "missing_on_lock", "lock_status": 0, "repaired": True}
+    ]
+    assert fake_zha.pins["lock.fake_0"][1] == (1, "9999")
+
+
+async def test_idle_import_session_expires(hass, hass_ws_client, setup_integration):
+    await setup_integration(count=1)
+    client = await hass_ws_client(hass)
+    await client.send_json_auto_id(
+        {"type": "zlm/import", "passphrase": "correct horse", "lines": []}
+    )
+    session = (await client.receive_json())["result"]["session"]
+    assert session in hass.data[DOMAIN]["imports"]
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=IMPORT_SESSION_TIMEOUT + 1))
+    await hass.async_block_till_done()
+    assert hass.data[DOMAIN]["imports"] == {}
+
+    await client.send_json_auto_id({"type": "zlm/import", "session": session, "lines": []})
+    assert (await client.receive_json())["error"]["code"] == "not_found"
+
+
+async def test_queue_survives_failed_flush(hass, hass_ws_client, setup_integration):
+    await setup_integration(count=1)
+    client = await hass_ws_client(hass)
+    set_code = {"type": "zlm/set_code", "device_ieee": lock_ieee(0), "code": "1234", "wait": True}
+
+    with patch.object(ZLMLocalStore, "async_flush", side_effect=OSError("disk full")):
+        await client.send_json_auto_id({**set_code, "slot": 1})
+        assert (await client.receive_json())["error"]["code"] == "zigbee_error"
+
+    # The worker is still there for the next job
+    await client.send_json_auto_id({**set_code, "slot": 2})
+    assert (await client.receive_json())["success"]
+
+
+async def test_subscribe_pushes_deltas_and_jobs(hass, hass_ws_client, setup_integration):
+    await setup_integration(count=1)
+    store = hass.data[DOMAIN]["store"]
+    client = await hass_ws_client(hass)
+    await client.send_json_auto_id({"type": "zlm/subscribe"})
+    msg = await client.receive_json()
+    assert msg["success"]
+    revision = msg["result"]["revision"]
+    assert revision == store.revision
+
+    await client.send_json_auto_id(
+        {"type": "zlm/rename_code", "device_ieee": lock_ieee(0), "slot": 1, "label": "Porch"}
+    )
+    messages = [await client.receive_json() for _ in range(2)]
+    (delta,) = [m["event"] for m in messages if m["type"] == "event"]
+    assert delta["revision"] == revision + 1
+    assert (delta["device_ieee"], delta["slot"], delta["changes"]) == (lock_ieee(0), 1, {"label": "Porch"})
+
+    await client.send_json_auto_id(
+        {"type": "zlm/set_code", "device_ieee": lock_ieee(0), "slot": 2, "code": "1234", "wait": True}
+    )
+    jobs = []
+    while True:
+        msg = await client.receive_json()
+        if msg["type"] == "result":
+            break
+        if "job" in msg["event"]:
+            jobs.append(msg["event"]["job"]["status"])
+    assert jobs[-1] == "done"